@@ -0,0 +1,31 @@
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, status
+from app.config import settings
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """
+    Dependency protecting operational endpoints
+
+    The admin API is hidden (404) unless ADMIN_API_KEY is configured, and
+    requests must send the key in the X-Admin-Key header.
+
+    Args:
+        x_admin_key: Value of the X-Admin-Key header
+
+    Raises:
+        HTTPException: If the admin API is disabled or the key is wrong
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+    # Bytes: compare_digest rejects non-ASCII str, which would surface as a 500
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode("utf-8"), settings.ADMIN_API_KEY.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key"
+        )
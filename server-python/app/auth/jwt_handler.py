@@ -4,14 +4,15 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
-from app.database import get_database
+from app.services.user_service import get_user_by_id
+from app.tenancy import current_tenant, tenant_registry
 
 security = HTTPBearer()
 
 
 def create_access_token(user_id: str, email: str) -> str:
     """
-    Generate JWT access token
+    Generate JWT access token for the current tenant
     
     Args:
         user_id: User's MongoDB ID
@@ -26,6 +27,7 @@ def create_access_token(user_id: str, email: str) -> str:
     to_encode = {
         "sub": user_id,
         "email": email,
+        "tenant": current_tenant().id,
         "exp": expire,
         "iat": datetime.utcnow()
     }
@@ -66,34 +68,52 @@ def decode_token(token: str) -> Dict:
         )
 
 
-async def get_current_user(
+def get_token_user_id(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> Dict:
+) -> str:
     """
-    Dependency to get current authenticated user
+    Dependency to get the user ID of a valid bearer token, without a database read
     
     Args:
         credentials: HTTP Bearer token from request
         
     Returns:
-        User data dictionary
+        User ID (the token's subject)
         
     Raises:
-        HTTPException: If user not found or token invalid
+        HTTPException: If the token is invalid, has no subject or was issued
+            by another tenant
     """
-    token = credentials.credentials
-    payload = decode_token(token)
+    payload = decode_token(credentials.credentials)
     
     user_id = payload.get("sub")
-    if user_id is None:
+    # Tokens issued before tenancy carry no claim and belong to the default tenant
+    tenant_id = payload.get("tenant", tenant_registry.default.id)
+    if user_id is None or tenant_id != current_tenant().id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
+    return user_id
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Dict:
+    """
+    Dependency to get current authenticated user
     
-    # Fetch user from database
-    db = get_database()
-    user = await db[settings.COLLECTION_NAME].find_one({"_id": user_id})
+    Args:
+        credentials: HTTP Bearer token from request
+        
+    Returns:
+        User data dictionary
+        
+    Raises:
+        HTTPException: If user not found or token invalid
+    """
+    # Fetch user from database (the subject is the ObjectId as a string)
+    user = await get_user_by_id(get_token_user_id(credentials))
     
     if user is None:
         raise HTTPException(
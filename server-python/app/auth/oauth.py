@@ -1,39 +1,72 @@
-from authlib.integrations.starlette_client import OAuth
-from starlette.config import Config
 from app.config import settings
+from app.monitoring.metrics import httpx_event_hooks
 
-# Initialize OAuth
-config = Config(environ={
-    "GOOGLE_CLIENT_ID": settings.GOOGLE_CLIENT_ID or "",
-    "GOOGLE_CLIENT_SECRET": settings.GOOGLE_CLIENT_SECRET or "",
-    "FACEBOOK_APP_ID": settings.FACEBOOK_APP_ID or "",
-    "FACEBOOK_APP_SECRET": settings.FACEBOOK_APP_SECRET or "",
-})
-
-oauth = OAuth(config)
-
-# Register Google OAuth
-if settings.GOOGLE_CLIENT_ID and settings.GOOGLE_CLIENT_SECRET:
-    oauth.register(
-        name='google',
-        client_id=settings.GOOGLE_CLIENT_ID,
-        client_secret=settings.GOOGLE_CLIENT_SECRET,
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-        client_kwargs={
-            'scope': 'openid email profile'
-        }
-    )
-
-# Register Facebook OAuth
-if settings.FACEBOOK_APP_ID and settings.FACEBOOK_APP_SECRET:
-    oauth.register(
-        name='facebook',
-        client_id=settings.FACEBOOK_APP_ID,
-        client_secret=settings.FACEBOOK_APP_SECRET,
-        access_token_url='https://graph.facebook.com/oauth/access_token',
-        authorize_url='https://www.facebook.com/dialog/oauth',
-        api_base_url='https://graph.facebook.com/',
-        client_kwargs={
-            'scope': 'email public_profile'
-        }
-    )
+# Built on first use: authlib (and the httpx client it pulls in) is only
+# needed once someone starts or completes a social login
+_oauth = None
+
+
+def get_oauth():
+    """
+    Get the OAuth registry, importing authlib and registering providers on first use
+
+    Returns:
+        authlib OAuth registry with the configured providers
+    """
+    global _oauth
+    if _oauth is not None:
+        return _oauth
+
+    from authlib.integrations.starlette_client import OAuth
+    from starlette.config import Config
+    from app.auth.oauth_state import create_oauth_state_store
+
+    # Initialize OAuth
+    config = Config(environ={
+        "GOOGLE_CLIENT_ID": settings.GOOGLE_CLIENT_ID or "",
+        "GOOGLE_CLIENT_SECRET": settings.GOOGLE_CLIENT_SECRET or "",
+        "FACEBOOK_APP_ID": settings.FACEBOOK_APP_ID or "",
+        "FACEBOOK_APP_SECRET": settings.FACEBOOK_APP_SECRET or "",
+    })
+
+    # Redirect state lives server-side, shared by every worker
+    oauth = OAuth(config, cache=create_oauth_state_store())
+
+    # Register Google OAuth
+    if settings.GOOGLE_CLIENT_ID and settings.GOOGLE_CLIENT_SECRET:
+        oauth.register(
+            name='google',
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={
+                'scope': 'openid email profile',
+                'code_challenge_method': 'S256',
+                'event_hooks': httpx_event_hooks('google')
+            }
+        )
+
+    # Register Facebook OAuth
+    if settings.FACEBOOK_APP_ID and settings.FACEBOOK_APP_SECRET:
+        oauth.register(
+            name='facebook',
+            client_id=settings.FACEBOOK_APP_ID,
+            client_secret=settings.FACEBOOK_APP_SECRET,
+            access_token_url='https://graph.facebook.com/oauth/access_token',
+            authorize_url='https://www.facebook.com/dialog/oauth',
+            api_base_url='https://graph.facebook.com/',
+            client_kwargs={
+                'scope': 'email public_profile',
+                'event_hooks': httpx_event_hooks('facebook')
+            }
+        )
+
+    _oauth = oauth
+    return _oauth
+
+
+def __getattr__(name: str):
+    # Keeps `from app.auth.oauth import oauth` working for scripts
+    if name == "oauth":
+        return get_oauth()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
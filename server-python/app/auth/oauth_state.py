@@ -0,0 +1,166 @@
+"""
+OAuth State Store - Server-side authorization state shared by every worker
+
+authlib keeps what it needs between the login redirect and the callback
+(redirect URI, OpenID nonce, PKCE code verifier) under the `state` value it
+sends to the provider. Without a session middleware it has nowhere to put
+it; with one, the data would bloat a cookie. Instead authlib is given a
+cache (the `cache=` argument of its OAuth registry) backed by:
+
+- memory: bounded in-process LRU with a TTL, for a single worker
+- mongo: a collection with a TTL index, shared by all workers and nodes
+
+The state itself is a compact signed ID: 16 random bytes and a truncated
+HMAC, so callbacks carrying a forged or mangled state are rejected before
+any store lookup. The login response also sets a small cookie holding the
+state, and the callback must present it, which ties the flow to the browser
+that started it.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config import settings
+from app.database import get_collection
+from app.monitoring.memory import register_structure
+
+STATE_COOKIE = "oauth_state"
+STATE_COOKIE_PATH = "/api/auth"
+
+_SIGNATURE_BYTES = 12
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _signature(state_id: str) -> str:
+    digest = hmac.new(settings.JWT_SECRET.encode(), b"oauth-state:" + state_id.encode(), hashlib.sha256)
+    return _b64(digest.digest()[:_SIGNATURE_BYTES])
+
+
+def new_state() -> str:
+    """
+    Generate a signed state value for an authorization redirect
+
+    Returns:
+        "<id>.<signature>", 39 URL-safe characters
+    """
+    state_id = _b64(secrets.token_bytes(16))
+    return f"{state_id}.{_signature(state_id)}"
+
+
+def verify_state(state: Optional[str], cookie: Optional[str]) -> bool:
+    """
+    Check a callback's state against its signature and the browser's cookie
+
+    Args:
+        state: `state` query parameter of the callback
+        cookie: Value of the state cookie set by the login redirect
+
+    Returns:
+        True if the state was issued by this service to this browser
+    """
+    if not state or not cookie or not hmac.compare_digest(
+        state.encode("utf-8"), cookie.encode("utf-8")
+    ):
+        return False
+    state_id, _, signature = state.partition(".")
+    return bool(state_id) and hmac.compare_digest(
+        signature.encode("utf-8"), _signature(state_id).encode("utf-8")
+    )
+
+
+class MemoryOAuthStateStore:
+    """Bounded in-process store with a TTL per entry"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: str, expires_in: Optional[int] = None) -> None:
+        """Store a value; authlib's expires_in is ignored for OAUTH_STATE_TTL_SECONDS"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def size(self) -> int:
+        # Not __len__: authlib falls back to request.session when the cache is falsy
+        return len(self._entries)
+
+
+class MongoOAuthStateStore:
+    """Shared store backed by a MongoDB collection with a TTL index"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._indexes_ready = False
+
+    def _collection(self):
+        return get_collection(settings.OAUTH_STATE_COLLECTION_NAME)
+
+    async def _ensure_indexes(self, collection) -> None:
+        if self._indexes_ready:
+            return
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def get(self, key: str) -> Optional[str]:
+        doc = await self._collection().find_one({"_id": key})
+        # The TTL monitor only runs once a minute
+        if doc is None or doc["expires_at"] < datetime.utcnow():
+            return None
+        return doc["value"]
+
+    async def set(self, key: str, value: str, expires_in: Optional[int] = None) -> None:
+        """Store a value; authlib's expires_in is ignored for OAUTH_STATE_TTL_SECONDS"""
+        collection = self._collection()
+
+        await self._ensure_indexes(collection)
+        await collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "value": value,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            },
+            upsert=True
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._collection().delete_one({"_id": key})
+
+
+def create_oauth_state_store():
+    """
+    Create the store configured by OAUTH_STATE_BACKEND
+
+    Returns:
+        MemoryOAuthStateStore or MongoOAuthStateStore
+    """
+    if settings.OAUTH_STATE_BACKEND == "memory":
+        store = MemoryOAuthStateStore(settings.OAUTH_STATE_MAX_ENTRIES, settings.OAUTH_STATE_TTL_SECONDS)
+        register_structure("oauth_state_entries", store.size)
+        return store
+    return MongoOAuthStateStore(settings.OAUTH_STATE_TTL_SECONDS)
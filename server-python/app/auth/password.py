@@ -1,4 +1,8 @@
 import bcrypt
+from app.monitoring.metrics import PASSWORD_HASH_DURATION
+
+_hash_timer = PASSWORD_HASH_DURATION.labels("hash")
+_verify_timer = PASSWORD_HASH_DURATION.labels("verify")
 
 
 def hash_password(password: str) -> str:
@@ -11,8 +15,9 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password string
     """
-    salt = bcrypt.gensalt(rounds=12)
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    with _hash_timer.time():
+        salt = bcrypt.gensalt(rounds=12)
+        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
@@ -27,7 +32,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
-    )
+    with _verify_timer.time():
+        return bcrypt.checkpw(
+            plain_password.encode('utf-8'),
+            hashed_password.encode('utf-8')
+        )
@@ -0,0 +1,231 @@
+"""
+Password Policy - Precompiled strength rules and an offline breached-password check
+
+Breached passwords are looked up in a local index built by
+tools/build_breached_index.py from a raw dump (e.g. the Have I Been Pwned
+SHA-1 list). Index layout, all integers little-endian:
+
+    header   64 bytes: magic b"PWIDX\\x01\\x00\\x00", record size (u32),
+             reserved (u32), record count (u64), zero padding
+    fanout   65537 x u64: index of the first record whose digest starts
+             with each 16-bit prefix; the last entry is the record count
+    records  count x record size bytes: leading bytes of the SHA-1 digest
+             of each password, sorted and unique
+
+The file is memory-mapped and binary-searched within the fanout bucket, so a
+lookup touches a few pages, resident memory stays near zero however large
+the index is, and workers forked from a preloading master share the pages.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+from typing import List, Optional, Pattern, Tuple
+from app.config import settings
+from app.monitoring.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"PWIDX\x01\x00\x00"
+HEADER_SIZE = 64
+FANOUT_ENTRIES = 65537
+FANOUT_SIZE = FANOUT_ENTRIES * 8
+HEADER = struct.Struct("<8sIIQ")
+
+PASSWORD_POLICY_REJECTIONS = Counter(
+    "password_policy_rejections_total",
+    "Passwords rejected by the password policy, by rule",
+    ("rule",)
+)
+
+BREACHED_MESSAGE = (
+    "This password has appeared in a data breach. Please choose a different password"
+)
+
+
+class BreachedPasswordIndex:
+    """Read-only memory-mapped index of breached password SHA-1 prefixes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.record_size, _, self.count = HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a breached password index")
+        if not 4 <= self.record_size <= 20:
+            raise ValueError(f"{path} has an invalid record size {self.record_size}")
+        expected = HEADER_SIZE + FANOUT_SIZE + self.count * self.record_size
+        if len(self._mmap) != expected:
+            raise ValueError(f"{path} is truncated or corrupt ({len(self._mmap)} != {expected} bytes)")
+
+        # Lookups jump around the file; read-ahead would only inflate RSS
+        if hasattr(self._mmap, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            self._mmap.madvise(mmap.MADV_RANDOM)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def contains_digest(self, digest: bytes) -> bool:
+        """
+        Look up a SHA-1 digest
+
+        Args:
+            digest: 20-byte SHA-1 digest
+
+        Returns:
+            True if the digest's prefix is in the index
+        """
+        key = digest[:self.record_size]
+        size = self.record_size
+        data = self._mmap
+        bucket = HEADER_SIZE + ((digest[0] << 8) | digest[1]) * 8
+        low, high = struct.unpack_from("<QQ", data, bucket)
+
+        base = HEADER_SIZE + FANOUT_SIZE
+        while low < high:
+            middle = (low + high) // 2
+            offset = base + middle * size
+            record = data[offset:offset + size]
+            if record < key:
+                low = middle + 1
+            elif record > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def contains(self, password: str) -> bool:
+        """
+        Check whether a password is in the index
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            True if the password is known to be breached
+        """
+        return self.contains_digest(hashlib.sha1(password.encode("utf-8")).digest())
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class PasswordPolicy:
+    """
+    Password rules checked in order; the first violation is reported
+
+    Character-class rules are compiled once; the breached-password lookup
+    runs last, only for passwords that pass every other rule.
+    """
+
+    def __init__(
+        self,
+        min_length: int,
+        rules: List[Tuple[str, str, str]],
+        breached_index: Optional[BreachedPasswordIndex] = None
+    ):
+        self.min_length = min_length
+        self.rules: List[Tuple[str, Pattern, str]] = [
+            (name, re.compile(pattern), message) for name, pattern, message in rules
+        ]
+        self.breached_index = breached_index
+
+    def violation(self, password: str) -> Optional[Tuple[str, str]]:
+        """
+        First rule the password breaks
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            (rule name, message), or None if the password is acceptable
+        """
+        if len(password) < self.min_length:
+            return "min_length", f"Password must be at least {self.min_length} characters long"
+
+        for name, pattern, message in self.rules:
+            if pattern.search(password) is None:
+                return name, message
+
+        if self.breached_index is not None and self.breached_index.contains(password):
+            return "breached", BREACHED_MESSAGE
+
+        return None
+
+    def validate(self, password: str) -> str:
+        """
+        Validate a password for use in pydantic validators
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            The password, unchanged
+
+        Raises:
+            ValueError: With the message of the first violated rule
+        """
+        violation = self.violation(password)
+        if violation is not None:
+            rule, message = violation
+            PASSWORD_POLICY_REJECTIONS.labels(rule).inc()
+            raise ValueError(message)
+        return password
+
+
+DEFAULT_RULES = [
+    ("uppercase", r"[A-Z]", "Password must contain at least one uppercase letter"),
+    ("lowercase", r"[a-z]", "Password must contain at least one lowercase letter"),
+    ("digit", r"\d", "Password must contain at least one digit")
+]
+
+
+def load_breached_index(path: Optional[str]) -> Optional[BreachedPasswordIndex]:
+    """
+    Open the breached password index if one is configured
+
+    A missing or invalid file disables the check with an error in the log
+    rather than preventing startup.
+
+    Args:
+        path: Index file path, or None/empty to disable the check
+
+    Returns:
+        The index, or None
+    """
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.error("Breached password index %s not found; check disabled", path)
+        return None
+    try:
+        index = BreachedPasswordIndex(path)
+    except (OSError, ValueError) as e:
+        logger.error("Cannot open breached password index: %s; check disabled", e)
+        return None
+    logger.info("Breached password index loaded: %s entries from %s", len(index), path)
+    return index
+
+
+_policy: Optional[PasswordPolicy] = None
+
+
+def get_password_policy() -> PasswordPolicy:
+    """
+    Get the application password policy, opening the breached index on first use
+
+    Returns:
+        Shared PasswordPolicy
+    """
+    global _policy
+    if _policy is None:
+        _policy = PasswordPolicy(
+            min_length=8,
+            rules=DEFAULT_RULES,
+            breached_index=load_breached_index(settings.BREACHED_PASSWORDS_INDEX)
+        )
+    return _policy
@@ -0,0 +1,104 @@
+"""
+Circuit Breaker - Fail fast while a dependency is unhealthy
+"""
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    are rejected without touching the dependency. Once `reset_seconds` have
+    passed a single probe call is let through: success closes the circuit,
+    failure opens it again. Only used from the event loop, so no locking.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.opened_count = 0
+        self.rejected_count = 0
+        self._probe_started: Optional[float] = None
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may go to the dependency now
+
+        Returns:
+            True if the call may proceed, False if it should fail fast
+        """
+        if self.state == CLOSED:
+            return True
+
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self._probe_started = None
+
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported (cancelled
+            # request) is replaced after another reset period
+            if self._probe_started is None or now - self._probe_started >= self.reset_seconds:
+                self._probe_started = now
+                return True
+
+        self.rejected_count += 1
+        return False
+
+    def record_success(self) -> None:
+        """Report a successful call"""
+        if self.state != CLOSED:
+            logger.info("Circuit %s closed", self.name)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        """Report a call that failed because the dependency is unhealthy"""
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.opened_count += 1
+            self._probe_started = None
+            logger.warning(
+                "Circuit %s opened after %s consecutive failures",
+                self.name, self.consecutive_failures
+            )
+
+    def retry_after(self) -> int:
+        """Seconds until the next probe is allowed (at least 1)"""
+        if self.state != OPEN:
+            return 1
+        left = self.reset_seconds - (time.monotonic() - self.opened_at)
+        return max(1, int(left + 0.999))
+
+    def snapshot(self) -> Dict:
+        """
+        Current breaker state for health and admin reports
+
+        Returns:
+            Dictionary with state, failure count and counters
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+            "rejected_count": self.rejected_count,
+            "retry_after_seconds": self.retry_after() if self.state == OPEN else None
+        }
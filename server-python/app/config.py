@@ -13,6 +13,9 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "HomeAssignment"
     COLLECTION_NAME: str = "users"
     
+    # Tenants (brands) sharing this deployment; see app/tenancy.py
+    TENANTS_FILE: Optional[str] = os.getenv("TENANTS_FILE")
+    
     # JWT Configuration
     JWT_SECRET: str = os.getenv("JWT_SECRET", secrets.token_urlsafe(32))
     JWT_ALGORITHM: str = "HS256"
@@ -28,15 +31,163 @@ class Settings(BaseSettings):
     FACEBOOK_APP_SECRET: Optional[str] = os.getenv("FACEBOOK_APP_SECRET")
     FACEBOOK_REDIRECT_URI: str = os.getenv("FACEBOOK_REDIRECT_URI", "http://localhost:8000/api/auth/facebook/callback")
     
+    # OAuth state between login redirect and callback
+    OAUTH_STATE_BACKEND: str = os.getenv("OAUTH_STATE_BACKEND", "mongo")  # "mongo" or "memory"
+    OAUTH_STATE_TTL_SECONDS: int = int(os.getenv("OAUTH_STATE_TTL_SECONDS", "600"))
+    OAUTH_STATE_MAX_ENTRIES: int = int(os.getenv("OAUTH_STATE_MAX_ENTRIES", "10000"))
+    OAUTH_STATE_COLLECTION_NAME: str = "oauth_states"
+    
     # Email Service
     EMAIL_SERVICE: str = os.getenv("EMAIL_SERVICE", "console")  # "azure", "sendgrid", or "console"
     AZURE_COMMUNICATION_CONNECTION_STRING: Optional[str] = os.getenv("AZURE_COMMUNICATION_CONNECTION_STRING")
     SENDGRID_API_KEY: Optional[str] = os.getenv("SENDGRID_API_KEY")
     FROM_EMAIL: str = os.getenv("FROM_EMAIL", "noreply@example.com")
-    
+
+    # Password Reset Throttling
+    RESET_CODE_EXPIRY_MINUTES: int = int(os.getenv("RESET_CODE_EXPIRY_MINUTES", "15"))
+    RESET_RESEND_COOLDOWN_SECONDS: int = int(os.getenv("RESET_RESEND_COOLDOWN_SECONDS", "60"))
+    RESET_MAX_SENDS_PER_WINDOW: int = int(os.getenv("RESET_MAX_SENDS_PER_WINDOW", "5"))
+    RESET_SEND_WINDOW_MINUTES: int = int(os.getenv("RESET_SEND_WINDOW_MINUTES", "60"))
+    RESET_THROTTLE_MAX_ENTRIES: int = int(os.getenv("RESET_THROTTLE_MAX_ENTRIES", "10000"))
+
+    # Responses: check handler-built bodies against their response_model
+    VALIDATE_TRUSTED_RESPONSES: bool = os.getenv("VALIDATE_TRUSTED_RESPONSES", "false").lower() == "true"
+
+    # Idempotency Keys
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+    IDEMPOTENCY_BACKEND: str = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # "memory" or "mongo"
+    IDEMPOTENCY_PATHS: str = os.getenv(
+        "IDEMPOTENCY_PATHS",
+        "/api/register,/api/password-reset/request,/api/password-reset/complete"
+    )
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    IDEMPOTENCY_COLLECTION_NAME: str = "idempotency_keys"
+
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_SAMPLE_PER_SECOND: int = int(os.getenv("LOG_SAMPLE_PER_SECOND", "50"))
+
+    # Monitoring
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Shared by server workers so /metrics covers all of them (set by app.server)
+    METRICS_MULTIPROCESS_DIR: str = os.getenv("METRICS_MULTIPROCESS_DIR", "")
+    METRICS_SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("METRICS_SNAPSHOT_INTERVAL_SECONDS", "5"))
+    MONGO_SLOW_COMMAND_MS: float = float(os.getenv("MONGO_SLOW_COMMAND_MS", "100"))
+    MONGO_EXPLAIN_AFTER: int = int(os.getenv("MONGO_EXPLAIN_AFTER", "5"))
+    MONGO_EXPLAIN_INTERVAL_SECONDS: int = int(os.getenv("MONGO_EXPLAIN_INTERVAL_SECONDS", "600"))
+    MONGO_SLOW_SHAPES_MAX: int = int(os.getenv("MONGO_SLOW_SHAPES_MAX", "500"))
+
+    LOOP_LAG_INTERVAL_MS: int = int(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+    LOOP_LAG_SAMPLES: int = int(os.getenv("LOOP_LAG_SAMPLES", "3000"))
+    LOOP_BLOCKING_DETECTOR_ENABLED: bool = os.getenv("LOOP_BLOCKING_DETECTOR_ENABLED", "false").lower() == "true"
+    LOOP_BLOCKING_THRESHOLD_MS: int = int(os.getenv("LOOP_BLOCKING_THRESHOLD_MS", "100"))
+    LOOP_BLOCKING_STACK_DEPTH: int = int(os.getenv("LOOP_BLOCKING_STACK_DEPTH", "15"))
+
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_TOKEN: Optional[str] = os.getenv("PROFILE_TOKEN")
+    PROFILE_OUTPUT_DIR: str = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_MAX_CONCURRENT: int = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+
+    TRACEMALLOC_ON_STARTUP: bool = os.getenv("TRACEMALLOC_ON_STARTUP", "false").lower() == "true"
+    TRACEMALLOC_FRAMES: int = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+
+    # Traffic capture for replay (anonymized request shapes and timing)
+    TRAFFIC_CAPTURE_ENABLED: bool = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+    TRAFFIC_CAPTURE_PATH: str = os.getenv("TRAFFIC_CAPTURE_PATH", "captures/traffic.jsonl")
+    TRAFFIC_CAPTURE_SAMPLE_RATE: float = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0"))
+    TRAFFIC_CAPTURE_MAX_BYTES: int = int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+    TRAFFIC_CAPTURE_BACKUPS: int = int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", "5"))
+    TRAFFIC_CAPTURE_MAX_BODY_BYTES: int = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "16384"))
+
+    # Production server (python -m app.server)
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))  # 0 = one per CPU of the container quota
+    SERVER_PRELOAD: bool = os.getenv("SERVER_PRELOAD", "true").lower() == "true"
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "20000"))  # 0 = never recycle
+    SERVER_MAX_REQUESTS_JITTER: int = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "2000"))
+    SERVER_MAX_RSS_MB: int = int(os.getenv("SERVER_MAX_RSS_MB", "0"))  # 0 = no RSS limit
+    SERVER_RSS_CHECK_INTERVAL_SECONDS: float = float(os.getenv("SERVER_RSS_CHECK_INTERVAL_SECONDS", "10"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_WORKER_TIMEOUT: int = int(os.getenv("SERVER_WORKER_TIMEOUT", "60"))
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    SERVER_FORWARDED_ALLOW_IPS: str = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+    MONGO_WARMUP_CONNECTIONS: int = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "4"))
+    MONGO_ENSURE_INDEXES: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+    # Request time budget (MongoDB maxTimeMS / outbound HTTP timeouts) and MongoDB circuit breaker
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "10"))
+    MONGO_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("MONGO_BREAKER_FAILURE_THRESHOLD", "5"))
+    MONGO_BREAKER_RESET_SECONDS: float = float(os.getenv("MONGO_BREAKER_RESET_SECONDS", "10"))
+
+    # Adaptive per-route concurrency limits (AIMD on latency); excess requests get 503
+    CONCURRENCY_LIMIT_ENABLED: bool = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+    CONCURRENCY_INITIAL_LIMIT: int = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "20"))
+    CONCURRENCY_MIN_LIMIT: int = int(os.getenv("CONCURRENCY_MIN_LIMIT", "4"))
+    CONCURRENCY_MAX_LIMIT: int = int(os.getenv("CONCURRENCY_MAX_LIMIT", "200"))
+    CONCURRENCY_LATENCY_TOLERANCE: float = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "4.0"))
+    CONCURRENCY_BACKOFF: float = float(os.getenv("CONCURRENCY_BACKOFF", "0.9"))
+    CONCURRENCY_EXEMPT_PATHS: str = os.getenv("CONCURRENCY_EXEMPT_PATHS", "/livez,/readyz,/health,/metrics")
+
+    # Breached password index built by tools/build_breached_index.py (unset = check disabled)
+    BREACHED_PASSWORDS_INDEX: Optional[str] = os.getenv("BREACHED_PASSWORDS_INDEX")
+
+    # Background dependency checks behind /readyz and /health
+    READINESS_CHECK_INTERVAL_SECONDS: float = float(os.getenv("READINESS_CHECK_INTERVAL_SECONDS", "10"))
+    READINESS_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("READINESS_CHECK_TIMEOUT_SECONDS", "2"))
+
+    # Maintenance jobs (in-process scheduler; one leader across workers via a MongoDB lease)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_LEASE_SECONDS: float = float(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+    SCHEDULER_COLLECTION_NAME: str = "scheduler"
+    MAINTENANCE_DRY_RUN: bool = os.getenv("MAINTENANCE_DRY_RUN", "false").lower() == "true"
+    MAINTENANCE_BATCH_SIZE: int = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+    MAINTENANCE_BATCHES_PER_SECOND: float = float(os.getenv("MAINTENANCE_BATCHES_PER_SECOND", "2"))
+    RESET_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("RESET_CLEANUP_INTERVAL_SECONDS", "3600"))
+    UNVERIFIED_ACCOUNT_MAX_AGE_DAYS: int = int(os.getenv("UNVERIFIED_ACCOUNT_MAX_AGE_DAYS", "0"))  # 0 = keep forever
+    UNVERIFIED_ACCOUNT_ACTION: str = os.getenv("UNVERIFIED_ACCOUNT_ACTION", "archive")  # "archive" or "delete"
+    UNVERIFIED_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("UNVERIFIED_CLEANUP_INTERVAL_SECONDS", "86400"))
+    USER_MIGRATION_ENABLED: bool = os.getenv("USER_MIGRATION_ENABLED", "false").lower() == "true"
+    USER_MIGRATION_INTERVAL_SECONDS: int = int(os.getenv("USER_MIGRATION_INTERVAL_SECONDS", "3600"))
+
+    # Bulk account erasure (admin API and tools/erase_users.py)
+    ERASURE_BATCH_SIZE: int = int(os.getenv("ERASURE_BATCH_SIZE", "200"))
+    ERASURE_BATCHES_PER_SECOND: float = float(os.getenv("ERASURE_BATCHES_PER_SECOND", "2"))
+    ERASURE_MAX_TARGETS: int = int(os.getenv("ERASURE_MAX_TARGETS", "50000"))
+    ERASURE_STALE_SECONDS: int = int(os.getenv("ERASURE_STALE_SECONDS", "120"))
+    ERASURE_COLLECTION_NAME: str = "erasure_jobs"
+
+    # Deployment environment: selects the MongoDB client profile (development, staging, production)
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+
+    # MongoDB client overrides (unset = value from the environment profile)
+    MONGO_MAX_POOL_SIZE: Optional[int] = os.getenv("MONGO_MAX_POOL_SIZE")
+    MONGO_MIN_POOL_SIZE: Optional[int] = os.getenv("MONGO_MIN_POOL_SIZE")
+    MONGO_MAX_CONNECTING: Optional[int] = os.getenv("MONGO_MAX_CONNECTING")
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = os.getenv("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: Optional[int] = os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS")
+    MONGO_COMPRESSORS: Optional[str] = os.getenv("MONGO_COMPRESSORS")  # e.g. "zstd,snappy,zlib"
+    MONGO_ZLIB_LEVEL: Optional[int] = os.getenv("MONGO_ZLIB_LEVEL")
+    MONGO_READ_PREFERENCE: Optional[str] = os.getenv("MONGO_READ_PREFERENCE")
+    MONGO_READ_CONCERN: Optional[str] = os.getenv("MONGO_READ_CONCERN")
+    MONGO_WRITE_CONCERN: Optional[str] = os.getenv("MONGO_WRITE_CONCERN")  # "majority" or a node count
+    MONGO_JOURNAL: Optional[bool] = os.getenv("MONGO_JOURNAL")
+
+    # Admin API (disabled when no key is configured)
+    ADMIN_API_KEY: Optional[str] = os.getenv("ADMIN_API_KEY")
+
     # Frontend URLs
     FRONTEND_URL_WEB: str = os.getenv("FRONTEND_URL_WEB", "http://localhost:5173")
     FRONTEND_URL_MOBILE: str = os.getenv("FRONTEND_URL_MOBILE", "exp://localhost:19000")
+
+    # CORS preflight cache lifetime in browsers
+    CORS_MAX_AGE_SECONDS: int = int(os.getenv("CORS_MAX_AGE_SECONDS", "7200"))
     
     # Server Configuration
     NODE_WELCOME_SERVICE_URL: str = os.getenv("NODE_WELCOME_SERVICE_URL", "http://localhost:3000/welcome-message")
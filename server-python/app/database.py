@@ -1,62 +1,476 @@
 """
 MongoDB Database Connection Management
 """
+import asyncio
+import importlib.util
+import logging
+import time
+import pymongo
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError
+from typing import Any, Dict, List, Optional, Tuple
+from app.circuit_breaker import CircuitBreaker
 from app.config import settings
+from app.deadline import check_deadline, remaining
+from app.monitoring.metrics import Counter, Gauge, Histogram
+from app.monitoring.mongo_listeners import get_event_listeners
+from app.monitoring.mongo_profiler import slow_command_profiler
+from app.tenancy import Tenant, current_tenant, tenant_registry
+
+logger = logging.getLogger(__name__)
 
 # Global MongoDB client and database instances
 _mongo_client: Optional[AsyncIOMotorClient] = None
 _database = None
+_index_task: Optional[asyncio.Task] = None
+_indexes_ready = False
+
+# Covers {_id, version} lookups, so a version check never fetches the document
+USER_VERSION_INDEX = "_id_1_version_1"
+_client_options: Dict[str, Any] = {}
+
+# Clients of tenants with their own cluster, and their circuit breakers
+_tenant_clients: Dict[str, AsyncIOMotorClient] = {}
+_tenant_breakers: Dict[str, CircuitBreaker] = {}
+
+TENANT_MONGO_OPERATIONS = Counter(
+    "tenant_mongo_operations_total",
+    "MongoDB operations on tenant user collections",
+    ("tenant", "operation")
+)
+
+TENANT_MONGO_DURATION = Histogram(
+    "tenant_mongo_operation_duration_seconds",
+    "Latency of MongoDB operations on tenant user collections, including slot waits",
+    ("tenant",)
+)
+
+TENANT_MONGO_INFLIGHT = Gauge(
+    "tenant_mongo_inflight_operations",
+    "MongoDB operations in flight per tenant",
+    ("tenant",)
+)
+
+# Opens after repeated connection failures/timeouts so requests fail fast
+# with 503 instead of each waiting out server selection during an outage
+mongo_breaker = CircuitBreaker(
+    "mongodb",
+    failure_threshold=settings.MONGO_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.MONGO_BREAKER_RESET_SECONDS
+)
+
+# A timeout only counts against the cluster if the call had at least this
+# much of the request budget left; otherwise the request was just late
+_MIN_BUDGET_FOR_FAILURE = 1.0
+
+# pymongo defaults when neither the profile nor the URI sets a value
+DEFAULT_MAX_POOL_SIZE = 100
+DEFAULT_SERVER_SELECTION_TIMEOUT_MS = 30000
+
+# Client options per deployment environment. None leaves the driver default
+# (or the value given in MONGODB_URI) in place; development keeps the
+# original small pool.
+_PROFILES: Dict[str, Dict[str, Any]] = {
+    "development": {
+        "maxPoolSize": 10,
+        "minPoolSize": 1,
+        "maxConnecting": None,
+        "waitQueueTimeoutMS": None,
+        "maxIdleTimeMS": None,
+        "serverSelectionTimeoutMS": 5000,
+        "compressors": None,
+        "zlibCompressionLevel": None,
+        "readPreference": None,
+        "readConcernLevel": None,
+        "w": None,
+        "journal": None
+    },
+    "staging": {
+        "maxPoolSize": 20,
+        "minPoolSize": 2,
+        "maxConnecting": 2,
+        "waitQueueTimeoutMS": 2000,
+        "maxIdleTimeMS": 300000,
+        "serverSelectionTimeoutMS": 5000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 1,
+        "readPreference": "primary",
+        "readConcernLevel": "majority",
+        "w": "majority",
+        "journal": True
+    },
+    "production": {
+        "maxPoolSize": 50,
+        "minPoolSize": 5,
+        "maxConnecting": 4,
+        "waitQueueTimeoutMS": 1000,
+        "maxIdleTimeMS": 300000,
+        "serverSelectionTimeoutMS": 3000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 1,
+        "readPreference": "primary",
+        "readConcernLevel": "majority",
+        "w": "majority",
+        "journal": True
+    }
+}
+
+# Settings that override a profile entry
+_OVERRIDES = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxConnecting": "MONGO_MAX_CONNECTING",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "compressors": "MONGO_COMPRESSORS",
+    "zlibCompressionLevel": "MONGO_ZLIB_LEVEL",
+    "readPreference": "MONGO_READ_PREFERENCE",
+    "readConcernLevel": "MONGO_READ_CONCERN",
+    "w": "MONGO_WRITE_CONCERN",
+    "journal": "MONGO_JOURNAL"
+}
+
+# Python module each optional wire compressor needs
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    """
+    MongoDB client options for the current environment
+
+    Starts from the ENVIRONMENT profile and applies any MONGO_* override.
+    Compressors whose Python package is not installed are dropped, and the
+    zlib level is only sent when zlib is among them.
+
+    Returns:
+        Keyword arguments for AsyncIOMotorClient (without event listeners)
+
+    Raises:
+        ValueError: If ENVIRONMENT names an unknown profile
+    """
+    environment = settings.ENVIRONMENT.lower()
+    if environment not in _PROFILES:
+        raise ValueError(
+            f"Unknown ENVIRONMENT {settings.ENVIRONMENT!r}; expected one of {', '.join(_PROFILES)}"
+        )
+
+    options = dict(_PROFILES[environment])
+    for option, setting in _OVERRIDES.items():
+        value = getattr(settings, setting)
+        if value is not None:
+            options[option] = value
+
+    if options["compressors"]:
+        available = [
+            name.strip() for name in options["compressors"].split(",")
+            if name.strip() in _COMPRESSOR_MODULES
+            and importlib.util.find_spec(_COMPRESSOR_MODULES[name.strip()])
+        ]
+        options["compressors"] = ",".join(available) or None
+    if not options["compressors"] or "zlib" not in options["compressors"]:
+        options["zlibCompressionLevel"] = None
+
+    # A numeric write concern is a node count
+    if isinstance(options["w"], str) and options["w"].isdigit():
+        options["w"] = int(options["w"])
+
+    return {option: value for option, value in options.items() if value is not None}
+
+
+class DatabaseUnavailableError(Exception):
+    """MongoDB is not connected, or the circuit breaker is open"""
+
+    def __init__(self, message: str = "Database temporarily unavailable", retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _is_unavailable(error: PyMongoError) -> bool:
+    """Connection failures and timeouts, as opposed to errors about the operation itself"""
+    return isinstance(error, (ConnectionFailure, ExecutionTimeout)) or error.timeout
+
+
+class GuardedCollection:
+    """
+    Collection wrapper applying the circuit breaker to every operation
+
+    Calls are rejected up front while the breaker is open or the request
+    deadline has passed. Each call runs under pymongo.timeout() with the
+    remaining request budget, capped by serverSelectionTimeoutMS (pymongo
+    replaces server selection timeouts with the timeout() value), so server
+    selection, pool checkout and the server-side maxTimeMS all stay within
+    the budget. Connection failures and timeouts are reported to the breaker
+    and raised as DatabaseUnavailableError; other driver errors (duplicate
+    keys, validation) pass through unchanged.
+    """
+
+    __slots__ = ("_collection", "_breaker", "_tenant")
+
+    def __init__(self, collection, breaker: CircuitBreaker = mongo_breaker, tenant: Optional[Tenant] = None):
+        self._collection = collection
+        self._breaker = breaker
+        self._tenant = tenant
+
+    def __getattr__(self, name: str):
+        return getattr(self._collection, name)
+
+    async def _call(self, method: str, *args, **kwargs):
+        if self._tenant is None:
+            return await self._guarded(method, args, kwargs)
+
+        tenant = self._tenant
+        inflight = TENANT_MONGO_INFLIGHT.labels(tenant.id)
+        started = time.perf_counter()
+        inflight.inc()
+        try:
+            if tenant.slots is None:
+                return await self._guarded(method, args, kwargs)
+            await self._acquire_slot(tenant)
+            try:
+                return await self._guarded(method, args, kwargs)
+            finally:
+                tenant.slots.release()
+        finally:
+            inflight.dec()
+            TENANT_MONGO_OPERATIONS.labels(tenant.id, method).inc()
+            TENANT_MONGO_DURATION.labels(tenant.id).observe(time.perf_counter() - started)
+
+    @staticmethod
+    async def _acquire_slot(tenant: Tenant) -> None:
+        """Wait for one of the tenant's max_connections slots within the request budget"""
+        budget = remaining()
+        try:
+            await asyncio.wait_for(tenant.slots.acquire(), budget)
+        except asyncio.TimeoutError:
+            logger.warning("Tenant %s used all %s MongoDB slots for the whole request budget",
+                           tenant.id, tenant.max_connections)
+            raise DatabaseUnavailableError("Too many concurrent database operations") from None
+
+    async def _guarded(self, method: str, args, kwargs):
+        breaker = self._breaker
+        check_deadline()
+        if not breaker.allow_request():
+            raise DatabaseUnavailableError(retry_after=breaker.retry_after())
+
+        budget = remaining()
+        limit = _client_options.get("serverSelectionTimeoutMS", DEFAULT_SERVER_SELECTION_TIMEOUT_MS) / 1000
+        if budget is not None:
+            limit = min(limit, budget)
+        try:
+            # Context variables reach Motor's executor threads
+            with pymongo.timeout(limit):
+                operation = self._find_list if method == "find" else getattr(self._collection, method)
+                result = await operation(*args, **kwargs)
+        except PyMongoError as e:
+            if not _is_unavailable(e):
+                breaker.record_success()
+                raise
+            if budget is None or budget >= _MIN_BUDGET_FOR_FAILURE:
+                breaker.record_failure()
+            logger.warning("MongoDB %s failed: %s", method, e)
+            raise DatabaseUnavailableError(retry_after=breaker.retry_after()) from e
+
+        breaker.record_success()
+        return result
+
+    async def _find_list(self, filter: Dict, projection: Optional[Dict] = None, *,
+                         sort: Optional[Tuple[str, int]] = None, limit: int = 0) -> List[Dict]:
+        cursor = self._collection.find(filter, projection)
+        if sort is not None:
+            cursor = cursor.sort(*sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(None)
+
+    async def find_list(self, filter: Dict, projection: Optional[Dict] = None, *,
+                        sort: Optional[Tuple[str, int]] = None, limit: int = 0) -> List[Dict]:
+        """
+        find() read into a list in one guarded operation
+
+        Args:
+            filter: Query
+            projection: Fields to return
+            sort: (field, direction)
+            limit: Maximum number of documents (0 = no limit; keep it bounded)
+
+        Returns:
+            Matching documents
+        """
+        return await self._call("find", filter, projection, sort=sort, limit=limit)
+
+    async def find_one(self, *args, **kwargs):
+        return await self._call("find_one", *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._call("insert_one", *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._call("update_one", *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._call("update_many", *args, **kwargs)
+
+    async def replace_one(self, *args, **kwargs):
+        return await self._call("replace_one", *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._call("delete_one", *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._call("delete_many", *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._call("bulk_write", *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._call("find_one_and_update", *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await self._call("count_documents", *args, **kwargs)
+
+    async def create_index(self, *args, **kwargs):
+        return await self._call("create_index", *args, **kwargs)
 
 
 async def connect_to_mongo():
     """
     Connect to MongoDB database
     
-    Creates an async MongoDB client and establishes connection
+    Creates an async MongoDB client and establishes connection. The client
+    is constructed in a thread because pymongo resolves mongodb+srv:// hosts
+    synchronously there; the connectivity check and pool warm-up run as one
+    batch of concurrent pings, and index creation continues in the background.
     """
-    global _mongo_client, _database
+    global _mongo_client, _database, _index_task, _client_options
     
     try:
-        # Create async MongoDB client
-        _mongo_client = AsyncIOMotorClient(
+        _client_options = options = mongo_client_options()
+        
+        # Create async MongoDB client (SRV lookup happens off the event loop)
+        _mongo_client = await asyncio.to_thread(
+            AsyncIOMotorClient,
             settings.MONGODB_URI,
-            serverSelectionTimeoutMS=5000,
-            maxPoolSize=10,
-            minPoolSize=1
+            event_listeners=get_event_listeners(),
+            **options
         )
         
         # Get database reference
         _database = _mongo_client[settings.DATABASE_NAME]
         
-        # Test connection
-        await _mongo_client.admin.command('ping')
+        # Let the slow command profiler run explain() on this client
+        slow_command_profiler.attach(_mongo_client, asyncio.get_running_loop())
         
-        print(f"[OK] Connected to MongoDB: {settings.DATABASE_NAME}")
+        # Tenants moved to their own cluster get their own pool and breaker
+        for tenant in tenant_registry.tenants.values():
+            if tenant.dedicated:
+                await _connect_tenant(tenant, options)
         
-        # Create indexes for better performance
-        await _database[settings.COLLECTION_NAME].create_index("email", unique=True)
-        print("[OK] Database indexes created")
+        # Test connection and open pooled connections before accepting requests
+        await warm_pool(settings.MONGO_WARMUP_CONNECTIONS)
+        
+        logger.info("Connected to MongoDB: %s (profile %s, maxPoolSize %s)",
+                    settings.DATABASE_NAME, settings.ENVIRONMENT,
+                    options.get("maxPoolSize", DEFAULT_MAX_POOL_SIZE))
+        
+        # Index management is not needed to serve requests
+        if settings.MONGO_ENSURE_INDEXES:
+            _index_task = asyncio.create_task(ensure_indexes())
         
     except Exception as e:
-        print(f"[ERROR] Failed to connect to MongoDB: {e}")
+        logger.error("Failed to connect to MongoDB: %s", e)
         raise
 
 
+async def _connect_tenant(tenant: Tenant, options: Dict[str, Any]) -> None:
+    """Create the client of a tenant with its own mongodb_uri (connects lazily)"""
+    tenant_options = dict(options)
+    if tenant.max_pool_size:
+        tenant_options["maxPoolSize"] = tenant.max_pool_size
+    _tenant_clients[tenant.id] = await asyncio.to_thread(
+        AsyncIOMotorClient,
+        tenant.mongodb_uri,
+        event_listeners=get_event_listeners(tenant.id),
+        **tenant_options
+    )
+    # Slow commands of this tenant are explained on its own cluster
+    slow_command_profiler.attach(_tenant_clients[tenant.id], asyncio.get_running_loop(), tenant.id)
+    _tenant_breakers[tenant.id] = CircuitBreaker(
+        f"mongodb-{tenant.id}",
+        failure_threshold=settings.MONGO_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=settings.MONGO_BREAKER_RESET_SECONDS
+    )
+    logger.info("Tenant %s uses its own MongoDB cluster (maxPoolSize %s)",
+                tenant.id, tenant_options.get("maxPoolSize", DEFAULT_MAX_POOL_SIZE))
+
+
+async def warm_pool(connections: int) -> None:
+    """
+    Ping MongoDB over several connections at once
+
+    Concurrent pings each need their own connection, so the pool grows to
+    `connections` (capped by maxPoolSize) instead of paying the TCP/TLS
+    handshake on the first requests after startup.
+
+    Args:
+        connections: Number of connections to open (at least one ping is sent)
+
+    Raises:
+        Exception: If MongoDB cannot be reached
+    """
+    count = max(1, min(connections, _client_options.get("maxPoolSize", DEFAULT_MAX_POOL_SIZE)))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _mongo_client.admin.command('ping') for _ in range(count)
+    ))
+    logger.info("MongoDB pool warmed: %s connections in %.0fms",
+                count, (time.perf_counter() - started) * 1000)
+
+
+async def ensure_indexes() -> None:
+    """
+    Create the indexes the application relies on
+
+    Runs as a background task after startup, for every tenant's users
+    collection; failures are logged since an existing deployment already has
+    its indexes.
+    """
+    global _indexes_ready
+    try:
+        for tenant in tenant_registry.tenants.values():
+            users = _tenant_database(tenant)[tenant.collection]
+            await users.create_index("email", unique=True)
+            await users.create_index([("_id", 1), ("version", 1)], name=USER_VERSION_INDEX)
+        _indexes_ready = True
+        logger.info("Database indexes created")
+    except Exception as e:
+        logger.error("Failed to create database indexes: %s", e)
+
+
 async def close_mongo_connection():
     """
     Close MongoDB connection
     
     Properly closes the MongoDB client connection
     """
-    global _mongo_client, _database
+    global _mongo_client, _database, _index_task, _indexes_ready
+    
+    _indexes_ready = False
+    if _index_task is not None and not _index_task.done():
+        _index_task.cancel()
+    _index_task = None
+    
+    for client in _tenant_clients.values():
+        client.close()
+    _tenant_clients.clear()
+    _tenant_breakers.clear()
     
     if _mongo_client:
+        slow_command_profiler.detach()
         _mongo_client.close()
         _mongo_client = None
         _database = None
-        print("[OK] MongoDB connection closed")
+        logger.info("MongoDB connection closed")
 
 
 def get_database():
@@ -64,13 +478,115 @@ def get_database():
     Get the current database instance
     
     Returns:
-        Database instance or None if not connected
+        Database instance
+    
+    Raises:
+        DatabaseUnavailableError: If not connected
     """
     if _database is None:
-        print("[WARNING] Database not initialized")
+        logger.warning("Database not initialized")
+        raise DatabaseUnavailableError()
     return _database
 
 
+def get_collection(name: str) -> GuardedCollection:
+    """
+    Get a collection whose operations go through the MongoDB circuit breaker
+    
+    Args:
+        name: Collection name
+    
+    Returns:
+        Guarded collection
+    
+    Raises:
+        DatabaseUnavailableError: If not connected
+    """
+    return GuardedCollection(get_database()[name])
+
+
+def _tenant_database(tenant: Tenant):
+    client = _tenant_clients.get(tenant.id)
+    if client is not None:
+        return client[tenant.database]
+    if tenant.database == settings.DATABASE_NAME:
+        return get_database()
+    if _mongo_client is None:
+        raise DatabaseUnavailableError()
+    return _mongo_client[tenant.database]
+
+
+def get_users_collection() -> GuardedCollection:
+    """
+    Get the current tenant's users collection
+
+    Operations go through the tenant's circuit breaker and count toward its
+    max_connections and metrics.
+
+    Returns:
+        Guarded collection
+
+    Raises:
+        DatabaseUnavailableError: If not connected
+    """
+    return get_tenant_collection(current_tenant().collection)
+
+
+def get_tenant_collection(name: str) -> GuardedCollection:
+    """
+    Get a collection in the current tenant's database (e.g. a users archive)
+
+    Args:
+        name: Collection name
+
+    Returns:
+        Guarded collection, like get_users_collection()
+
+    Raises:
+        DatabaseUnavailableError: If not connected
+    """
+    tenant = current_tenant()
+    return GuardedCollection(
+        _tenant_database(tenant)[name],
+        breaker=_tenant_breakers.get(tenant.id, mongo_breaker),
+        tenant=tenant
+    )
+
+
+def get_tenant_circuits() -> Dict[str, Dict]:
+    """
+    Circuit breaker state of every tenant's cluster
+
+    Returns:
+        Breaker snapshot per tenant ID (tenants on the shared cluster report
+        the shared breaker)
+    """
+    return {
+        tenant_id: _tenant_breakers.get(tenant_id, mongo_breaker).snapshot()
+        for tenant_id in tenant_registry.tenants
+    }
+
+
+def indexes_ready() -> bool:
+    """
+    Whether ensure_indexes() has created every index in this process
+
+    Returns:
+        True once the indexes exist, so queries may hint them
+    """
+    return _indexes_ready
+
+
+def get_client_options() -> Dict[str, Any]:
+    """
+    Get the options the MongoDB client was created with
+
+    Returns:
+        Client keyword arguments, empty if not connected
+    """
+    return dict(_client_options)
+
+
 def get_client() -> Optional[AsyncIOMotorClient]:
     """
     Get the MongoDB client instance
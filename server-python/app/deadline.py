@@ -0,0 +1,83 @@
+"""
+Request Deadlines - Time budget shared by every downstream call of a request
+
+DeadlineMiddleware starts the budget when a request arrives. MongoDB calls
+made through app.database.get_collection() run under pymongo.timeout() with
+the remaining time, which covers server selection and pool checkout and is
+sent to the server as maxTimeMS; outbound HTTP calls take their timeout from
+outbound_timeout().
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Absolute time.monotonic() deadline of the current request, None outside requests
+_deadline_var: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """The request used up its time budget before a downstream call"""
+
+
+def start_deadline(seconds: float):
+    """
+    Start a time budget for the current context
+
+    Args:
+        seconds: Budget in seconds
+
+    Returns:
+        Token for reset_deadline()
+    """
+    return _deadline_var.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token) -> None:
+    """Restore the deadline that was active before start_deadline()"""
+    _deadline_var.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left in the current request's budget
+
+    Returns:
+        Remaining seconds (may be negative), or None without a deadline
+    """
+    deadline = _deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    Raise if the current request has no time left
+
+    Raises:
+        DeadlineExceededError: If the budget is used up
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError()
+
+
+def outbound_timeout(default: float) -> float:
+    """
+    Timeout for an outbound HTTP call
+
+    Args:
+        default: Timeout the call uses on its own
+
+    Returns:
+        The smaller of the default and the remaining budget
+
+    Raises:
+        DeadlineExceededError: If the budget is used up
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceededError()
+    return min(default, left)
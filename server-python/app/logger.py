@@ -0,0 +1,229 @@
+"""
+Structured Logging - JSON logs written off the event loop
+
+Log calls on the event loop only build a LogRecord and put it on a queue.
+Message formatting, JSON encoding and the write to stdout happen on a
+QueueListener thread, so a slow stdout pipe never stalls request handling.
+Request IDs are attached from a context variable, and repetitive info/debug
+messages are sampled per message template. Warnings, errors and records
+logged with extra={NEVER_DROP: True} are never sampled, and go to a small
+overflow buffer drained by the writer when the queue is full; logging never
+blocks. Every dropped record is counted in log_records_dropped_total.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from app.config import settings
+from app.monitoring.metrics import Counter
+
+# Request ID of the request being handled in the current task
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# extra= key for info records that must get through, e.g. dev reset codes
+NEVER_DROP = "_never_drop"
+
+# Room for NEVER_DROP/warning records that arrive while the queue is full
+_OVERFLOW_SIZE = 1000
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped by sampling or a full queue",
+    ("reason",)
+)
+
+
+def _never_drop(record: logging.LogRecord) -> bool:
+    return record.levelno >= logging.WARNING or getattr(record, NEVER_DROP, False)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the current request ID while still on the caller's task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Cap repetitive info/debug messages per message template
+
+    Each (logger, template) pair may emit `per_second` records per second;
+    extra records are dropped and the count of dropped records is attached
+    to the next one that gets through. Warnings, errors and NEVER_DROP
+    records are never sampled.
+    """
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or _never_drop(record):
+            return True
+
+        key = (record.name, record.msg)
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or window[0] != second:
+                dropped = window[2] if window else 0
+                window = [second, 0, 0]
+                self._windows[key] = window
+                if dropped:
+                    record.sampled_dropped = dropped
+            window[1] += 1
+            if window[1] > self.per_second:
+                window[2] += 1
+                LOG_RECORDS_DROPPED.labels("sampled").inc()
+                return False
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+
+    The stock QueueHandler formats the message in prepare(), on the caller's
+    thread. Records are passed through untouched instead; log arguments are
+    expected to be immutable values (strings, numbers), as they are here.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: Optional[deque] = None):
+        super().__init__(log_queue)
+        self.overflow = overflow
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the event loop on logging; drop when the writer lags,
+            # except for records that must get through while the overflow has room
+            if self.overflow is not None and _never_drop(record) and len(self.overflow) < _OVERFLOW_SIZE:
+                self.overflow.append(record)
+                return
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+class OverflowQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that also writes the handler's overflow records
+
+    The overflow only fills while the queue is full, so the records that
+    follow in the queue give the writer thread a chance to drain it.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: deque, *handlers, **kwargs):
+        super().__init__(log_queue, *handlers, **kwargs)
+        self.overflow = overflow
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self._drain()
+
+    def stop(self) -> None:
+        super().stop()
+        self._drain()
+
+    def _drain(self) -> None:
+        while self.overflow:
+            try:
+                super().handle(self.overflow.popleft())
+            except IndexError:
+                break
+
+
+def setup_logging() -> None:
+    """
+    Route the root logger through a bounded queue to a JSON stdout writer
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    overflow: deque = deque()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    queue_handler = DeferredQueueHandler(log_queue, overflow)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_PER_SECOND))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = OverflowQueueListener(log_queue, overflow, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork() -> None:
+    """
+    Give a forked child (preloaded server worker) its own writer thread
+
+    Threads do not survive fork(), and the inherited queue may hold a lock
+    taken mid-put, so the child starts over with a fresh queue and listener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener = None
+        setup_logging()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
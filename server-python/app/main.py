@@ -1,28 +1,110 @@
-import httpx
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.database import (
+    DatabaseUnavailableError,
+    close_mongo_connection,
+    connect_to_mongo,
+    get_users_collection,
+    mongo_breaker
+)
 from app.config import settings
+from app.deadline import DeadlineExceededError
+from app.logger import setup_logging, shutdown_logging
+from app.responses import FastJSONResponse, trusted_response
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.loop_monitor import LoopMonitorMiddleware
+from app.middleware.metrics import MetricsMiddleware, route_label
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.middleware.tenant import TenantMiddleware
+from app.middleware.traffic_capture import TrafficCaptureMiddleware, stop_capture_writer
+from app.monitoring.health import dependency_checker
+from app.monitoring.loop_monitor import loop_monitor
+from app.monitoring.memory import register_structure, start_tracing
+from app.monitoring.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    RATE_LIMIT_REJECTIONS,
+    render_all_workers,
+    render_metrics,
+    series_count,
+    write_snapshots
+)
 from app.models import RegistrationRequest, RegistrationResponse
 from app.auth.password import hash_password
-from app.routes import auth, password_reset
+from app.routes import admin, auth, password_reset
+from app.scheduler import scheduler
+from app.services.erasure import register_erasure_jobs, stop_jobs as stop_erasure_jobs
+from app.services.maintenance import register_maintenance_jobs
+from app.services.user_schema import new_user_document, register_migration_jobs
 from app.services.user_service import get_user_by_email
+from app.services.welcome_service import close_welcome_client, get_welcome_message
+from app.tenancy import tenant_rate_limit, tenant_remote_address
+
+# Structured logging through a background writer thread
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=tenant_remote_address)
+
+
+def import_deferred_modules() -> None:
+    """
+    Import the SDKs kept off the startup path
+
+    httpx and authlib are imported on first use; this loads them ahead of
+    that first use, either in the preloading server master or in a thread
+    once the worker is already serving.
+    """
+    import httpx  # noqa: F401
+    if settings.GOOGLE_CLIENT_ID or settings.FACEBOOK_APP_ID:
+        from app.auth.oauth import get_oauth
+        get_oauth()
+
 
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    if settings.TRACEMALLOC_ON_STARTUP:
+        start_tracing(settings.TRACEMALLOC_FRAMES)
+    loop_monitor.start(detect_blocking=settings.LOOP_BLOCKING_DETECTOR_ENABLED)
+    # Overlaps with the SRV lookup and pool warm-up instead of adding to them
+    deferred_imports = asyncio.create_task(asyncio.to_thread(import_deferred_modules))
     await connect_to_mongo()
+    dependency_checker.start(after=deferred_imports)
+    metrics_snapshots = None
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROCESS_DIR:
+        metrics_snapshots = asyncio.create_task(
+            write_snapshots(settings.METRICS_MULTIPROCESS_DIR, settings.METRICS_SNAPSHOT_INTERVAL_SECONDS)
+        )
+    if settings.SCHEDULER_ENABLED:
+        register_maintenance_jobs(scheduler)
+        register_erasure_jobs(scheduler)
+        register_migration_jobs(scheduler)
+        scheduler.start()
     yield
     # Shutdown
+    await scheduler.stop()
+    await stop_erasure_jobs()
+    await dependency_checker.stop()
+    if metrics_snapshots is not None:
+        metrics_snapshots.cancel()
+        await asyncio.gather(metrics_snapshots, return_exceptions=True)
+    await deferred_imports
+    await close_welcome_client()
     await close_mongo_connection()
+    await loop_monitor.stop()
+    stop_capture_writer()
+    shutdown_logging()
 
 
 # Initialize FastAPI app
@@ -32,12 +114,62 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Count rate limit rejections per route before delegating to slowapi"""
+    RATE_LIMIT_REJECTIONS.labels(route_label(request.scope)).inc()
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+# Report per-key in-process state on the admin memory endpoint
+register_structure("rate_limiter_keys", lambda: len(limiter._storage.storage))
+register_structure("auth_rate_limiter_keys", lambda: len(auth.limiter._storage.storage))
+register_structure("metric_series", series_count)
+
+
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    """Fail fast with 503 while MongoDB is unreachable or its circuit is open"""
+    return FastJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError):
+    """The request used up REQUEST_DEADLINE_SECONDS before finishing its downstream calls"""
+    return FastJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Request timed out. Please try again"},
+        headers={"Retry-After": "1"}
+    )
+
+
 # Add rate limiter to app state
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.add_exception_handler(DatabaseUnavailableError, database_unavailable_handler)
+app.add_exception_handler(DeadlineExceededError, deadline_exceeded_handler)
+
+# On-demand sampling profiler (header or admin toggle)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Label request tasks so blocking-call reports name the route
+if settings.LOOP_BLOCKING_DETECTOR_ENABLED:
+    app.add_middleware(LoopMonitorMiddleware)
+
+# Idempotency keys for retried mutating requests
+if settings.IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware)
+
+# Shed load per route before any work is done for the request; inside CORS
+# so browsers can read the 503 and its Retry-After
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
 
 # CORS Configuration
 app.add_middleware(
@@ -52,25 +184,78 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "Idempotency-Key", "If-None-Match"],
+    expose_headers=["Idempotent-Replayed", "ETag", "Retry-After"],
+    # Browsers reuse a preflight this long (Chromium caps it at 2 hours)
+    max_age=settings.CORS_MAX_AGE_SECONDS,
 )
 
+# Time budget for MongoDB and outbound HTTP calls of each request
+app.add_middleware(DeadlineMiddleware)
+
+# Anonymized traffic capture for tools/replay_traffic.py
+if settings.TRAFFIC_CAPTURE_ENABLED:
+    app.add_middleware(TrafficCaptureMiddleware)
+
+# Tenant of the request (Host header or token claim) for storage and limits
+app.add_middleware(TenantMiddleware)
+
+# Request IDs for log correlation
+app.add_middleware(RequestIdMiddleware)
+
+# Request metrics (outermost, so they include time spent in other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(password_reset.router)
+app.include_router(admin.router)
+
+
+# Health check endpoints
+@app.get("/livez", tags=["Health"])
+async def livez():
+    """Liveness probe: the process is serving requests (no I/O)"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz", tags=["Health"])
+async def readyz():
+    """Readiness probe from the cached background dependency checks (no I/O)"""
+    readiness = dependency_checker.readiness()
+    readiness["database_circuit"] = mongo_breaker.state
+    if not readiness["ready"]:
+        return FastJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=readiness)
+    return readiness
 
 
-# Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health():
     """Health check endpoint"""
-    db = get_database()
+    mongodb = dependency_checker.result("mongodb")
+    circuit = mongo_breaker.snapshot()
+    connected = mongodb is not None and mongodb["ok"]
     return {
-        "status": "ok",
-        "database": "connected" if db is not None else "disconnected"
+        "status": "ok" if connected and circuit["state"] == "closed" else "degraded",
+        "database": "connected" if connected else "disconnected",
+        "database_circuit": circuit
     }
 
 
+# Metrics endpoint
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (all server workers when they share a metrics directory)"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_MULTIPROCESS_DIR:
+        body = await asyncio.to_thread(render_all_workers, settings.METRICS_MULTIPROCESS_DIR)
+    else:
+        body = render_metrics()
+    return PlainTextResponse(body, media_type=METRICS_CONTENT_TYPE)
+
+
 # Registration endpoint (kept from original)
 @app.post(
     "/api/register",
@@ -78,7 +263,7 @@ async def health():
     summary="User Registration",
     description="Register a new user with email and password"
 )
-@limiter.limit("5/minute")
+@limiter.limit(tenant_rate_limit("register"))
 async def register(request: Request, user_data: RegistrationRequest):
     """
     Register a new user
@@ -90,7 +275,6 @@ async def register(request: Request, user_data: RegistrationRequest):
     - Calls Node.js service for welcome message (optional)
     """
     # Check if user already exists
-    db = get_database()
     existing = await get_user_by_email(user_data.email)
     
     if existing:
@@ -99,42 +283,24 @@ async def register(request: Request, user_data: RegistrationRequest):
             detail="Email already registered"
         )
     
-    # Hash password
-    password_hash = hash_password(user_data.password)
-    
-    # Create user document
-    from datetime import datetime
-    user_doc = {
-        "name": user_data.name,
-        "email": user_data.email,
-        "password_hash": password_hash,
-        "social_provider": None,
-        "social_provider_id": None,
-        "created_at": datetime.utcnow(),
-        "last_login": None,
-        "is_verified": False,
-        "reset_code": None,
-        "reset_code_expires": None
-    }
+    # Create user document with the hashed password
+    user_doc = new_user_document(
+        user_data.name,
+        user_data.email,
+        password_hash=hash_password(user_data.password)
+    )
     
     # Insert into MongoDB
-    await db[settings.COLLECTION_NAME].insert_one(user_doc)
+    await get_users_collection().insert_one(user_doc)
     
     # Try to get welcome message from Node.js service
-    welcome_msg = "Welcome to our platform!"
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(settings.NODE_WELCOME_SERVICE_URL, timeout=5.0)
-            if response.status_code == 200:
-                welcome_msg = response.json().get("message", welcome_msg)
-    except Exception as e:
-        print(f"[WARNING] NodeJS Service not reachable: {e}")
+    welcome_msg = await get_welcome_message()
     
-    return {
+    return trusted_response(RegistrationResponse, {
         "success": True,
         "message": "User registered successfully",
         "welcome_message": welcome_msg
-    }
+    })
 
 
 # Root endpoint
@@ -145,7 +311,9 @@ async def root():
         "message": "Authentication API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "liveness": "/livez",
+        "readiness": "/readyz"
     }
 
 
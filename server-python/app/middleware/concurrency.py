@@ -0,0 +1,214 @@
+"""
+Concurrency Limit Middleware - Adaptive per-route caps on in-flight requests
+
+Each route gets a concurrency limit that follows its observed latency with
+AIMD: while requests complete close to the route's baseline latency and the
+limit is actually in use, it grows by about one per limit-worth of
+completions; when a short-term latency average rises above `tolerance`
+times the long-term baseline, it shrinks by at least `backoff` (more the
+further latency overshoots, down to half), at most once per baseline
+latency. Requests over the limit are rejected immediately with 503 and
+Retry-After rather than queued, so a slow MongoDB or a pile-up of bcrypt
+work cannot stretch the latency of everything behind it.
+
+Probe and scrape endpoints (CONCURRENCY_EXEMPT_PATHS) and CORS preflights
+are never limited, so they keep answering while the API sheds load.
+"""
+import json
+import time
+from typing import Dict, Optional, Set
+from app.config import settings
+from app.monitoring.metrics import Counter, Gauge
+
+CONCURRENCY_LIMIT = Gauge(
+    "http_concurrency_limit",
+    "Current adaptive concurrency limit per route",
+    ("route",)
+)
+
+CONCURRENCY_REJECTIONS = Counter(
+    "http_concurrency_rejections_total",
+    "Requests rejected because their route was at its concurrency limit",
+    ("route",)
+)
+
+# Latency below which a route is never considered congested; sub-millisecond
+# routes would otherwise react to scheduling noise
+_LATENCY_FLOOR = 0.005
+
+# Key for paths that are not a static route (path parameters, 404s)
+OTHER_ROUTES = "other"
+
+_REJECTED_BODY = json.dumps({"detail": "Server is busy. Please retry shortly"}).encode()
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit for one route, driven by request latency"""
+
+    __slots__ = (
+        "route", "limit", "inflight", "short_latency", "long_latency",
+        "last_decrease", "rejected", "_gauge"
+    )
+
+    def __init__(self, route: str):
+        self.route = route
+        self.limit = float(settings.CONCURRENCY_INITIAL_LIMIT)
+        self.inflight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self.rejected = 0
+        self._gauge = CONCURRENCY_LIMIT.labels(route)
+        self._gauge.set(int(self.limit))
+
+    def try_acquire(self) -> bool:
+        """Take a slot if the route is under its limit"""
+        if self.inflight >= int(self.limit):
+            self.rejected += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, latency: float) -> None:
+        """
+        Free the slot and adapt the limit to the request's latency
+
+        Args:
+            latency: Seconds the request took
+        """
+        inflight = self.inflight
+        self.inflight -= 1
+
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+            return
+
+        self.short_latency += (latency - self.short_latency) * 0.2
+        # The baseline is a decaying minimum: it drops to any faster request
+        # and only drifts up slowly, so sustained overload (even from the
+        # first request on) does not become the new normal
+        if latency < self.long_latency:
+            self.long_latency = latency
+        else:
+            self.long_latency += (latency - self.long_latency) * 0.001
+
+        now = time.monotonic()
+        target = max(self.long_latency * settings.CONCURRENCY_LATENCY_TOLERANCE, _LATENCY_FLOOR)
+        if self.short_latency > target:
+            # One decrease per baseline latency: the requests completing right
+            # after a decrease were admitted under the old limit
+            if now - self.last_decrease >= self.long_latency:
+                factor = max(0.5, min(settings.CONCURRENCY_BACKOFF, target / self.short_latency))
+                self.limit = max(settings.CONCURRENCY_MIN_LIMIT, self.limit * factor)
+                self.last_decrease = now
+        elif inflight * 2 >= self.limit:
+            # Only grow a limit that is being used
+            self.limit = min(settings.CONCURRENCY_MAX_LIMIT, self.limit + 1 / self.limit)
+
+        self._gauge.set(int(self.limit))
+
+    def snapshot(self) -> Dict:
+        """Limit, occupancy and latency estimates for the admin report"""
+        return {
+            "route": self.route,
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "short_latency_ms": round(self.short_latency * 1000, 2) if self.short_latency is not None else None,
+            "baseline_latency_ms": round(self.long_latency * 1000, 2) if self.long_latency is not None else None,
+            "rejected": self.rejected
+        }
+
+
+class ConcurrencyLimiter:
+    """Per-route adaptive limits, keyed by method and static route path"""
+
+    def __init__(self):
+        self.exempt_paths: Set[str] = {
+            path.strip() for path in settings.CONCURRENCY_EXEMPT_PATHS.split(",") if path.strip()
+        }
+        self._limits: Dict[str, AdaptiveLimit] = {}
+        self._static_routes: Optional[Set[str]] = None
+
+    def route_key(self, scope) -> str:
+        """
+        Bounded key for a request: "METHOD /path" for static routes
+
+        Routing has not run yet at this point, so method and path are matched
+        against the application's routes without parameters; everything else,
+        including methods no route accepts, shares one limit.
+        """
+        if self._static_routes is None:
+            self._static_routes = {
+                f"{method} {route.path}"
+                for route in scope["app"].routes
+                if hasattr(route, "path") and "{" not in route.path
+                for method in getattr(route, "methods", None) or ()
+            }
+        key = f"{scope['method']} {scope['path']}"
+        if key in self._static_routes:
+            return key
+        return OTHER_ROUTES
+
+    def limit_for(self, key: str) -> AdaptiveLimit:
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = AdaptiveLimit(key)
+        return limit
+
+    def snapshot(self) -> Dict:
+        """
+        Current limits for the admin API
+
+        Returns:
+            Settings and one entry per route seen so far
+        """
+        return {
+            "enabled": settings.CONCURRENCY_LIMIT_ENABLED,
+            "exempt_paths": sorted(self.exempt_paths),
+            "routes": sorted(
+                (limit.snapshot() for limit in self._limits.values()),
+                key=lambda entry: entry["route"]
+            )
+        }
+
+
+concurrency_limiter = ConcurrencyLimiter()
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware applying the adaptive per-route concurrency limits"""
+
+    def __init__(self, app, limiter: Optional[ConcurrencyLimiter] = None):
+        self.app = app
+        self.limiter = limiter or concurrency_limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in self.limiter.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = self.limiter.route_key(scope)
+        limit = self.limiter.limit_for(key)
+        if not limit.try_acquire():
+            CONCURRENCY_REJECTIONS.labels(key).inc()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_REJECTED_BODY)).encode()),
+                    (b"retry-after", b"1")
+                ]
+            })
+            await send({"type": "http.response.body", "body": _REJECTED_BODY})
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - started)
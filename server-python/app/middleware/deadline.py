@@ -0,0 +1,30 @@
+"""
+Deadline Middleware - Per-request time budget for downstream calls
+"""
+from app.config import settings
+from app.deadline import reset_deadline, start_deadline
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving each request REQUEST_DEADLINE_SECONDS
+
+    MongoDB operations and outbound HTTP calls made while handling the
+    request take their timeouts from what is left of the budget, so a slow
+    dependency cannot hold a request longer than the budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.budget = settings.REQUEST_DEADLINE_SECONDS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_deadline(self.budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
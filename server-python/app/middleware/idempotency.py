@@ -0,0 +1,368 @@
+"""
+Idempotency Middleware - Replay stored responses for retried requests
+
+Clients send an Idempotency-Key header on mutating requests. The first
+response for a key is stored and replayed byte-for-byte on retries, and
+duplicates that arrive while the original is still running wait for it
+instead of re-running bcrypt and MongoDB writes.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo.errors import DuplicateKeyError
+from app.config import settings
+from app.database import DatabaseUnavailableError, get_collection
+from app.monitoring.memory import register_structure
+from app.tenancy import current_tenant
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Server errors and throttling responses are never replayed so retries can succeed
+UNCACHEABLE_STATUSES = {409, 429}
+
+
+class IdempotencyConflict(Exception):
+    """Raised when another request with the same key is still in progress"""
+
+
+class MemoryIdempotencyStore:
+    """Bounded in-process store with a TTL per entry"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Look up a completed response for the key
+
+        In-process duplicates are coordinated by the middleware itself, so
+        claiming only has to check for a stored response.
+
+        Returns:
+            Stored response record or None if the caller should process it
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+
+        return record
+
+    async def complete(self, key: str, record: Dict) -> None:
+        """Store the response record for the key"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, record)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def release(self, key: str) -> None:
+        """Forget a key whose response is not being stored"""
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MongoIdempotencyStore:
+    """
+    Shared store backed by a MongoDB collection with a TTL index
+
+    A pending document marks a key as in progress across workers and nodes;
+    it is replaced by the response record once the original request finishes.
+    """
+
+    def __init__(self, ttl_seconds: int, wait_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self._indexes_ready = False
+
+    def _collection(self):
+        return get_collection(settings.IDEMPOTENCY_COLLECTION_NAME)
+
+    async def _ensure_indexes(self, collection) -> None:
+        if self._indexes_ready:
+            return
+        await collection.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[Dict]:
+        """
+        Claim the key or return the stored response
+
+        Returns:
+            Stored response record or None if the caller now owns the key
+
+        Raises:
+            IdempotencyConflict: If the key stays pending past the wait time
+        """
+        collection = self._collection()
+
+        await self._ensure_indexes(collection)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            now = datetime.utcnow()
+            try:
+                await collection.insert_one({
+                    "_id": key,
+                    "state": "pending",
+                    "fingerprint": fingerprint,
+                    "expires_at": now + timedelta(seconds=max(60, self.wait_seconds))
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+
+            doc = await collection.find_one({"_id": key})
+            if doc is None:
+                continue
+
+            if doc["state"] == "completed":
+                return doc["record"]
+
+            if doc["expires_at"] < now:
+                # Owner died without completing; take the key over
+                await collection.delete_one({"_id": key, "state": "pending", "expires_at": doc["expires_at"]})
+                continue
+
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+
+            await asyncio.sleep(0.05)
+
+    async def complete(self, key: str, record: Dict) -> None:
+        """Replace the pending marker with the response record"""
+        collection = self._collection()
+
+        await collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "state": "completed",
+                "record": record,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            },
+            upsert=True
+        )
+
+    async def release(self, key: str) -> None:
+        """Drop the pending marker so a retry can process the request"""
+        collection = self._collection()
+
+        await collection.delete_one({"_id": key, "state": "pending"})
+
+
+def create_idempotency_store():
+    """
+    Create the store configured by IDEMPOTENCY_BACKEND
+
+    Returns:
+        MemoryIdempotencyStore or MongoIdempotencyStore
+    """
+    if settings.IDEMPOTENCY_BACKEND == "mongo":
+        return MongoIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_WAIT_SECONDS)
+    return MemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware honouring the Idempotency-Key header"""
+
+    def __init__(self, app, store=None, paths: Optional[List[str]] = None):
+        self.app = app
+        self.store = store or create_idempotency_store()
+        self.paths = set(paths if paths is not None else _split_paths(settings.IDEMPOTENCY_PATHS))
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        register_structure("idempotency_inflight", lambda: len(self._inflight))
+        if hasattr(self.store, "__len__"):
+            register_structure("idempotency_store_entries", lambda: len(self.store))
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in MUTATING_METHODS
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = _header(scope, IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, "Invalid Idempotency-Key header")
+            return
+
+        body = await _read_body(receive)
+        fingerprint = _fingerprint(scope, body)
+        # Keys are per tenant: the same key on another tenant is another request
+        store_key = hashlib.sha256(
+            b"%s %s %s %s" % (current_tenant().id.encode(), scope["method"].encode(), scope["path"].encode(), key)
+        ).hexdigest()
+
+        # Duplicates that arrive while the original runs wait for its response
+        while store_key in self._inflight:
+            try:
+                record = await asyncio.wait_for(
+                    asyncio.shield(self._inflight[store_key]),
+                    timeout=settings.IDEMPOTENCY_WAIT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                await _send_json(send, 409, "A request with this Idempotency-Key is still being processed")
+                return
+            if record is not None:
+                await _replay(record, fingerprint, send)
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[store_key] = future
+        record = None
+
+        try:
+            try:
+                record = await self.store.claim(store_key, fingerprint)
+            except IdempotencyConflict:
+                await _send_json(send, 409, "A request with this Idempotency-Key is still being processed")
+                return
+            except DatabaseUnavailableError as e:
+                await _send_json(send, 503, str(e), [(b"retry-after", str(e.retry_after).encode())])
+                return
+
+            if record is not None:
+                await _replay(record, fingerprint, send)
+                return
+
+            try:
+                record = await self._process(scope, receive, send, body, fingerprint)
+            except BaseException:
+                await self.store.release(store_key)
+                raise
+
+            if record is None:
+                await self.store.release(store_key)
+            else:
+                await self.store.complete(store_key, record)
+        finally:
+            self._inflight.pop(store_key, None)
+            if not future.done():
+                future.set_result(record)
+
+    async def _process(self, scope, receive, send, body: bytes, fingerprint: str) -> Optional[Dict]:
+        """
+        Run the request, streaming the response while recording it
+
+        Returns:
+            Response record, or None if the response must not be replayed
+        """
+        body_sent = False
+        response = {"status": None, "headers": [], "chunks": []}
+
+        async def receive_with_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["chunks"].append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_with_body, send_and_record)
+
+        status = response["status"]
+        if status is None or status >= 500 or status in UNCACHEABLE_STATUSES:
+            return None
+
+        return {
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": response["headers"],
+            "body": b"".join(response["chunks"])
+        }
+
+
+def _split_paths(value: str) -> List[str]:
+    return [path.strip() for path in value.split(",") if path.strip()]
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for header_name, header_value in scope.get("headers", []):
+        if header_name == name:
+            return header_value.strip()
+    return None
+
+
+def _fingerprint(scope, body: bytes) -> str:
+    """Keyed hash of the request so a reused key with a different body is detected"""
+    digest = hmac.new(settings.JWT_SECRET.encode(), digestmod=hashlib.sha256)
+    digest.update(current_tenant().id.encode())
+    digest.update(scope["method"].encode())
+    digest.update(scope["path"].encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(record: Dict, fingerprint: str, send) -> None:
+    """Send a stored response, rejecting keys reused for a different request"""
+    if not hmac.compare_digest(record["fingerprint"], fingerprint):
+        await _send_json(send, 422, "Idempotency-Key was already used with a different request")
+        return
+
+    headers = [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in record["headers"]
+    ]
+    headers.append((REPLAYED_HEADER, b"true"))
+
+    await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": bytes(record["body"])})
+
+
+async def _send_json(send, status_code: int, detail: str, headers: Optional[List] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode())
+        ] + (headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
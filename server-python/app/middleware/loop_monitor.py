@@ -0,0 +1,16 @@
+"""
+Loop Monitor Middleware - Tag request tasks for blocking-call reports
+"""
+from app.monitoring.loop_monitor import loop_monitor
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware labelling each request task with its method and path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            loop_monitor.label_current_task(f"{scope['method']} {scope['path']}")
+        await self.app(scope, receive, send)
@@ -0,0 +1,53 @@
+"""
+Metrics Middleware - Per-route request latency and status counts
+"""
+import time
+from app.monitoring.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION
+
+# Methods labelled as themselves; the method is client-supplied, anything else is "other"
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+def route_label(scope) -> str:
+    """
+    Route template for a request scope, keeping label cardinality bounded
+
+    Args:
+        scope: ASGI scope after routing
+
+    Returns:
+        Path template such as "/api/auth/me", or "unmatched"
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request duration and status per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            method = scope["method"] if scope["method"] in KNOWN_METHODS else "other"
+            route = route_label(scope)
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
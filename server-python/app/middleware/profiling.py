@@ -0,0 +1,51 @@
+"""
+Profiling Middleware - Start the sampling profiler for selected requests
+"""
+import hmac
+from app.config import settings
+from app.monitoring.profiler import profiler
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests enabled by header or admin toggle
+
+    Requests are profiled when they carry an X-Profile-Token header matching
+    PROFILE_TOKEN, or when an admin toggle samples their path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = (settings.PROFILE_TOKEN or "").encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = False
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    forced = hmac.compare_digest(value, self.token)
+                    break
+
+        if not profiler.should_profile(scope["path"], forced):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = profiler.start(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            profiler.finish(profile, status_code)
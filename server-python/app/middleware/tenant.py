@@ -0,0 +1,82 @@
+"""
+Tenant Middleware - Resolve each request's tenant and count its traffic
+"""
+import time
+from jose import JWTError, jwt
+from app.monitoring.metrics import Counter, Histogram
+from app.tenancy import TenantRegistry, reset_current_tenant, set_current_tenant, tenant_registry
+
+TENANT_REQUESTS = Counter(
+    "tenant_requests_total",
+    "HTTP requests per tenant and status class",
+    ("tenant", "status")
+)
+
+TENANT_REQUEST_DURATION = Histogram(
+    "tenant_request_duration_seconds",
+    "HTTP request latency per tenant",
+    ("tenant",)
+)
+
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TenantMiddleware:
+    """
+    ASGI middleware making the request's tenant current
+
+    The Host header decides when it belongs to a tenant. Otherwise (a shared
+    API host) the unverified `tenant` claim of a bearer token does, and
+    get_token_user_id() later rejects the token if its verified claim
+    disagrees. Everything else goes to the default tenant.
+    """
+
+    def __init__(self, app, registry: TenantRegistry = None):
+        self.app = app
+        self.registry = registry or tenant_registry
+
+    def resolve(self, scope):
+        tenant = self.registry.by_host(_header(scope, b"host"))
+        if tenant is not None:
+            return tenant
+
+        authorization = _header(scope, b"authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            try:
+                claim = jwt.get_unverified_claims(authorization[7:].strip()).get("tenant")
+            except JWTError:
+                claim = None
+            # Unverified: anyone can put any JSON value here
+            tenant = self.registry.get(claim) if isinstance(claim, str) else None
+            if tenant is not None:
+                return tenant
+
+        return self.registry.default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tenant = self.resolve(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = set_current_tenant(tenant)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_current_tenant(token)
+            TENANT_REQUEST_DURATION.labels(tenant.id).observe(time.perf_counter() - started)
+            TENANT_REQUESTS.labels(tenant.id, f"{status_code // 100}xx").inc()
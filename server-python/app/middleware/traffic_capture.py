@@ -0,0 +1,219 @@
+"""
+Traffic Capture Middleware - Anonymized request shapes and timing for replay
+
+When TRAFFIC_CAPTURE_ENABLED is set, each sampled request is written as one
+compact JSON line: arrival time, method, route, status, duration and the shape
+of the JSON body. No password, token, reset code or email is written in clear:
+
+- emails, client addresses and Idempotency-Keys become keyed pseudonyms, so
+  retries and reset floods against one account stay recognizable
+- passwords keep only their length bucket and whether they pass the policy
+- every other string keeps only its length
+
+Lines go through a queue to a rotating file on a background thread, like the
+application logs. tools/replay_traffic.py re-issues a capture file.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
+from app.auth.password_policy import get_password_policy
+from app.config import settings
+from app.logger import DeferredQueueHandler
+from app.middleware.metrics import route_label
+
+# Format version written with every record
+CAPTURE_VERSION = 1
+
+PASSWORD_FIELDS = {"password", "new_password"}
+PSEUDONYM_FIELDS = {"email"}
+
+_writer = logging.getLogger("app.traffic_capture")
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def pseudonym(value: str) -> str:
+    """
+    Stable keyed pseudonym for an identifier
+
+    Keyed with JWT_SECRET so pseudonyms cannot be reversed by hashing a list
+    of known addresses, while the same value always maps to the same token.
+
+    Args:
+        value: Email, client address or header value
+
+    Returns:
+        12 hex characters
+    """
+    digest = hmac.new(settings.JWT_SECRET.encode(), b"capture:" + value.strip().lower().encode(), hashlib.sha256)
+    return digest.hexdigest()[:12]
+
+
+def password_shape(value: str) -> Dict:
+    """Length bucket and policy result of a password, never the password"""
+    return {
+        "len": min(len(value) // 4 * 4, 64),
+        "ok": get_password_policy().violation(value) is None
+    }
+
+
+def anonymize(value: Any, field: Optional[str] = None) -> Any:
+    """
+    Reduce a decoded JSON body to its anonymized shape
+
+    Args:
+        value: JSON value (object, array or scalar)
+        field: Name of the object field holding the value
+
+    Returns:
+        Shape safe to write to disk
+    """
+    if isinstance(value, dict):
+        return {key: anonymize(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [anonymize(item) for item in value[:10]]
+    if isinstance(value, str):
+        if field in PASSWORD_FIELDS:
+            return {"pw": password_shape(value)}
+        if field in PSEUDONYM_FIELDS:
+            return {"id": pseudonym(value), "valid": "@" in value}
+        return {"len": len(value)}
+    if isinstance(value, bool) or value is None:
+        return value
+    return type(value).__name__
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _body_shape(body: bytes, content_type: Optional[str]) -> Any:
+    if not body:
+        return None
+    if content_type and "json" not in content_type:
+        return {"bytes": len(body)}
+    try:
+        return anonymize(json.loads(body))
+    except (ValueError, UnicodeDecodeError):
+        return {"bytes": len(body), "invalid_json": True}
+
+
+def start_capture_writer() -> None:
+    """Start the background writer for the capture file (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    directory = os.path.dirname(settings.TRAFFIC_CAPTURE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        settings.TRAFFIC_CAPTURE_PATH,
+        maxBytes=settings.TRAFFIC_CAPTURE_MAX_BYTES,
+        backupCount=settings.TRAFFIC_CAPTURE_BACKUPS
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    capture_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _writer.handlers = [DeferredQueueHandler(capture_queue)]
+    _writer.setLevel(logging.INFO)
+    # Capture records never reach the application log
+    _writer.propagate = False
+
+    _listener = logging.handlers.QueueListener(capture_queue, file_handler)
+    _listener.start()
+
+
+def stop_capture_writer() -> None:
+    """Flush pending records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class TrafficCaptureMiddleware:
+    """ASGI middleware writing one anonymized record per sampled request"""
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.TRAFFIC_CAPTURE_SAMPLE_RATE if sample_rate is None else sample_rate
+        start_capture_writer()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        started = time.perf_counter()
+        status_code = 500
+        chunks = []
+        body_size = 0
+
+        async def receive_and_keep():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= settings.TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                    chunks.append(chunk)
+            return message
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._write(scope, arrived, duration_ms, status_code, b"".join(chunks), body_size)
+
+    def _write(self, scope, arrived: float, duration_ms: float, status_code: int,
+               body: bytes, body_size: int) -> None:
+        record = {
+            "v": CAPTURE_VERSION,
+            "ts": round(arrived, 3),
+            "m": scope["method"],
+            "p": scope["path"],
+            "r": route_label(scope),
+            "s": status_code,
+            "ms": round(duration_ms, 2)
+        }
+
+        if scope.get("query_string"):
+            record["q"] = sorted({key for key, _ in parse_qsl(scope["query_string"].decode("latin-1"))})
+
+        if body_size > settings.TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+            record["b"] = {"bytes": body_size}
+        else:
+            record["b"] = _body_shape(body, _header(scope, b"content-type"))
+
+        client = scope.get("client")
+        if client:
+            record["c"] = pseudonym(client[0])
+
+        authorization = _header(scope, b"authorization")
+        if authorization:
+            record["auth"] = authorization.split(" ", 1)[0].lower()
+
+        idempotency_key = _header(scope, b"idempotency-key")
+        if idempotency_key:
+            record["idem"] = pseudonym(idempotency_key)
+
+        _writer.info(json.dumps(record, separators=(",", ":")))
@@ -1,9 +1,11 @@
 """
 Pydantic Models for API Request/Response Validation
 """
+from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
+from typing import List, Literal, Optional
 import re
+from app.auth.password_policy import get_password_policy
 
 
 class RegistrationRequest(BaseModel):
@@ -20,20 +22,9 @@ class RegistrationRequest(BaseModel):
         - Contains at least one uppercase letter
         - Contains at least one lowercase letter
         - Contains at least one digit
+        - Not a known breached password (when an index is configured)
         """
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one digit')
-        
-        return v
+        return get_password_policy().validate(v)
     
     @validator('name')
     def validate_name(cls, v):
@@ -93,20 +84,8 @@ class PasswordResetComplete(BaseModel):
     
     @validator('new_password')
     def validate_password_strength(cls, v):
-        """Validate new password strength"""
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one digit')
-        
-        return v
+        """Validate new password strength (same policy as registration)"""
+        return get_password_policy().validate(v)
 
 
 class PasswordResetResponse(BaseModel):
@@ -121,8 +100,8 @@ class UserResponse(BaseModel):
     name: str
     email: EmailStr
     social_provider: Optional[str] = None
-    created_at: str
-    last_login: Optional[str] = None
+    created_at: Optional[datetime] = None
+    last_login: Optional[datetime] = None
     is_verified: bool
 
 
@@ -133,3 +112,30 @@ class OAuthCallbackResponse(BaseModel):
     access_token: Optional[str] = None
     token_type: str = "bearer"
     user: Optional[dict] = None
+
+
+class ProfilingToggleRequest(BaseModel):
+    """Admin request to profile a fraction of requests to one path"""
+    path: str = Field(..., min_length=1, description="Request path, e.g. /api/auth/login")
+    sample_rate: float = Field(0.1, gt=0, le=1, description="Fraction of matching requests to profile")
+    max_profiles: int = Field(20, ge=1, le=1000, description="Stop after this many profiles")
+    ttl_seconds: int = Field(600, ge=1, le=86400, description="Stop after this many seconds")
+
+
+class ErasureRequest(BaseModel):
+    """Admin request to erase accounts in bulk"""
+    user_ids: List[str] = Field(default_factory=list, description="User IDs (24 hex characters)")
+    emails: List[str] = Field(default_factory=list, description="Email addresses")
+    mode: Literal["delete", "anonymize"] = Field("delete", description="Delete documents or anonymize them in place")
+
+    @validator('user_ids', each_item=True)
+    def validate_user_id(cls, v):
+        if not re.match(r'^[0-9a-fA-F]{24}$', v):
+            raise ValueError('User IDs are 24 hexadecimal characters')
+        return v.lower()
+
+    @validator('emails', each_item=True)
+    def validate_email(cls, v):
+        if '@' not in v or len(v) > 320:
+            raise ValueError('Not an email address')
+        return v.strip().lower()
@@ -0,0 +1,157 @@
+"""
+Dependency Health - Cached readiness checks for MongoDB, email and welcome service
+
+A background task checks every dependency each READINESS_CHECK_INTERVAL_SECONDS
+and keeps the latest result. /readyz and /health only read that cache, so a
+storm of probes from load balancers or orchestrators never adds MongoDB or
+network load, and a probe answers in microseconds even while a dependency
+hangs.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+import pymongo
+from app.config import settings
+from app.database import get_client
+from app.monitoring.metrics import Gauge
+from app.services.email_service import email_backend_status
+from app.services.welcome_service import check_welcome_service
+
+logger = logging.getLogger(__name__)
+
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "Result of the last background dependency check (1 = ok)",
+    ("dependency",)
+)
+
+# Dependencies without which the instance should not receive traffic
+CRITICAL_DEPENDENCIES = ("mongodb",)
+
+
+async def _check_mongodb(timeout: float) -> str:
+    client = get_client()
+    if client is None:
+        raise RuntimeError("not connected")
+    with pymongo.timeout(timeout):
+        await client.admin.command("ping")
+    return "ping ok"
+
+
+async def _check_email(timeout: float) -> str:
+    usable, detail = email_backend_status()
+    if not usable:
+        raise RuntimeError(detail)
+    return detail
+
+
+async def _check_welcome_service(timeout: float) -> str:
+    await check_welcome_service(timeout)
+    return "reachable"
+
+
+class DependencyChecker:
+    """Runs dependency checks in the background and caches their results"""
+
+    def __init__(self):
+        self.checks: Dict[str, Callable[[float], Awaitable[str]]] = {
+            "mongodb": _check_mongodb,
+            "email": _check_email,
+            "welcome_service": _check_welcome_service
+        }
+        self._results: Dict[str, Dict] = {}
+        self._last_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, after: Optional[Awaitable] = None) -> None:
+        """
+        Start the periodic checks on the running loop
+
+        Args:
+            after: Awaited before the first run (e.g. the deferred SDK imports,
+                so the first welcome service check does not import httpx on
+                the event loop while the first requests arrive)
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(after))
+
+    async def stop(self) -> None:
+        """Stop checking; readiness reports not ready from now on"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._last_run = None
+
+    async def _run(self, after: Optional[Awaitable]) -> None:
+        if after is not None:
+            await asyncio.shield(after)
+        while True:
+            await self.run_checks()
+            await asyncio.sleep(settings.READINESS_CHECK_INTERVAL_SECONDS)
+
+    async def run_checks(self) -> None:
+        """Run every check once, concurrently, and store the results"""
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._check(name) for name in names))
+        for name, result in zip(names, results):
+            previous = self._results.get(name)
+            if previous is not None and previous["ok"] != result["ok"]:
+                log = logger.info if result["ok"] else logger.warning
+                log("Dependency %s is %s: %s", name, "up" if result["ok"] else "down", result["detail"])
+            self._results[name] = result
+            DEPENDENCY_UP.labels(name).set(1 if result["ok"] else 0)
+        self._last_run = time.monotonic()
+
+    async def _check(self, name: str) -> Dict:
+        timeout = settings.READINESS_CHECK_TIMEOUT_SECONDS
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(self.checks[name](timeout), timeout)
+            ok = True
+        except Exception as e:
+            detail = str(e) or type(e).__name__
+            ok = False
+        return {
+            "ok": ok,
+            "detail": detail,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "checked_at": datetime.utcnow().isoformat() + "Z"
+        }
+
+    def result(self, name: str) -> Optional[Dict]:
+        """Latest cached result of one check, or None before the first run"""
+        return self._results.get(name)
+
+    def readiness(self) -> Dict:
+        """
+        Readiness from the cached results
+
+        Not ready before the first run, after stop(), when the results are
+        older than three check intervals (the checker is stuck), or when a
+        critical dependency failed. Non-critical failures only degrade.
+
+        Returns:
+            Dictionary with ready flag, status and per-dependency results
+        """
+        max_age = settings.READINESS_CHECK_INTERVAL_SECONDS * 3 + settings.READINESS_CHECK_TIMEOUT_SECONDS
+        if self._last_run is None:
+            return {"ready": False, "status": "starting", "checks": {}}
+        if time.monotonic() - self._last_run > max_age:
+            return {"ready": False, "status": "stale", "checks": dict(self._results)}
+
+        ready = all(self._results[name]["ok"] for name in CRITICAL_DEPENDENCIES)
+        degraded = not all(result["ok"] for result in self._results.values())
+        return {
+            "ready": ready,
+            "status": "not_ready" if not ready else ("degraded" if degraded else "ready"),
+            "checks": dict(self._results)
+        }
+
+
+dependency_checker = DependencyChecker()
@@ -0,0 +1,202 @@
+"""
+Event Loop Monitor - Loop lag percentiles and blocking-call detection
+
+The lag sampler is a coroutine that sleeps for a fixed interval and measures
+how late it wakes up. Its wake-ups double as a heartbeat for the optional
+blocking detector: a watchdog thread that notices when the heartbeat stalls
+longer than the threshold and captures the loop thread's stack and the
+request it was serving while the offending callback is still running.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Dict, List, Optional
+from app.config import settings
+from app.monitoring.memory import register_structure
+from app.monitoring.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop wakes up a sleeping coroutine",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Callbacks that blocked the event loop longer than the threshold",
+    ("source",)
+)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoopMonitor:
+    """Samples event loop lag and optionally reports blocking callbacks"""
+
+    def __init__(self):
+        self.interval = settings.LOOP_LAG_INTERVAL_MS / 1000
+        self.threshold = settings.LOOP_BLOCKING_THRESHOLD_MS / 1000
+        self._samples: deque = deque(maxlen=settings.LOOP_LAG_SAMPLES)
+        self._blocking_events: deque = deque(maxlen=50)
+        self._lag_metric = EVENT_LOOP_LAG.labels()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._task_labels: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    @property
+    def detector_enabled(self) -> bool:
+        return self._watchdog is not None
+
+    def start(self, detect_blocking: bool = False) -> None:
+        """
+        Start lag sampling on the running loop
+
+        Args:
+            detect_blocking: Also start the blocking-call watchdog thread
+        """
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._sample())
+
+        if detect_blocking:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-blocking-detector", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop sampling and the watchdog thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def label_current_task(self, label: str) -> None:
+        """
+        Associate the running task with a request label for blocking reports
+
+        Args:
+            label: Usually "METHOD /path"
+        """
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_labels[task] = label
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._heartbeat = time.monotonic()
+            self._samples.append(lag)
+            self._lag_metric.observe(lag)
+
+    def _watch(self) -> None:
+        """Watchdog thread body: detect stalled heartbeats and capture stacks"""
+        check_every = max(0.005, self.threshold / 4)
+        stalled_beat = None
+        report = None
+
+        while not self._stop.wait(check_every):
+            beat = self._heartbeat
+            stalled_for = time.monotonic() - beat - self.interval
+
+            if report is not None and beat != stalled_beat:
+                # Loop is responsive again: finish the report with the real duration
+                report["blocked_ms"] = round((beat - stalled_beat - self.interval) * 1000, 1)
+                self._emit(report)
+                report = None
+                stalled_beat = None
+                continue
+
+            if report is None and stalled_for > self.threshold:
+                stalled_beat = beat
+                report = self._capture()
+
+    def _capture(self) -> Dict:
+        """Snapshot the loop thread's stack and the request it is serving"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+
+        route = None
+        try:
+            task = asyncio.current_task(self._loop)
+            if task is not None:
+                route = self._task_labels.get(task)
+        except RuntimeError:
+            pass
+
+        return {
+            "detected_at": time.time(),
+            "source": "request" if route else "background",
+            "route": route,
+            "stack": "".join(stack[-settings.LOOP_BLOCKING_STACK_DEPTH:])
+        }
+
+    def _emit(self, report: Dict) -> None:
+        EVENT_LOOP_BLOCKED.labels(report["source"]).inc()
+        self._blocking_events.append(report)
+        logger.warning(
+            "Event loop blocked for %sms in %s",
+            report["blocked_ms"], report["route"] or "a background callback",
+            extra={"stack": report["stack"]}
+        )
+
+    def report(self) -> Dict:
+        """
+        Lag percentiles over the sample window and recent blocking events
+
+        Returns:
+            Dictionary with lag statistics in milliseconds
+        """
+        samples = sorted(self._samples)
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "samples": len(samples),
+            "lag_ms": {
+                "p50": round(percentile(samples, 0.50) * 1000, 3),
+                "p90": round(percentile(samples, 0.90) * 1000, 3),
+                "p99": round(percentile(samples, 0.99) * 1000, 3),
+                "max": round((samples[-1] if samples else 0.0) * 1000, 3)
+            },
+            "blocking_detector": self.detector_enabled,
+            "blocking_threshold_ms": self.threshold * 1000,
+            "blocking_events": list(self._blocking_events)
+        }
+
+
+# Shared monitor started from the application lifespan
+loop_monitor = LoopMonitor()
+register_structure("loop_lag_samples", lambda: len(loop_monitor._samples))
+register_structure("loop_task_labels", lambda: len(loop_monitor._task_labels))
@@ -0,0 +1,194 @@
+"""
+Memory Introspection - tracemalloc snapshots and in-process structure sizes
+
+Components holding per-key state (rate limiter storage, caches, queues)
+register a size callback with register_structure() so their growth shows up
+next to the allocation sites reported by tracemalloc.
+"""
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_structures: Dict[str, Callable[[], int]] = {}
+_snapshots: Dict[str, Dict] = {}
+
+
+def register_structure(name: str, size_fn: Callable[[], int]) -> None:
+    """
+    Register an in-process structure whose entry count should be reported
+
+    Args:
+        name: Report key, e.g. "idempotency_store"
+        size_fn: Callable returning the current number of entries
+    """
+    _structures[name] = size_fn
+
+
+def structure_sizes() -> Dict[str, Optional[int]]:
+    """Current entry count of every registered structure"""
+    sizes = {}
+    for name, size_fn in _structures.items():
+        try:
+            sizes[name] = size_fn()
+        except Exception:
+            sizes[name] = None
+    return sizes
+
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of this process
+
+    Returns:
+        RSS in bytes (peak RSS where /proc is unavailable)
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def start_tracing(frames: int = 10) -> None:
+    """Start tracemalloc (no-op when already tracing)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    """Stop tracemalloc and drop stored snapshots"""
+    _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def take_snapshot(name: str) -> Dict:
+    """
+    Take and store a named tracemalloc snapshot
+
+    Args:
+        name: Snapshot name, e.g. "baseline"
+
+    Returns:
+        Snapshot summary
+
+    Raises:
+        RuntimeError: If tracemalloc is not tracing
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not tracing")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    _snapshots[name] = {"snapshot": snapshot, "taken_at": time.time()}
+    total = sum(stat.size for stat in snapshot.statistics("filename"))
+    return {"name": name, "taken_at": _snapshots[name]["taken_at"], "traced_bytes": total}
+
+
+def snapshot_names() -> List[str]:
+    return list(_snapshots)
+
+
+def _module_name(filename: str) -> str:
+    """Dotted module name for a file under app/, or the top-level package"""
+    if filename.startswith(APP_DIR + os.sep):
+        relative = os.path.relpath(filename, os.path.dirname(APP_DIR))
+        return os.path.splitext(relative)[0].replace(os.sep, ".")
+
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index != -1:
+        return filename[index + len(marker):].split(os.sep, 1)[0].split(".", 1)[0]
+    return os.path.basename(filename)
+
+
+def _site_label(filename: str) -> str:
+    """Module for app files, path inside site-packages for libraries"""
+    if filename.startswith(APP_DIR + os.sep):
+        return _module_name(filename)
+    marker = "site-packages" + os.sep
+    index = filename.rfind(marker)
+    if index != -1:
+        return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def _group(stats, top: int, app_only: bool) -> List[Dict]:
+    grouped: Dict[str, Dict] = {}
+    for stat in stats:
+        filename = stat.traceback[0].filename
+        if app_only and not filename.startswith(APP_DIR + os.sep):
+            continue
+        module = _module_name(filename)
+        entry = grouped.setdefault(module, {"module": module, "size_bytes": 0, "count": 0, "size_diff_bytes": 0})
+        entry["size_bytes"] += stat.size
+        entry["count"] += stat.count
+        entry["size_diff_bytes"] += getattr(stat, "size_diff", 0)
+
+    key = "size_diff_bytes" if any(entry["size_diff_bytes"] for entry in grouped.values()) else "size_bytes"
+    return sorted(grouped.values(), key=lambda entry: abs(entry[key]), reverse=True)[:top]
+
+
+def _top_lines(stats, top: int) -> List[Dict]:
+    lines = []
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        lines.append({
+            "site": f"{_site_label(frame.filename)}:{frame.lineno}",
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "size_diff_bytes": getattr(stat, "size_diff", None)
+        })
+    return lines
+
+
+def memory_report(top: int = 15, compare_to: Optional[str] = None) -> Dict:
+    """
+    Memory usage report for the admin API
+
+    Args:
+        top: Number of allocation sites and modules to include
+        compare_to: Name of a stored snapshot to diff the current one against
+
+    Returns:
+        Dictionary with RSS, structure sizes and (when tracing) allocation sites
+    """
+    report = {
+        "rss_bytes": current_rss_bytes(),
+        "structures": structure_sizes(),
+        "tracing": tracemalloc.is_tracing(),
+        "snapshots": snapshot_names()
+    }
+
+    if not tracemalloc.is_tracing():
+        return report
+
+    current, peak = tracemalloc.get_traced_memory()
+    report["traced_bytes"] = current
+    report["traced_peak_bytes"] = peak
+
+    take_snapshot("latest")
+    snapshot = _snapshots["latest"]["snapshot"]
+
+    if compare_to and compare_to in _snapshots:
+        baseline = _snapshots[compare_to]["snapshot"]
+        line_stats = snapshot.compare_to(baseline, "lineno")
+        file_stats = snapshot.compare_to(baseline, "filename")
+        report["compared_to"] = compare_to
+    else:
+        line_stats = snapshot.statistics("lineno")
+        file_stats = snapshot.statistics("filename")
+
+    report["top_app_modules"] = _group(file_stats, top, app_only=True)
+    report["top_packages"] = _group(file_stats, top, app_only=False)
+    report["top_sites"] = _top_lines(line_stats, top)
+    return report
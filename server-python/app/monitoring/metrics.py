@@ -0,0 +1,409 @@
+"""
+Metrics - In-process Prometheus-style counters, gauges and histograms
+
+Recording is a dictionary lookup, a bisect over the bucket bounds and a few
+additions under an uncontended lock, so it stays in the low microseconds.
+MongoDB monitoring listeners run on driver threads, hence the locks.
+
+Metrics live in each process. When several server workers share a port,
+each writes its exposition to METRICS_MULTIPROCESS_DIR every few seconds and
+render_all_workers() merges the files, labelling every sample with the
+worker's PID, so a scrape landing on any worker sees all of them.
+"""
+import asyncio
+import glob
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond Mongo commands up to slow bcrypt
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_registry: List["_Metric"] = []
+
+
+class _Metric:
+    """Base class for labelled metric families"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *labelvalues: str):
+        """
+        Get the child metric for the given label values
+
+        Args:
+            labelvalues: One value per label name, in order
+
+        Returns:
+            Child metric with inc()/observe()
+        """
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, labelvalues: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(str(value))}"'
+            for name, value in zip(self.labelnames, labelvalues)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        for labelvalues, child in list(self._children.items()):
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        return [f"{self.name}{self._label_text(labelvalues)} {child.value}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        return [f"{self.name}{self._label_text(labelvalues)} {child.value}"]
+
+    def remove(self, *labelvalues: str) -> None:
+        """Drop a series (e.g. the pool of a server that left the topology)"""
+        with self._lock:
+            self._children.pop(labelvalues, None)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, labelvalues, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total_sum = child.sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            bucket_labels = self._label_text(labelvalues, 'le="%s"' % bound)
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        cumulative += counts[-1]
+        bucket_labels = self._label_text(labelvalues, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(labelvalues)} {total_sum}")
+        lines.append(f"{self.name}_count{self._label_text(labelvalues)} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def series_count() -> int:
+    """Number of labelled series across all metrics"""
+    return sum(len(metric._children) for metric in _registry)
+
+
+def render_metrics() -> str:
+    """
+    Render all registered metrics in the Prometheus text exposition format
+
+    Returns:
+        Exposition text ending with a newline
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================
+# MULTI-PROCESS EXPOSITION
+# ============================================
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.prom")
+
+
+def write_snapshot(directory: str) -> None:
+    """Write this process's metrics to its file in the shared directory"""
+    path = _snapshot_path(directory, os.getpid())
+    with open(path + ".tmp", "w") as f:
+        f.write(render_metrics())
+    # Readers never see a half-written file
+    os.replace(path + ".tmp", path)
+
+
+def remove_snapshot(directory: str, pid: int) -> None:
+    """Drop the file of a worker that exited"""
+    try:
+        os.remove(_snapshot_path(directory, pid))
+    except FileNotFoundError:
+        pass
+
+
+def _add_worker_label(sample: str, worker: str) -> str:
+    name, value = sample.rsplit(" ", 1)
+    label = f'worker="{worker}"'
+    if name.endswith("}"):
+        return f"{name[:-1]},{label}}} {value}"
+    return f"{name}{{{label}}} {value}"
+
+
+def render_all_workers(directory: str) -> str:
+    """
+    Render the metrics of every worker with a snapshot in the directory
+
+    This process's snapshot is refreshed first; the others are at most one
+    snapshot interval old.
+
+    Returns:
+        Exposition text with a "worker" label on every sample
+    """
+    write_snapshot(directory)
+    # Samples grouped per metric family, which the format requires
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.prom"))):
+        worker = os.path.basename(path)[:-len(".prom")]
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            continue
+        family = None
+        for line in lines:
+            if line.startswith("# "):
+                family = line.split(" ", 3)[2]
+                headers.setdefault(family, [])
+                if line not in headers[family]:
+                    headers[family].append(line)
+            elif line and family is not None:
+                samples.setdefault(family, []).append(_add_worker_label(line, worker))
+
+    lines = []
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples.get(family, ()))
+    return "\n".join(lines) + "\n"
+
+
+async def write_snapshots(directory: str, interval_seconds: float) -> None:
+    """Keep this worker's snapshot current until cancelled, then remove it"""
+    try:
+        while True:
+            await asyncio.to_thread(write_snapshot, directory)
+            await asyncio.sleep(interval_seconds)
+    finally:
+        remove_snapshot(directory, os.getpid())
+
+
+# ============================================
+# APPLICATION METRICS
+# ============================================
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ("method", "route", "status")
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route")
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash and verify duration",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1.0, 2.0)
+)
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command duration by command name and outcome",
+    ("command", "outcome")
+)
+
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ("outcome",)
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections",
+    "Pooled MongoDB connections by server and state (open, checked_out)",
+    ("address", "state")
+)
+
+MONGO_POOL_WAITERS = Gauge(
+    "mongodb_pool_waiters",
+    "Operations waiting to check a connection out of the pool",
+    ("address",)
+)
+
+HTTP_CLIENT_DURATION = Histogram(
+    "http_client_request_duration_seconds",
+    "Outbound HTTP request latency by target and status code",
+    ("target", "status")
+)
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ("route",)
+)
+
+
+# ============================================
+# OUTBOUND HTTP (httpx event hooks)
+# ============================================
+
+def httpx_event_hooks(target: str) -> Dict[str, list]:
+    """
+    Build httpx AsyncClient event hooks that time outbound requests
+
+    Args:
+        target: Label for the remote service (e.g. "welcome_service", "google")
+
+    Returns:
+        Dictionary suitable for httpx.AsyncClient(event_hooks=...)
+    """
+    async def on_request(request):
+        request.extensions["metrics_started"] = time.perf_counter()
+
+    async def on_response(response):
+        started = response.request.extensions.get("metrics_started")
+        if started is not None:
+            HTTP_CLIENT_DURATION.labels(target, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def record_outbound_error(target: str, elapsed: float) -> None:
+    """Record an outbound request that failed before a response arrived"""
+    HTTP_CLIENT_DURATION.labels(target, "error").observe(elapsed)
@@ -0,0 +1,161 @@
+"""
+MongoDB Monitoring Listeners - Feed driver events into the metrics registry
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+from pymongo import monitoring
+from app.monitoring.metrics import (
+    MONGO_COMMAND_DURATION,
+    MONGO_POOL_CHECKOUT_WAIT,
+    MONGO_POOL_CONNECTIONS,
+    MONGO_POOL_WAITERS
+)
+from app.monitoring.mongo_profiler import slow_command_profiler
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Records the duration of every MongoDB command"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "success").observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "failure").observe(
+            event.duration_micros / 1_000_000
+        )
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks pool occupancy per server from CMAP events
+
+    Keeps open, checked-out and waiting counts per server address (exported
+    as gauges) and a window of recent checkout waits for the admin report.
+    Callbacks run on driver threads, hence the lock.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict] = {}
+        self._waits: Deque[float] = deque(maxlen=window)
+
+    def _pool(self, address) -> Dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = {
+                "address": key,
+                "open": 0,
+                "checked_out": 0,
+                "waiters": 0,
+                "max_waiters": 0,
+                "checkout_failures": 0,
+                "cleared": 0,
+                "open_gauge": MONGO_POOL_CONNECTIONS.labels(key, "open"),
+                "checked_out_gauge": MONGO_POOL_CONNECTIONS.labels(key, "checked_out"),
+                "waiters_gauge": MONGO_POOL_WAITERS.labels(key)
+            }
+            self._pools[key] = pool
+        return pool
+
+    def _update(self, address, field: str, delta: int) -> None:
+        with self._lock:
+            pool = self._pool(address)
+            pool[field] = max(0, pool[field] + delta)
+            if field == "waiters":
+                pool["max_waiters"] = max(pool["max_waiters"], pool["waiters"])
+            pool[f"{field}_gauge"].set(pool[field])
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, "waiters", 1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, "waiters", -1)
+        self._update(event.address, "checked_out", 1)
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels("success").observe(event.duration)
+            self._waits.append(event.duration)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, "waiters", -1)
+        with self._lock:
+            self._pool(event.address)["checkout_failures"] += 1
+        if event.duration is not None:
+            MONGO_POOL_CHECKOUT_WAIT.labels(event.reason).observe(event.duration)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, "checked_out", -1)
+
+    def connection_created(self, event):
+        self._update(event.address, "open", 1)
+
+    def connection_closed(self, event):
+        self._update(event.address, "open", -1)
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        key = f"{event.address[0]}:{event.address[1]}"
+        with self._lock:
+            self._pools.pop(key, None)
+        MONGO_POOL_CONNECTIONS.remove(key, "open")
+        MONGO_POOL_CONNECTIONS.remove(key, "checked_out")
+        MONGO_POOL_WAITERS.remove(key)
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> Dict:
+        """
+        Current pool occupancy and recent checkout latency
+
+        Returns:
+            Dictionary with one entry per server pool and checkout wait
+            percentiles (milliseconds) over the recent window
+        """
+        with self._lock:
+            pools = [
+                {key: value for key, value in pool.items() if not key.endswith("_gauge")}
+                for pool in self._pools.values()
+            ]
+            waits = sorted(self._waits)
+
+        checkout = {"samples": len(waits)}
+        if waits:
+            for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99), ("max_ms", 1.0)):
+                index = min(len(waits) - 1, max(0, int(round(fraction * len(waits))) - 1))
+                checkout[name] = round(waits[index] * 1000, 3)
+        return {"pools": pools, "checkout_wait": checkout}
+
+
+# Shared instance so the admin API can read pool occupancy
+pool_listener = PoolMetricsListener()
+
+
+def get_event_listeners(tenant_id: Optional[str] = None) -> list:
+    """
+    Listeners to pass to AsyncIOMotorClient(event_listeners=...)
+
+    Args:
+        tenant_id: Tenant owning a dedicated client, None for the shared one
+
+    Returns:
+        List of pymongo monitoring listeners
+    """
+    profiler = slow_command_profiler if tenant_id is None else slow_command_profiler.for_client(tenant_id)
+    return [CommandMetricsListener(), pool_listener, profiler]
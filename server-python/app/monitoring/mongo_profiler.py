@@ -0,0 +1,347 @@
+"""
+MongoDB Slow Command Profiler - Log slow commands by shape and sample explain()
+
+Commands slower than MONGO_SLOW_COMMAND_MS are aggregated by their shape
+(collection, command and filter keys with every value redacted). Shapes that
+keep showing up get an explain("executionStats") captured in the background,
+reduced to plan stages and counters so no user data is retained.
+
+Tenants on their own cluster report through for_client(), so their shapes
+are kept apart and explained on the cluster that ran them.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import monitoring
+from app.config import settings
+from app.monitoring.memory import register_structure
+
+logger = logging.getLogger(__name__)
+
+# Commands whose plan can be captured with the explain command
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Command fields that describe the query; everything else is transport detail
+SHAPE_FIELDS = ("filter", "query", "q", "sort", "projection", "pipeline", "key", "updates", "deletes")
+
+# Key of the shared client; dedicated tenant clients are keyed by tenant ID
+SHARED_CLIENT = "shared"
+
+
+def redact(value: Any) -> Any:
+    """
+    Replace every literal in a query document with "?" keeping its structure
+
+    Args:
+        value: Filter, sort, pipeline or any nested part of one
+
+    Returns:
+        Document with the same keys and operators but no values
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Collapse arrays of literals ($in lists, etc.) so they share one shape
+        items = [redact(item) for item in value]
+        if all(item == "?" for item in items):
+            return ["?"] if items else []
+        return items
+    return "?"
+
+
+def command_shape(command_name: str, command: Dict) -> Dict:
+    """
+    Build the redacted shape of a command document
+
+    Args:
+        command_name: Name of the command (find, update, ...)
+        command: Full command document from the CommandStartedEvent
+
+    Returns:
+        Shape dictionary with the collection and redacted query fields
+    """
+    shape = {"command": command_name, "collection": command.get(command_name)}
+    for field in SHAPE_FIELDS:
+        if field not in command:
+            continue
+        if field in ("updates", "deletes"):
+            # Only the match part identifies the query; the update body is data
+            shape[field] = [redact(op.get("q", {})) for op in command[field][:1]]
+        elif field == "sort":
+            shape[field] = list(command[field].keys()) if isinstance(command[field], dict) else "?"
+        else:
+            shape[field] = redact(command[field])
+    return shape
+
+
+def summarize_explain(explain: Dict) -> Dict:
+    """
+    Reduce explain output to plan stages and execution counters
+
+    Args:
+        explain: Raw explain command result
+
+    Returns:
+        Dictionary with the winning plan and executionStats counters
+    """
+    planner = explain.get("queryPlanner") or {}
+    if not planner and explain.get("stages"):
+        # Aggregation explain nests the planner under the first $cursor stage
+        cursor = explain["stages"][0].get("$cursor", {})
+        planner = cursor.get("queryPlanner", {})
+        explain = cursor
+
+    stats = explain.get("executionStats") or {}
+    return {
+        "winning_plan": _plan_stages(planner.get("winningPlan", {})),
+        "rejected_plans": len(planner.get("rejectedPlans", [])),
+        "n_returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_time_ms": stats.get("executionTimeMillis")
+    }
+
+
+def _plan_stages(plan: Dict) -> str:
+    """Render a plan tree as "FETCH <- IXSCAN(email_1)" without filter values"""
+    if not plan:
+        return ""
+    plan = plan.get("queryPlan", plan)
+    stage = plan.get("stage", "?")
+    if plan.get("indexName"):
+        stage = f"{stage}({plan['indexName']})"
+    children = []
+    if plan.get("inputStage"):
+        children.append(_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        children.append(_plan_stages(child))
+    if not children:
+        return stage
+    return f"{stage} <- " + ", ".join(children)
+
+
+class SlowCommandProfiler(monitoring.CommandListener):
+    """
+    CommandListener aggregating slow MongoDB commands by shape
+
+    Listener callbacks run on driver threads, so shared state is guarded by a
+    lock and explain() is scheduled onto the application's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[Tuple[str, Any, int], Tuple[Dict, str]] = {}
+        self._shapes: Dict[str, Dict] = {}
+        self._clients: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop, client_key: str = SHARED_CLIENT) -> None:
+        """
+        Give the profiler a client and loop for background explain() calls
+
+        Args:
+            client: Connected AsyncIOMotorClient
+            loop: Event loop the application runs on
+            client_key: SHARED_CLIENT, or the tenant ID passed to for_client()
+        """
+        self._clients[client_key] = client
+        self._loop = loop
+
+    def detach(self) -> None:
+        """Stop scheduling explain() calls (connections are closing)"""
+        self._clients = {}
+        self._loop = None
+
+    def for_client(self, client_key: str) -> monitoring.CommandListener:
+        """Listener for a client other than the shared one"""
+        return _ClientCommandListener(self, client_key)
+
+    # CommandListener interface (shared client)
+
+    def started(self, event):
+        self._command_started(event, SHARED_CLIENT)
+
+    def succeeded(self, event):
+        self._command_finished(event, SHARED_CLIENT)
+
+    def failed(self, event):
+        self._command_finished(event, SHARED_CLIENT)
+
+    def _command_started(self, event, client_key: str) -> None:
+        if event.command_name in EXPLAINABLE_COMMANDS or event.command_name == "insert":
+            with self._lock:
+                self._started[(client_key, event.connection_id, event.request_id)] = (
+                    event.command, event.database_name
+                )
+
+    def _command_finished(self, event, client_key: str) -> None:
+        with self._lock:
+            started = self._started.pop((client_key, event.connection_id, event.request_id), None)
+
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < settings.MONGO_SLOW_COMMAND_MS:
+            return
+
+        command, database_name = started
+        shape = command_shape(event.command_name, command)
+        shape_key = json.dumps([client_key, shape], sort_keys=True, default=str)
+        self._record(shape_key, shape, command, database_name, duration_ms, client_key)
+
+    def _record(self, shape_key: str, shape: Dict, command: Dict,
+                database_name: str, duration_ms: float, client_key: str = SHARED_CLIENT) -> None:
+        now = time.time()
+        schedule_explain = False
+
+        with self._lock:
+            entry = self._shapes.get(shape_key)
+            if entry is None:
+                if len(self._shapes) >= settings.MONGO_SLOW_SHAPES_MAX:
+                    # Evict the shape with the smallest total time
+                    coldest = min(self._shapes, key=lambda key: self._shapes[key]["total_ms"])
+                    del self._shapes[coldest]
+                entry = {
+                    "shape": shape,
+                    "cluster": client_key,
+                    "database": database_name,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "first_seen": now,
+                    "last_seen": now,
+                    "explain": None,
+                    "explained_at": None,
+                    "explain_pending": False
+                }
+                self._shapes[shape_key] = entry
+
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = now
+
+            if (
+                shape["command"] in EXPLAINABLE_COMMANDS
+                and entry["count"] >= settings.MONGO_EXPLAIN_AFTER
+                and not entry["explain_pending"]
+                and (
+                    entry["explained_at"] is None
+                    or now - entry["explained_at"] >= settings.MONGO_EXPLAIN_INTERVAL_SECONDS
+                )
+            ):
+                entry["explain_pending"] = True
+                schedule_explain = True
+
+        logger.warning(
+            "Slow MongoDB command %s.%s %s took %.1fms",
+            database_name, shape["collection"], shape["command"], duration_ms,
+            extra={"duration_ms": round(duration_ms, 1), "shape": shape_key}
+        )
+
+        if schedule_explain:
+            self._schedule_explain(shape_key, shape["command"], command, database_name, client_key)
+
+    def _schedule_explain(self, shape_key: str, command_name: str,
+                          command: Dict, database_name: str, client_key: str) -> None:
+        # Only ever explain on the client (cluster) that ran the command
+        loop, client = self._loop, self._clients.get(client_key)
+        if loop is None or client is None or loop.is_closed():
+            with self._lock:
+                if shape_key in self._shapes:
+                    self._shapes[shape_key]["explain_pending"] = False
+            return
+
+        explain_target = {
+            key: value for key, value in command.items()
+            if not key.startswith("$") and key not in ("lsid", "txnNumber", "cursor", "writeConcern")
+        }
+        if command_name == "aggregate":
+            explain_target["cursor"] = {}
+
+        coroutine = self._explain(shape_key, client, database_name, explain_target)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            loop.create_task(coroutine)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    async def _explain(self, shape_key: str, client, database_name: str, target: Dict) -> None:
+        summary = None
+        try:
+            result = await client[database_name].command(
+                {"explain": target, "verbosity": "executionStats"}
+            )
+            summary = summarize_explain(result)
+        except Exception as e:
+            logger.warning("explain() failed for slow query shape: %s", e)
+
+        with self._lock:
+            entry = self._shapes.get(shape_key)
+            if entry is not None:
+                entry["explain_pending"] = False
+                entry["explained_at"] = time.time()
+                if summary is not None:
+                    entry["explain"] = summary
+
+    # Reporting
+
+    def top_shapes(self, limit: int = 20, sort_by: str = "total_ms") -> List[Dict]:
+        """
+        Slow query shapes ranked by total, max or mean time or by count
+
+        Args:
+            limit: Maximum number of shapes to return
+            sort_by: "total_ms", "max_ms", "mean_ms" or "count"
+
+        Returns:
+            List of shape reports, slowest first
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self._shapes.values()]
+
+        report = []
+        for entry in entries:
+            entry.pop("explain_pending", None)
+            entry["mean_ms"] = entry["total_ms"] / entry["count"]
+            report.append(entry)
+
+        report.sort(key=lambda entry: entry.get(sort_by, entry["total_ms"]), reverse=True)
+        return report[:limit]
+
+    def reset(self) -> None:
+        """Forget all recorded shapes"""
+        with self._lock:
+            self._shapes.clear()
+
+    def size(self) -> int:
+        """Number of tracked shapes"""
+        return len(self._shapes)
+
+
+class _ClientCommandListener(monitoring.CommandListener):
+    """Forwards one client's command events to the profiler with its key"""
+
+    def __init__(self, profiler: SlowCommandProfiler, client_key: str):
+        self.profiler = profiler
+        self.client_key = client_key
+
+    def started(self, event):
+        self.profiler._command_started(event, self.client_key)
+
+    def succeeded(self, event):
+        self.profiler._command_finished(event, self.client_key)
+
+    def failed(self, event):
+        self.profiler._command_finished(event, self.client_key)
+
+
+# Shared profiler instance registered with the MongoDB client
+slow_command_profiler = SlowCommandProfiler()
+register_structure("mongo_slow_shapes", slow_command_profiler.size)
+register_structure("mongo_commands_in_flight", lambda: len(slow_command_profiler._started))
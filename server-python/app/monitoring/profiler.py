@@ -0,0 +1,230 @@
+"""
+Request Profiler - Sampling profiler for individual requests
+
+A sampled request gets its own sampler thread that records, every few
+milliseconds, where the request's task is: the live stack of the loop thread
+when the task is running, or its coroutine await chain when it is suspended.
+Stacks are written in the collapsed ("folded") format read by flamegraph.pl,
+speedscope and inferno. Requests that are not sampled never start a thread.
+"""
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from typing import Dict, List, Optional
+from app.config import settings
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+_HANDLE_RUN_FILE = os.path.join(_ASYNCIO_DIR, "events.py")
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages or the app package, else the basename"""
+    index = filename.rfind("site-packages" + os.sep)
+    if index != -1:
+        return filename[index + len("site-packages") + 1:]
+    index = filename.rfind(os.sep + "app" + os.sep)
+    if index != -1:
+        return filename[index + 1:]
+    return os.path.basename(filename)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _running_stack(frame) -> List[str]:
+    """Stack of the loop thread, trimmed to the frames below the task step"""
+    frames = []
+    while frame is not None:
+        if frame.f_code.co_filename == _HANDLE_RUN_FILE:
+            break
+        frames.append(_frame_label(frame))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _suspended_stack(task: asyncio.Task) -> List[str]:
+    """Await chain of a suspended task, outermost coroutine first"""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    leaf = type(awaitable).__name__ if awaitable is not None else "io"
+    frames.append(f"[await {leaf}]")
+    return frames
+
+
+class RequestProfile:
+    """Sampler thread attached to one request's task"""
+
+    def __init__(self, task: asyncio.Task, loop: asyncio.AbstractEventLoop, label: str):
+        self.task = task
+        self.loop = loop
+        self.label = label
+        self.loop_thread_id = threading.get_ident()
+        self.interval = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        self.stacks: StackCounter = StackCounter()
+        self.started = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, status_code: int) -> None:
+        """Stop sampling; the sampler thread writes the output file itself"""
+        self.status_code = status_code
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # The loop mutates frames while we read them; drop that sample
+                continue
+        self._write()
+
+    def _sample(self) -> None:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = _running_stack(frame)
+        else:
+            stack = _suspended_stack(self.task)
+        if stack:
+            self.stacks[";".join(stack)] += 1
+
+    def _write(self) -> None:
+        if not self.stacks:
+            return
+
+        os.makedirs(settings.PROFILE_OUTPUT_DIR, exist_ok=True)
+        duration_ms = int((time.time() - self.started) * 1000)
+        safe_label = re.sub(r"[^A-Za-z0-9]+", "_", self.label).strip("_")
+        filename = "%s-%s-%s-%dms.folded" % (
+            time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started)),
+            safe_label,
+            getattr(self, "status_code", 0),
+            duration_ms
+        )
+        path = os.path.join(settings.PROFILE_OUTPUT_DIR, filename)
+
+        with open(path, "w") as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{self.label};{stack} {count}\n")
+
+        profiler.record_output(path)
+
+
+class Profiler:
+    """Decides which requests are profiled and tracks active profiles"""
+
+    def __init__(self):
+        self._toggles: Dict[str, Dict] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self._recent_outputs: List[str] = []
+
+    def enable(self, path: str, sample_rate: float, max_profiles: int, ttl_seconds: int) -> Dict:
+        """
+        Profile a fraction of requests to a path for a limited time
+
+        Args:
+            path: Request path, e.g. "/api/auth/login"
+            sample_rate: Fraction of matching requests to profile (0-1]
+            max_profiles: Stop after this many profiles
+            ttl_seconds: Stop after this many seconds
+
+        Returns:
+            The stored toggle
+        """
+        toggle = {
+            "path": path,
+            "sample_rate": sample_rate,
+            "remaining": max_profiles,
+            "expires_at": time.time() + ttl_seconds
+        }
+        self._toggles[path] = toggle
+        return toggle
+
+    def disable(self, path: Optional[str] = None) -> None:
+        """Remove one toggle, or all of them"""
+        if path is None:
+            self._toggles.clear()
+        else:
+            self._toggles.pop(path, None)
+
+    def should_profile(self, path: str, forced: bool) -> bool:
+        """
+        Decide whether to profile a request (called for every request)
+
+        Args:
+            path: Request path
+            forced: An authorized profiling header was sent
+
+        Returns:
+            True if a profile should be started
+        """
+        toggle = self._toggles.get(path)
+        if not forced and toggle is None:
+            return False
+
+        with self._lock:
+            if self._active >= settings.PROFILE_MAX_CONCURRENT:
+                return False
+
+            if not forced:
+                if toggle["expires_at"] < time.time() or toggle["remaining"] <= 0:
+                    self._toggles.pop(path, None)
+                    return False
+                if random.random() >= toggle["sample_rate"]:
+                    return False
+                toggle["remaining"] -= 1
+
+            self._active += 1
+            return True
+
+    def start(self, label: str) -> RequestProfile:
+        """Start sampling the current task"""
+        profile = RequestProfile(asyncio.current_task(), asyncio.get_running_loop(), label)
+        profile.start()
+        return profile
+
+    def finish(self, profile: RequestProfile, status_code: int) -> None:
+        """Stop a profile started by start()"""
+        profile.stop(status_code)
+        with self._lock:
+            self._active -= 1
+
+    def record_output(self, path: str) -> None:
+        with self._lock:
+            self._recent_outputs.append(path)
+            del self._recent_outputs[:-50]
+
+    def status(self) -> Dict:
+        """Active toggles and recently written profile files"""
+        now = time.time()
+        return {
+            "output_dir": settings.PROFILE_OUTPUT_DIR,
+            "active_profiles": self._active,
+            "toggles": [
+                dict(toggle, expires_in=max(0, int(toggle["expires_at"] - now)))
+                for toggle in self._toggles.values()
+            ],
+            "recent_outputs": list(self._recent_outputs)
+        }
+
+
+# Shared profiler used by the profiling middleware and admin routes
+profiler = Profiler()
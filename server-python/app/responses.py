@@ -0,0 +1,122 @@
+"""
+JSON Responses - One-pass JSON encoding for every route
+
+FastJSONResponse is the application's default response class. It encodes
+with orjson when installed (falling back to the standard library) and
+handles datetimes and ObjectIds while encoding, so handlers pass user
+documents' values through as they are instead of converting them first.
+
+Handlers that build their response from data they already trust (their own
+literals, documents read from MongoDB) return trusted_response(), which
+skips FastAPI's validate-then-serialize pass through the response_model.
+The response_model stays on the route for the OpenAPI schema; setting
+VALIDATE_TRUSTED_RESPONSES checks every trusted body against it, for
+development and CI.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Mapping, Optional, Type
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        # Only reached by the stdlib encoder; orjson encodes these itself
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON
+
+    Naive datetimes are written like datetime.isoformat() by both encoders.
+
+    Args:
+        content: JSON-compatible value, possibly holding datetimes and ObjectIds
+
+    Returns:
+        Encoded body
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an entity tag
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match.
+
+    Args:
+        if_none_match: Header value ("*" or a comma-separated list), or None
+        etag: Current entity tag, quoted
+
+    Returns:
+        True if the client's copy is current (answer 304)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(
+    model: Type[BaseModel],
+    content: Dict,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    """
+    Response for handler-built data, without response_model validation
+
+    Args:
+        model: The route's response_model; only used when
+            VALIDATE_TRUSTED_RESPONSES is set
+        content: Every field of the response (defaults of the model are not
+            filled in)
+        status_code: HTTP status
+        headers: Extra response headers
+
+    Returns:
+        Rendered response
+
+    Raises:
+        pydantic.ValidationError: With VALIDATE_TRUSTED_RESPONSES, when the
+            body does not match the model
+    """
+    response = FastJSONResponse(content, status_code=status_code, headers=headers)
+    if settings.VALIDATE_TRUSTED_RESPONSES:
+        model.model_validate_json(response.body)
+    return response
@@ -0,0 +1,220 @@
+"""
+Admin Routes - Operational introspection (requires X-Admin-Key)
+"""
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.auth.admin import require_admin
+from app.config import settings
+from app.database import get_client_options, get_tenant_circuits
+from app.middleware.concurrency import concurrency_limiter
+from app.models import ErasureRequest, ProfilingToggleRequest
+from app.monitoring import memory
+from app.monitoring.loop_monitor import loop_monitor
+from app.monitoring.mongo_listeners import pool_listener
+from app.monitoring.mongo_profiler import slow_command_profiler
+from app.monitoring.profiler import profiler
+from app.scheduler import scheduler
+from app.services import erasure
+from app.tenancy import tenant_registry
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/mongo/slow-queries", summary="Top Slow Query Shapes")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    sort_by: str = Query("total_ms", pattern="^(total_ms|max_ms|mean_ms|count)$")
+):
+    """
+    Ranked report of slow MongoDB command shapes
+
+    Each shape has its values redacted and, once it repeats, a sampled
+    explain() summary with the winning plan and examined counts.
+    """
+    return {
+        "threshold_ms": settings.MONGO_SLOW_COMMAND_MS,
+        "shapes": slow_command_profiler.top_shapes(limit=limit, sort_by=sort_by)
+    }
+
+
+@router.delete("/mongo/slow-queries", summary="Reset Slow Query Report")
+async def reset_slow_queries():
+    """Clear all recorded slow query shapes"""
+    slow_command_profiler.reset()
+    return {"success": True, "message": "Slow query report cleared"}
+
+
+@router.get("/mongo/pool", summary="MongoDB Connection Pool")
+async def get_mongo_pool():
+    """
+    Live connection pool occupancy
+
+    Open, checked-out and waiting connections per server, with checkout
+    wait percentiles, next to the options the client was created with.
+    """
+    return {
+        "environment": settings.ENVIRONMENT,
+        "options": get_client_options(),
+        **pool_listener.snapshot()
+    }
+
+
+@router.get("/concurrency", summary="Adaptive Concurrency Limits")
+async def get_concurrency_limits():
+    """
+    Per-route concurrency limits
+
+    Current limit, in-flight requests, short-term and baseline latency and
+    rejections for every route seen since startup.
+    """
+    return concurrency_limiter.snapshot()
+
+
+@router.get("/tenants", summary="Tenants")
+async def get_tenants():
+    """
+    Configured tenants with their storage, limits and database circuit
+
+    Together with the tenant_* metrics this shows which tenant carries the
+    load before it is moved to its own cluster.
+    """
+    snapshot = tenant_registry.snapshot()
+    circuits = get_tenant_circuits()
+    for tenant in snapshot["tenants"]:
+        tenant["database_circuit"] = circuits[tenant["id"]]
+    return snapshot
+
+
+@router.get("/scheduler", summary="Maintenance Jobs")
+async def get_scheduler():
+    """
+    Scheduler leadership and maintenance jobs as seen by this worker
+
+    Only the leader runs jobs, so progress of a running job and the results
+    of recent runs appear on the leader; the schedule itself is shared.
+    """
+    return {
+        "dry_run": settings.MAINTENANCE_DRY_RUN,
+        **scheduler.snapshot()
+    }
+
+
+@router.get("/event-loop", summary="Event Loop Lag")
+async def get_event_loop_report():
+    """
+    Event loop lag percentiles and recent blocking callbacks
+
+    Blocking events are only collected when LOOP_BLOCKING_DETECTOR_ENABLED is set.
+    """
+    return loop_monitor.report()
+
+
+@router.get("/profiling", summary="Request Profiling Status")
+async def get_profiling_status():
+    """Active profiling toggles and recently written flamegraph files"""
+    return dict(profiler.status(), enabled=settings.PROFILING_ENABLED)
+
+
+@router.post("/profiling", summary="Profile Requests To A Path")
+async def enable_profiling(toggle: ProfilingToggleRequest):
+    """
+    Profile a sample of requests to one path
+
+    Each profile is written as a collapsed-stack (.folded) file to
+    PROFILE_OUTPUT_DIR, ready for flamegraph.pl or speedscope.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling middleware is not enabled (set PROFILING_ENABLED=true)"
+        )
+
+    return profiler.enable(toggle.path, toggle.sample_rate, toggle.max_profiles, toggle.ttl_seconds)
+
+
+@router.delete("/profiling", summary="Stop Request Profiling")
+async def disable_profiling(path: Optional[str] = None):
+    """Remove the toggle for one path, or all toggles"""
+    profiler.disable(path)
+    return {"success": True, "message": "Profiling toggles removed"}
+
+
+@router.get("/memory", summary="Memory Report")
+async def get_memory_report(
+    top: int = Query(15, ge=1, le=100),
+    compare_to: Optional[str] = None
+):
+    """
+    RSS, in-process structure sizes and top allocation sites
+
+    Allocation sites are grouped by module under app/ and by package. Pass
+    compare_to with a stored snapshot name to rank sites by growth instead.
+    Requires tracemalloc to be tracing for allocation data.
+    """
+    return await asyncio.to_thread(memory.memory_report, top, compare_to)
+
+
+@router.post("/memory/tracing", summary="Start tracemalloc")
+async def start_memory_tracing(frames: int = Query(10, ge=1, le=50)):
+    """Start tracing allocations (adds CPU and memory overhead while on)"""
+    memory.start_tracing(frames)
+    return {"success": True, "message": "tracemalloc started"}
+
+
+@router.delete("/memory/tracing", summary="Stop tracemalloc")
+async def stop_memory_tracing():
+    """Stop tracing allocations and drop stored snapshots"""
+    memory.stop_tracing()
+    return {"success": True, "message": "tracemalloc stopped"}
+
+
+@router.post("/memory/snapshots/{name}", summary="Take Memory Snapshot")
+async def take_memory_snapshot(name: str):
+    """Store a named tracemalloc snapshot to diff later reports against"""
+    try:
+        return await asyncio.to_thread(memory.take_snapshot, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/erasure", summary="Erase Accounts", status_code=status.HTTP_202_ACCEPTED)
+async def create_erasure_job(request: ErasureRequest):
+    """
+    Delete or anonymize accounts of the request's tenant in the background
+
+    Returns the job; poll GET /api/admin/erasure/{id} for progress.
+    """
+    try:
+        job = await erasure.create_job(request.user_ids, request.emails, request.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    erasure.start_job(job["id"])
+    return job
+
+
+@router.get("/erasure/{job_id}", summary="Erasure Job Progress")
+async def get_erasure_job(job_id: str):
+    """Status, checkpoint and counts of an erasure job"""
+    try:
+        return await erasure.get_job(job_id)
+    except erasure.ErasureJobNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Erasure job not found")
+
+
+@router.post("/erasure/{job_id}/resume", summary="Resume Erasure Job", status_code=status.HTTP_202_ACCEPTED)
+async def resume_erasure_job(job_id: str):
+    """
+    Continue a failed or abandoned job from its checkpoint in this worker
+
+    A job still making progress on another worker is left alone.
+    """
+    job = await get_erasure_job(job_id)
+    if job["status"] == erasure.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Erasure job already completed")
+    erasure.start_job(job_id, resume_failed=True)
+    return job
@@ -1,28 +1,44 @@
 """
 Authentication Routes - Login, OAuth (Google, Facebook)
 """
+import logging
 from fastapi import APIRouter, HTTPException, status, Request, Depends
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from datetime import datetime
-from app.models import LoginRequest, LoginResponse, OAuthCallbackResponse
+from app.models import LoginRequest, LoginResponse, OAuthCallbackResponse, UserResponse
+from app.responses import etag_matches, trusted_response
 from app.auth.password import verify_password
-from app.auth.jwt_handler import create_access_token
-from app.auth.oauth import oauth
+from app.auth.jwt_handler import create_access_token, get_token_user_id
+from app.auth.oauth import get_oauth
+from app.auth.oauth_state import STATE_COOKIE, STATE_COOKIE_PATH, new_state, verify_state
 from app.services.user_service import (
     get_user_by_email, 
+    get_user_by_id,
+    get_user_version,
     update_last_login,
     create_social_user
 )
 from app.config import settings
+from app.database import DatabaseUnavailableError
+from app.deadline import outbound_timeout
+from app.tenancy import tenant_rate_limit, tenant_remote_address
 from slowapi import Limiter
-from slowapi.util import get_remote_address
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=tenant_remote_address)
+
+# Seconds allowed per call to the OAuth provider (capped by the request deadline)
+OAUTH_HTTP_TIMEOUT = 10.0
+
+# Part of every /me ETag; bump when the profile body changes shape, so
+# clients holding an old body cannot revalidate it
+PROFILE_REPRESENTATION = 1
 
 
 @router.post("/login", response_model=LoginResponse)
-@limiter.limit("10/minute")
+@limiter.limit(tenant_rate_limit("login"))
 async def login(request: Request, credentials: LoginRequest):
     """
     Login with email and password
@@ -61,18 +77,47 @@ async def login(request: Request, credentials: LoginRequest):
     user_id = str(user["_id"])
     access_token = create_access_token(user_id, credentials.email)
     
-    return LoginResponse(
-        success=True,
-        message="Login successful",
-        access_token=access_token,
-        token_type="bearer",
-        user={
+    return trusted_response(LoginResponse, {
+        "success": True,
+        "message": "Login successful",
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": {
             "id": user_id,
             "name": user["name"],
             "email": user["email"],
             "social_provider": user.get("social_provider")
         }
+    })
+
+
+async def _authorize_redirect(client, request: Request, redirect_uri: str) -> RedirectResponse:
+    """
+    Redirect to the provider with a signed state bound to this browser
+    
+    authlib stores the flow's data (including the PKCE verifier) in the
+    OAuth state store under the state; the cookie only holds the state.
+    """
+    state = new_state()
+    response = await client.authorize_redirect(request, redirect_uri, state=state)
+    response.set_cookie(
+        STATE_COOKIE,
+        state,
+        max_age=settings.OAUTH_STATE_TTL_SECONDS,
+        path=STATE_COOKIE_PATH,
+        secure=redirect_uri.startswith("https://"),
+        httponly=True,
+        # Lax still sends it on the provider's top-level redirect back
+        samesite="lax"
     )
+    return response
+
+
+def _frontend_redirect(query: str) -> RedirectResponse:
+    """Redirect a finished callback to the web frontend, dropping the state cookie"""
+    response = RedirectResponse(url=f"{settings.FRONTEND_URL_WEB}/auth/callback?{query}")
+    response.delete_cookie(STATE_COOKIE, path=STATE_COOKIE_PATH)
+    return response
 
 
 # ============================================
@@ -93,7 +138,7 @@ async def google_login(request: Request):
         )
     
     redirect_uri = settings.GOOGLE_REDIRECT_URI
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await _authorize_redirect(get_oauth().google, request, redirect_uri)
 
 
 @router.get("/google/callback")
@@ -112,9 +157,14 @@ async def google_callback(request: Request):
             detail="Google OAuth is not configured"
         )
     
+    if not verify_state(request.query_params.get("state"), request.cookies.get(STATE_COOKIE)):
+        return _frontend_redirect("error=invalid_state")
+    
     try:
         # Get access token from Google
-        token = await oauth.google.authorize_access_token(request)
+        token = await get_oauth().google.authorize_access_token(
+            request, timeout=outbound_timeout(OAUTH_HTTP_TIMEOUT)
+        )
         
         # Get user info from Google
         user_info = token.get('userinfo')
@@ -155,14 +205,16 @@ async def google_callback(request: Request):
         access_token = create_access_token(user_id, email)
         
         # Redirect to frontend with token
-        frontend_url = f"{settings.FRONTEND_URL_WEB}/auth/callback?token={access_token}"
-        return RedirectResponse(url=frontend_url)
+        return _frontend_redirect(f"token={access_token}")
+        
+    except DatabaseUnavailableError:
+        # Browser flow: redirect instead of a 503 body
+        return _frontend_redirect("error=service_unavailable")
         
     except Exception as e:
-        print(f"[ERROR] Google OAuth error: {e}")
+        logger.error("Google OAuth error: %s", e)
         # Redirect to frontend with error
-        error_url = f"{settings.FRONTEND_URL_WEB}/auth/callback?error=oauth_failed"
-        return RedirectResponse(url=error_url)
+        return _frontend_redirect("error=oauth_failed")
 
 
 # ============================================
@@ -183,7 +235,7 @@ async def facebook_login(request: Request):
         )
     
     redirect_uri = settings.FACEBOOK_REDIRECT_URI
-    return await oauth.facebook.authorize_redirect(request, redirect_uri)
+    return await _authorize_redirect(get_oauth().facebook, request, redirect_uri)
 
 
 @router.get("/facebook/callback")
@@ -202,12 +254,19 @@ async def facebook_callback(request: Request):
             detail="Facebook OAuth is not configured"
         )
     
+    if not verify_state(request.query_params.get("state"), request.cookies.get(STATE_COOKIE)):
+        return _frontend_redirect("error=invalid_state")
+    
     try:
         # Get access token from Facebook
-        token = await oauth.facebook.authorize_access_token(request)
+        token = await get_oauth().facebook.authorize_access_token(
+            request, timeout=outbound_timeout(OAUTH_HTTP_TIMEOUT)
+        )
         
         # Get user info from Facebook
-        resp = await oauth.facebook.get('me?fields=id,name,email', token=token)
+        resp = await get_oauth().facebook.get(
+            'me?fields=id,name,email', token=token, timeout=outbound_timeout(OAUTH_HTTP_TIMEOUT)
+        )
         user_info = resp.json()
         
         email = user_info.get('email')
@@ -241,46 +300,77 @@ async def facebook_callback(request: Request):
         access_token = create_access_token(user_id, email)
         
         # Redirect to frontend with token
-        frontend_url = f"{settings.FRONTEND_URL_WEB}/auth/callback?token={access_token}"
-        return RedirectResponse(url=frontend_url)
+        return _frontend_redirect(f"token={access_token}")
+        
+    except DatabaseUnavailableError:
+        # Browser flow: redirect instead of a 503 body
+        return _frontend_redirect("error=service_unavailable")
         
     except Exception as e:
-        print(f"[ERROR] Facebook OAuth error: {e}")
+        logger.error("Facebook OAuth error: %s", e)
         # Redirect to frontend with error
-        error_url = f"{settings.FRONTEND_URL_WEB}/auth/callback?error=oauth_failed"
-        return RedirectResponse(url=error_url)
+        return _frontend_redirect("error=oauth_failed")
 
 
 # ============================================
 # USER PROFILE (Protected Route Example)
 # ============================================
 
-@router.get("/me")
-async def get_current_user_profile(request: Request):
+@router.get(
+    "/me",
+    response_model=UserResponse,
+    responses={304: {"description": "Profile unchanged since the ETag sent in If-None-Match"}}
+)
+async def get_current_user_profile(request: Request, user_id: str = Depends(get_token_user_id)):
     """
     Get current authenticated user's profile
     
-    Requires valid JWT token in Authorization header
+    Requires valid JWT token in Authorization header. The response carries a
+    strong ETag derived from the user's version counter; a request whose
+    If-None-Match still matches is answered with 304 after an index-only
+    version lookup, without reading the document.
     """
-    from app.auth.jwt_handler import get_current_user
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await get_user_version(user_id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        etag = profile_etag(user_id, version)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_profile_headers(etag))
     
-    try:
-        user = await get_current_user(request)
-        
-        return {
-            "id": str(user["_id"]),
-            "name": user["name"],
-            "email": user["email"],
-            "social_provider": user.get("social_provider"),
-            "created_at": user["created_at"].isoformat() if user.get("created_at") else None,
-            "last_login": user["last_login"].isoformat() if user.get("last_login") else None,
-            "is_verified": user.get("is_verified", False)
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"[ERROR] Error getting user profile: {e}")
+    user = await get_user_by_id(user_id)
+    if user is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve user profile"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
         )
+    
+    # ObjectId and datetimes are converted by the encoder
+    return trusted_response(UserResponse, {
+        "id": user["_id"],
+        "name": user["name"],
+        "email": user["email"],
+        "social_provider": user.get("social_provider"),
+        "created_at": user.get("created_at"),
+        "last_login": user.get("last_login"),
+        "is_verified": user.get("is_verified", False)
+    }, headers=_profile_headers(profile_etag(user_id, user.get("version") or 0)))
+
+
+def profile_etag(user_id: str, version: int) -> str:
+    """
+    Strong ETag of a user's /me body
+    
+    The body is a function of the document, which changes only together
+    with its version, so (user, version) identifies it byte for byte.
+    """
+    return f'"{PROFILE_REPRESENTATION}-{user_id}-{version}"'
+
+
+def _profile_headers(etag: str) -> dict:
+    # no-cache: browsers may keep the body but must revalidate it every time
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
@@ -2,8 +2,11 @@ from fastapi import APIRouter, HTTPException, status
 from datetime import datetime, timedelta
 import random
 from app.models import PasswordResetRequest, PasswordResetVerify, PasswordResetComplete, PasswordResetResponse
-from app.services.user_service import get_user_by_email, set_reset_code, update_password
+from app.config import settings
+from app.responses import trusted_response
+from app.services.user_service import get_user_by_email, claim_reset_send, release_reset_send, update_password
 from app.services.email_service import send_reset_code
+from app.services import reset_throttle
 
 router = APIRouter(prefix="/api/password-reset", tags=["Password Reset"])
 
@@ -18,17 +21,24 @@ async def request_password_reset(request: PasswordResetRequest):
     """
     Request a password reset code
     
-    Sends a 6-digit code to the user's email that expires in 15 minutes
+    Sends a 6-digit code to the user's email that expires in 15 minutes.
+    While a code was sent recently the request is answered without sending
+    another email, and each account has a limited number of sends per window.
     """
+    # Fast path: account was throttled recently by this worker
+    blocked = reset_throttle.check_blocked(request.email)
+    if blocked:
+        return _throttled_response(*blocked)
+    
     # Check if user exists
     user = await get_user_by_email(request.email)
     
     if not user:
         # Don't reveal if user exists or not for security
-        return {
+        return trusted_response(PasswordResetResponse, {
             "success": True,
             "message": "If the email exists, a reset code has been sent"
-        }
+        })
     
     # Check if user registered with social provider
     if user.get("social_provider"):
@@ -37,25 +47,69 @@ async def request_password_reset(request: PasswordResetRequest):
             detail="Please login with your social account"
         )
     
-    # Generate reset code
-    reset_code = generate_reset_code()
-    
-    # Save reset code to database (expires in 15 minutes)
-    await set_reset_code(request.email, reset_code, expires_in_minutes=15)
+    # Apply cooldown and send budget from the stored state
+    decision = reset_throttle.evaluate_reset_request(user, datetime.utcnow())
+    if decision["action"] != reset_throttle.SEND:
+        reset_throttle.remember_blocked(request.email, decision["action"], decision["retry_after"])
+        return _throttled_response(decision["action"], decision["retry_after"])
+    
+    # Reuse the unexpired code or generate a new one
+    reset_code = decision["code"] or generate_reset_code()
+    
+    # Save reset code to database; only one concurrent request wins the send
+    sent_at = await claim_reset_send(
+        request.email,
+        reset_code,
+        previous_sent_at=user.get("reset_code_sent_at"),
+        send_count=decision["send_count"],
+        window_start=decision["window_start"],
+        code_expires=decision["code_expires"],
+        expires_in_minutes=settings.RESET_CODE_EXPIRY_MINUTES
+    )
+    
+    if sent_at is None:
+        return _throttled_response(reset_throttle.COOLDOWN, settings.RESET_RESEND_COOLDOWN_SECONDS)
+    
+    reset_throttle.remember_blocked(
+        request.email, reset_throttle.COOLDOWN, settings.RESET_RESEND_COOLDOWN_SECONDS
+    )
     
     # Send email with reset code
     email_sent = await send_reset_code(request.email, reset_code)
     
     if not email_sent:
+        # Nothing was sent: let the user retry right away, within the same budget
+        reset_throttle.forget(request.email)
+        await release_reset_send(request.email, sent_at, user)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to send reset code"
         )
     
-    return {
+    return trusted_response(PasswordResetResponse, {
         "success": True,
         "message": "Reset code sent to your email"
-    }
+    })
+
+
+def _throttled_response(reason: str, retry_after: int):
+    """
+    Build the response for a throttled reset request
+    
+    A recent code is still valid during the cooldown, so that case is reported
+    as success; an exhausted send budget is rejected with 429.
+    """
+    if reason == reset_throttle.BUDGET_EXHAUSTED:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many reset requests. Please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    return trusted_response(PasswordResetResponse, {
+        "success": True,
+        "message": "A reset code was sent recently. Please check your email"
+    })
 
 
 @router.post("/verify", response_model=PasswordResetResponse, summary="Verify Reset Code")
@@ -95,10 +149,10 @@ async def verify_reset_code(request: PasswordResetVerify):
             detail="Reset code has expired. Please request a new one"
         )
     
-    return {
+    return trusted_response(PasswordResetResponse, {
         "success": True,
         "message": "Reset code verified successfully"
-    }
+    })
 
 
 @router.post("/complete", response_model=PasswordResetResponse, summary="Complete Password Reset")
@@ -141,7 +195,7 @@ async def complete_password_reset(request: PasswordResetComplete):
     # Update password
     await update_password(request.email, request.new_password)
     
-    return {
+    return trusted_response(PasswordResetResponse, {
         "success": True,
         "message": "Password reset successfully"
-    }
+    })
@@ -0,0 +1,272 @@
+"""
+Scheduler - Periodic background jobs run by one worker across all nodes
+
+Every worker runs a Scheduler, but only the one holding its MongoDB lease
+(a document in SCHEDULER_COLLECTION_NAME, renewed every third of
+SCHEDULER_LEASE_SECONDS) runs jobs. When the leader stops or dies, the lease
+expires and another worker takes over on its next attempt. Each job's last
+run is stored next to the lease, so a new leader keeps the jobs' intervals
+instead of running everything again after every deploy.
+
+A job is an async function taking a JobRun, on which it reports progress;
+it is cancelled if the lease is lost while it runs.
+"""
+import asyncio
+import logging
+import os
+import random
+import secrets
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from app.config import settings
+from app.database import DatabaseUnavailableError, get_collection
+from app.monitoring.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEADER = Gauge(
+    "scheduler_leader",
+    "1 while this process holds the scheduler lease"
+)
+
+SCHEDULER_JOB_RUNS = Counter(
+    "scheduler_job_runs_total",
+    "Scheduled job runs by outcome",
+    ("job", "status")
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duration of scheduled job runs",
+    ("job",)
+)
+
+
+class MongoLease:
+    """Named lease held by at most one process until it expires"""
+
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+    def _collection(self):
+        return get_collection(settings.SCHEDULER_COLLECTION_NAME)
+
+    async def acquire(self) -> bool:
+        """
+        Take the lease if it is free or expired, or extend it if already held
+
+        Returns:
+            True if this process holds the lease for another ttl_seconds
+        """
+        now = datetime.utcnow()
+        try:
+            await self._collection().update_one(
+                {"_id": f"lease:{self.name}", "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by another process: the filter missed and the upsert collided
+            return False
+
+    async def release(self) -> None:
+        """Give the lease up so another process can take it right away"""
+        await self._collection().delete_one({"_id": f"lease:{self.name}", "owner": self.owner})
+
+
+class JobRun:
+    """Progress of one run of a job"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = datetime.utcnow()
+        self.counts: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        """Add to a progress counter (shown by the admin API while the job runs)"""
+        self.counts[key] = self.counts.get(key, 0) + count
+
+
+class ScheduledJob:
+    """A job with its interval and the last run seen by this process"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[JobRun], Awaitable[None]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.current: Optional[JobRun] = None
+        self.last_status: Optional[str] = None
+        self.last_counts: Dict[str, int] = {}
+        self.last_finished_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "running": self.current is not None,
+            "progress": dict(self.current.counts) if self.current is not None else None,
+            "last_status": self.last_status,
+            "last_counts": self.last_counts,
+            "last_finished_at": self.last_finished_at.isoformat() + "Z" if self.last_finished_at else None,
+            "last_error": self.last_error
+        }
+
+
+class Scheduler:
+    """Runs registered jobs on their intervals while holding the lease"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._lease: Optional[MongoLease] = None
+        self._leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[JobRun], Awaitable[None]]) -> None:
+        """
+        Register a job (replacing one with the same name)
+
+        Args:
+            name: Job name, used in metrics and the stored schedule
+            interval_seconds: Time between the end of a run and the next start
+            func: Async function taking a JobRun
+        """
+        self.jobs[name] = ScheduledJob(name, interval_seconds, func)
+
+    def start(self) -> None:
+        """Start competing for the lease on the running loop"""
+        if self._task is None:
+            self._lease = MongoLease(self.name, settings.SCHEDULER_LEASE_SECONDS)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop running jobs and release the lease"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._leader:
+            self._set_leader(False)
+            try:
+                await self._lease.release()
+            except (DatabaseUnavailableError, PyMongoError) as e:
+                logger.warning("Could not release scheduler lease: %s", e)
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader != self._leader:
+            logger.info("Scheduler %s %s the lease (%s)", self.name,
+                        "acquired" if leader else "lost", self._lease.owner)
+        self._leader = leader
+        SCHEDULER_LEADER.labels().set(1 if leader else 0)
+
+    async def _renew(self) -> bool:
+        try:
+            leader = await self._lease.acquire()
+        except (DatabaseUnavailableError, PyMongoError) as e:
+            # Keep running jobs only while the lease is certainly still ours
+            logger.warning("Scheduler lease renewal failed: %s", e)
+            leader = False
+        self._set_leader(leader)
+        return leader
+
+    def _renew_interval(self) -> float:
+        return settings.SCHEDULER_LEASE_SECONDS / 3
+
+    async def _run(self) -> None:
+        # Spread the workers' first attempts and keep them off the startup path
+        await asyncio.sleep(random.uniform(1, self._renew_interval()))
+        while True:
+            if await self._renew():
+                for job in list(self.jobs.values()):
+                    if not self._leader:
+                        break
+                    try:
+                        if await self._is_due(job):
+                            await self._run_job(job)
+                    except (DatabaseUnavailableError, PyMongoError) as e:
+                        logger.warning("Scheduler could not check job %s: %s", job.name, e)
+            await asyncio.sleep(self._renew_interval())
+
+    async def _is_due(self, job: ScheduledJob) -> bool:
+        state = await get_collection(settings.SCHEDULER_COLLECTION_NAME).find_one(
+            {"_id": f"job:{job.name}"}, {"last_finished_at": 1}
+        )
+        last_finished_at = state.get("last_finished_at") if state else None
+        return last_finished_at is None or (
+            datetime.utcnow() - last_finished_at >= timedelta(seconds=job.interval_seconds)
+        )
+
+    async def _run_job(self, job: ScheduledJob) -> None:
+        """Run one job, renewing the lease meanwhile, and store its outcome"""
+        run = job.current = JobRun(job.name)
+        started = time.perf_counter()
+        task = asyncio.get_running_loop().create_task(job.func(run))
+        error = None
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self._renew_interval())
+                if done:
+                    break
+                if not await self._renew():
+                    task.cancel()
+                    break
+            await task
+            status = "ok"
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The scheduler itself is stopping
+                task.cancel()
+                raise
+            status = "cancelled"
+        except Exception as e:
+            logger.exception("Scheduled job %s failed", job.name)
+            status = "error"
+            error = str(e) or type(e).__name__
+        finally:
+            job.current = None
+
+        duration = time.perf_counter() - started
+        SCHEDULER_JOB_RUNS.labels(job.name, status).inc()
+        SCHEDULER_JOB_DURATION.labels(job.name).observe(duration)
+        logger.info("Scheduled job %s: %s in %.1fs %s", job.name, status, duration, run.counts)
+
+        job.last_status = status
+        job.last_counts = dict(run.counts)
+        job.last_finished_at = datetime.utcnow()
+        job.last_error = error
+        if status != "cancelled":
+            await get_collection(settings.SCHEDULER_COLLECTION_NAME).update_one(
+                {"_id": f"job:{job.name}"},
+                {"$set": {
+                    "last_started_at": run.started_at,
+                    "last_finished_at": job.last_finished_at,
+                    "last_status": status,
+                    "last_counts": job.last_counts,
+                    "last_error": error,
+                    "owner": self._lease.owner
+                }},
+                upsert=True
+            )
+
+    def snapshot(self) -> Dict:
+        """Leadership and job state as seen by this process, for the admin API"""
+        return {
+            "running": self._task is not None,
+            "leader": self._leader,
+            "owner": self._lease.owner if self._lease is not None else None,
+            "jobs": {name: job.snapshot() for name, job in self.jobs.items()}
+        }
+
+
+scheduler = Scheduler("maintenance")
@@ -0,0 +1,221 @@
+"""
+Production Server Launcher - Gunicorn with Uvicorn workers
+
+Usage:
+    python -m app.server
+
+- Worker count follows the container's CPU quota (cgroup v2 cpu.max or v1
+  cfs quota), not the host's core count; SERVER_WORKERS overrides it
+- Workers run uvloop and httptools when installed (uvicorn[standard])
+- The app is imported once in the master and forked (SERVER_PRELOAD), so
+  every worker shares the same settings, including a generated JWT_SECRET;
+  Mongo clients and background threads are only created after the fork
+- Workers are recycled gracefully after SERVER_MAX_REQUESTS requests (with
+  jitter) or once their RSS passes SERVER_MAX_RSS_MB
+- A worker only accepts connections after its lifespan startup, which warms
+  its MongoDB pool, so traffic never reaches a worker with a cold pool
+- With more than one worker, workers share a METRICS_MULTIPROCESS_DIR
+  (a fresh temporary directory unless set), so /metrics on any worker
+  reports every worker's series with a "worker" (PID) label
+
+All other in-process state is per worker: the admin endpoints (profiling,
+tracemalloc, slow queries, concurrency limits, scheduler status, ...) report
+on and change only the worker that happens to receive the request.
+
+Development keeps using `uvicorn app.main:app --reload`.
+"""
+import asyncio
+import importlib.util
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, Optional
+from gunicorn.arbiter import Arbiter
+from uvicorn import Server
+from uvicorn.workers import UvicornWorker
+from app.config import settings
+from app.logger import setup_logging
+from app.monitoring.memory import current_rss_bytes
+from app.monitoring.metrics import remove_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    CPU limit of the container in cores
+
+    Returns:
+        Quota divided by period, or None when no quota is set
+    """
+    # cgroup v2: "max 100000" or "<quota> <period>"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+            if quota != "max":
+                return int(quota) / int(period)
+            return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as quota_file:
+            quota = int(quota_file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as period_file:
+            period = int(period_file.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (affinity mask, not host total)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    """
+    Number of worker processes to start
+
+    One worker per available core: request handling is async, and the CPU
+    heavy part (bcrypt) gains nothing from more processes than cores.
+    """
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+
+    cpus = available_cpus()
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+class AppUvicornWorker(UvicornWorker):
+    """Uvicorn worker with uvloop/httptools and RSS-based recycling"""
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "lifespan": "on"
+    }
+
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = Server(config=self.config)
+        self._install_sigquit_handler()
+
+        watchdog = None
+        if settings.SERVER_MAX_RSS_MB > 0:
+            watchdog = asyncio.create_task(self._watch_rss(server))
+
+        await server.serve(sockets=self.sockets)
+        if watchdog is not None:
+            watchdog.cancel()
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+    async def _watch_rss(self, server: Server) -> None:
+        """Ask the server to drain and exit once RSS passes the limit"""
+        limit = settings.SERVER_MAX_RSS_MB * 1024 * 1024
+        while not server.should_exit:
+            await asyncio.sleep(settings.SERVER_RSS_CHECK_INTERVAL_SECONDS)
+            rss = current_rss_bytes()
+            if rss > limit and server.started:
+                logger.warning(
+                    "Worker %s RSS %.0f MB over limit %s MB, recycling",
+                    os.getpid(), rss / 1024 / 1024, settings.SERVER_MAX_RSS_MB
+                )
+                # Same path as max-requests: stop accepting, finish in-flight requests
+                server.should_exit = True
+
+
+def gunicorn_options() -> Dict:
+    """Gunicorn settings derived from the application settings"""
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "app.server.AppUvicornWorker",
+        "preload_app": settings.SERVER_PRELOAD,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "timeout": settings.SERVER_WORKER_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "forwarded_allow_ips": settings.SERVER_FORWARDED_ALLOW_IPS,
+        "accesslog": None,
+        "errorlog": "-",
+        "loglevel": settings.LOG_LEVEL.lower()
+    }
+
+
+def prepare_metrics_dir(workers: int) -> Optional[str]:
+    """
+    Directory the workers share their metrics through, emptied of old files
+
+    Returns:
+        The directory, or None with a single worker (unless configured)
+    """
+    if not settings.METRICS_ENABLED:
+        return None
+    directory = settings.METRICS_MULTIPROCESS_DIR
+    if not directory:
+        if workers <= 1:
+            return None
+        directory = tempfile.mkdtemp(prefix="auth-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".prom") or name.endswith(".prom.tmp"):
+            os.remove(os.path.join(directory, name))
+    # Preloaded workers inherit settings, the others read the environment
+    settings.METRICS_MULTIPROCESS_DIR = os.environ["METRICS_MULTIPROCESS_DIR"] = directory
+    return directory
+
+
+def main() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def __init__(self, options: Dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app, import_deferred_modules
+            if self.cfg.preload_app:
+                # Workers inherit the lazily imported SDKs from the master
+                import_deferred_modules()
+            return app
+
+    setup_logging()
+    options = gunicorn_options()
+    temporary_metrics_dir = not settings.METRICS_MULTIPROCESS_DIR
+    metrics_dir = prepare_metrics_dir(options["workers"])
+    if metrics_dir is not None:
+        # Covers workers that crashed or were killed before removing their file
+        options["child_exit"] = lambda server, worker: remove_snapshot(metrics_dir, worker.pid)
+        if temporary_metrics_dir:
+            options["on_exit"] = lambda server: shutil.rmtree(metrics_dir, ignore_errors=True)
+    logger.info(
+        "Starting %s workers on %s (cgroup CPU limit: %s, loop: %s, http: %s, preload: %s)",
+        options["workers"], options["bind"], cgroup_cpu_limit(),
+        AppUvicornWorker.CONFIG_KWARGS["loop"], AppUvicornWorker.CONFIG_KWARGS["http"],
+        options["preload_app"]
+    )
+    Application(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
-from typing import Optional
+import importlib.util
+import logging
+from typing import Optional, Tuple
 from app.config import settings
+from app.logger import NEVER_DROP
+
+logger = logging.getLogger(__name__)
 
 
 async def send_reset_code(email: str, code: str) -> bool:
@@ -20,20 +25,25 @@ async def send_reset_code(email: str, code: str) -> bool:
         <h2>Password Reset Request</h2>
         <p>Your password reset code is:</p>
         <h1 style="color: #3B4CB8; letter-spacing: 5px;">{code}</h1>
-        <p>This code will expire in 15 minutes.</p>
+        <p>This code will expire in {settings.RESET_CODE_EXPIRY_MINUTES} minutes.</p>
         <p>If you didn't request this, please ignore this email.</p>
     </body>
     </html>
     """
     
     if settings.EMAIL_SERVICE == "console":
-        # For development - just print to console
-        print(f"\n{'='*50}")
-        print(f"[EMAIL] TO: {email}")
-        print(f"[EMAIL] SUBJECT: {subject}")
-        print(f"[EMAIL] RESET CODE: {code}")
-        print(f"[EMAIL] EXPIRES IN: 15 minutes")
-        print(f"{'='*50}\n")
+        # For development - just log the email as a single record
+        logger.info(
+            "Console email to %s: %s",
+            email, subject,
+            extra={
+                "email_to": email,
+                "reset_code": code,
+                "expires_in_minutes": settings.RESET_CODE_EXPIRY_MINUTES,
+                # The only way a developer receives the code
+                NEVER_DROP: True
+            }
+        )
         return True
     
     elif settings.EMAIL_SERVICE == "azure":
@@ -42,7 +52,7 @@ async def send_reset_code(email: str, code: str) -> bool:
             from azure.communication.email import EmailClient
             
             if not settings.AZURE_COMMUNICATION_CONNECTION_STRING:
-                print("[WARNING] Azure Communication connection string not configured")
+                logger.warning("Azure Communication connection string not configured")
                 return False
             
             client = EmailClient.from_connection_string(
@@ -63,11 +73,11 @@ async def send_reset_code(email: str, code: str) -> bool:
             poller = client.begin_send(message)
             result = poller.result()
             
-            print(f"[OK] Email sent to {email} via Azure")
+            logger.info("Email sent to %s via Azure", email)
             return True
             
         except Exception as e:
-            print(f"[ERROR] Failed to send email via Azure: {e}")
+            logger.error("Failed to send email via Azure: %s", e)
             return False
     
     elif settings.EMAIL_SERVICE == "sendgrid":
@@ -77,7 +87,7 @@ async def send_reset_code(email: str, code: str) -> bool:
             from sendgrid.helpers.mail import Mail
             
             if not settings.SENDGRID_API_KEY:
-                print("[WARNING] SendGrid API key not configured")
+                logger.warning("SendGrid API key not configured")
                 return False
             
             message = Mail(
@@ -90,15 +100,15 @@ async def send_reset_code(email: str, code: str) -> bool:
             sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
             response = sg.send(message)
             
-            print(f"[OK] Email sent to {email} via SendGrid")
+            logger.info("Email sent to %s via SendGrid", email)
             return True
             
         except Exception as e:
-            print(f"[ERROR] Failed to send email via SendGrid: {e}")
+            logger.error("Failed to send email via SendGrid: %s", e)
             return False
     
     else:
-        print(f"[ERROR] Unknown email service: {settings.EMAIL_SERVICE}")
+        logger.error("Unknown email service: %s", settings.EMAIL_SERVICE)
         return False
 
 
@@ -125,11 +135,45 @@ async def send_welcome_email(email: str, name: str) -> bool:
     """
     
     if settings.EMAIL_SERVICE == "console":
-        print(f"\n{'='*50}")
-        print(f"[EMAIL] WELCOME EMAIL TO: {email}")
-        print(f"[EMAIL] NAME: {name}")
-        print(f"{'='*50}\n")
+        logger.info("Console welcome email to %s", email, extra={"email_to": email, "name": name})
         return True
     
     # Add actual email sending logic here similar to send_reset_code
     return True
+
+
+def _installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def email_backend_status() -> Tuple[bool, str]:
+    """
+    Check that the configured email backend can be used
+
+    Only configuration and SDK availability are checked; no email or API
+    call is made, so this is safe to run periodically.
+
+    Returns:
+        (usable, detail) for the backend selected by EMAIL_SERVICE
+    """
+    if settings.EMAIL_SERVICE == "console":
+        return True, "console"
+
+    if settings.EMAIL_SERVICE == "azure":
+        if not settings.AZURE_COMMUNICATION_CONNECTION_STRING:
+            return False, "azure: connection string not configured"
+        if not _installed("azure.communication.email"):
+            return False, "azure: azure-communication-email not installed"
+        return True, "azure"
+
+    if settings.EMAIL_SERVICE == "sendgrid":
+        if not settings.SENDGRID_API_KEY:
+            return False, "sendgrid: API key not configured"
+        if not _installed("sendgrid"):
+            return False, "sendgrid: sendgrid not installed"
+        return True, "sendgrid"
+
+    return False, f"unknown email service {settings.EMAIL_SERVICE!r}"
@@ -0,0 +1,315 @@
+"""
+Account Erasure - Resumable bulk deletion or anonymization of accounts
+
+An erasure job is a document in ERASURE_COLLECTION_NAME holding the tenant,
+the mode (delete or anonymize), the requested user IDs and emails, the IDs
+and emails of the accounts erased so far and a checkpoint. A worker claims the job and processes ERASURE_BATCH_SIZE targets
+at a time: it looks the accounts up, erases them with one bulk write, drops
+cached reset throttle decisions for them and advances the checkpoint,
+pacing batches to ERASURE_BATCHES_PER_SECOND so live traffic keeps the
+primary. Reset state lives on the user document and goes with it, and
+copies archived by purge_unverified_accounts are erased in the same batch.
+
+Jobs are started by the admin API or tools/erase_users.py. A job whose
+worker stopped (no checkpoint for ERASURE_STALE_SECONDS) is resumed from its
+checkpoint by the scheduler, or explicitly; batches are idempotent, so a
+batch interrupted before its checkpoint is simply processed again.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.config import settings
+from app.database import get_collection
+from app.monitoring.metrics import Counter
+from app.scheduler import JobRun, Scheduler
+from app.services import reset_throttle
+from app.services.maintenance import BatchPacer
+from app.services.user_service import erase_users, find_users_for_erasure
+from app.tenancy import current_tenant, reset_current_tenant, set_current_tenant, tenant_registry
+
+logger = logging.getLogger(__name__)
+
+ERASURE_ACCOUNTS = Counter(
+    "erasure_accounts_total",
+    "Accounts processed by erasure jobs",
+    ("tenant", "mode", "outcome")
+)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Job fields reported by the API and the CLI (the target lists can be large)
+_SUMMARY = {"user_ids": 0, "emails": 0, "erased_ids": 0, "erased_emails": 0}
+
+# Jobs running in this process
+_running: Dict[str, asyncio.Task] = {}
+
+
+class ErasureJobNotFound(Exception):
+    """No erasure job with the given ID"""
+
+
+def _owner() -> str:
+    # Evaluated per call: workers forked from a preloaded master share module state
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _jobs():
+    return get_collection(settings.ERASURE_COLLECTION_NAME)
+
+
+async def create_job(user_ids: List[str], emails: List[str], mode: str) -> Dict:
+    """
+    Record an erasure job for the current tenant
+
+    Args:
+        user_ids: User IDs (hex strings)
+        emails: Email addresses
+        mode: "delete" or "anonymize"
+
+    Returns:
+        Job summary
+
+    Raises:
+        ValueError: If no targets or more than ERASURE_MAX_TARGETS are given
+    """
+    user_ids = list(dict.fromkeys(user_id.lower() for user_id in user_ids))
+    emails = list(dict.fromkeys(email.lower() for email in emails))
+    total = len(user_ids) + len(emails)
+    if total == 0:
+        raise ValueError("No user IDs or emails given")
+    if total > settings.ERASURE_MAX_TARGETS:
+        raise ValueError(f"At most {settings.ERASURE_MAX_TARGETS} accounts per job")
+
+    now = datetime.utcnow()
+    job = {
+        "_id": uuid.uuid4().hex,
+        "tenant": current_tenant().id,
+        "mode": mode,
+        "user_ids": user_ids,
+        "emails": emails,
+        # Accounts erased so far, so a later target naming one is not "not found"
+        "erased_ids": [],
+        "erased_emails": [],
+        "total": total,
+        "position": 0,
+        "erased": 0,
+        "not_found": 0,
+        "status": PENDING,
+        "owner": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None
+    }
+    await _jobs().insert_one(job)
+    logger.info("Erasure job %s: %s %s accounts of tenant %s", job["_id"], mode, total, job["tenant"])
+    return summary(job)
+
+
+def summary(job: Dict) -> Dict:
+    """Job fields without the target lists, with progress"""
+    result = {"id": job["_id"]}
+    result.update((key, value) for key, value in job.items() if key != "_id" and key not in _SUMMARY)
+    result["progress"] = round(job["position"] / job["total"], 4) if job["total"] else 1.0
+    return result
+
+
+async def get_job(job_id: str) -> Dict:
+    """
+    Current state of an erasure job
+
+    Raises:
+        ErasureJobNotFound: If there is no such job
+    """
+    job = await _jobs().find_one({"_id": job_id}, _SUMMARY)
+    if job is None:
+        raise ErasureJobNotFound(job_id)
+    return summary(job)
+
+
+async def _claim(job_id: str, resume_failed: bool) -> Optional[Dict]:
+    """Take a job that is pending, ours, or abandoned by a stopped worker"""
+    now = datetime.utcnow()
+    statuses = [PENDING, RUNNING, FAILED] if resume_failed else [PENDING, RUNNING]
+    return await _jobs().find_one_and_update(
+        {
+            "_id": job_id,
+            "status": {"$in": statuses},
+            "$or": [
+                {"owner": None},
+                {"owner": _owner()},
+                {"status": FAILED},
+                {"updated_at": {"$lt": now - timedelta(seconds=settings.ERASURE_STALE_SECONDS)}}
+            ]
+        },
+        {"$set": {"status": RUNNING, "owner": _owner(), "error": None, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_job(
+    job_id: str,
+    resume_failed: bool = False,
+    on_batch: Optional[Callable[[Dict], None]] = None
+) -> Optional[Dict]:
+    """
+    Claim a job and process it from its checkpoint to the end
+
+    Args:
+        job_id: Erasure job ID
+        resume_failed: Also take over a job that stopped with an error
+        on_batch: Called with the job summary after every batch
+
+    Returns:
+        Final job summary, or None if the job could not be claimed (done,
+        or running on a live worker)
+    """
+    job = await _claim(job_id, resume_failed)
+    if job is None:
+        return None
+
+    tenant = tenant_registry.get(job["tenant"])
+    if tenant is None:
+        await _finish(job, FAILED, f"Unknown tenant {job['tenant']}")
+        return summary(job)
+
+    token = set_current_tenant(tenant)
+    try:
+        await _process(job, on_batch)
+    except asyncio.CancelledError:
+        # Leave the job running; it is resumed once its checkpoint is stale
+        raise
+    except Exception as e:
+        logger.exception("Erasure job %s failed at %s/%s", job_id, job["position"], job["total"])
+        await _finish(job, FAILED, str(e) or type(e).__name__)
+    finally:
+        reset_current_tenant(token)
+    return summary(job)
+
+
+async def _process(job: Dict, on_batch: Optional[Callable[[Dict], None]]) -> None:
+    targets = [("id", value) for value in job["user_ids"]] + [("email", value) for value in job["emails"]]
+    anonymize = job["mode"] == "anonymize"
+    pacer = BatchPacer(settings.ERASURE_BATCHES_PER_SECOND)
+    erased_ids = set(job.get("erased_ids", []))
+    erased_emails = set(job.get("erased_emails", []))
+
+    while job["position"] < job["total"]:
+        await pacer.wait()
+        batch = targets[job["position"]:job["position"] + settings.ERASURE_BATCH_SIZE]
+        user_ids = [ObjectId(value) for kind, value in batch if kind == "id"]
+        emails = [value for kind, value in batch if kind == "email"]
+
+        found = await find_users_for_erasure(user_ids, emails)
+        archived = await find_users_for_erasure(user_ids, emails, archived=True)
+        live_ids = {user["_id"] for user in found}
+        erased = await erase_users(list(live_ids), anonymize=anonymize)
+        erased_archived = await erase_users([user["_id"] for user in archived], anonymize=anonymize, archived=True)
+        # An account that signed in while being archived has both; count it once
+        erased += max(0, erased_archived - sum(1 for user in archived if user["_id"] in live_ids))
+        for user in found + archived:
+            reset_throttle.forget(user["email"])
+
+        # Each target on its own: one account may be named by ID and email,
+        # possibly in different batches
+        batch_ids = {str(user["_id"]) for user in found + archived} - erased_ids
+        batch_emails = {user["email"].lower() for user in found + archived} - erased_emails
+        erased_ids |= batch_ids
+        erased_emails |= batch_emails
+        not_found = sum(
+            1 for kind, value in batch
+            if value not in (erased_ids if kind == "id" else erased_emails)
+        )
+
+        ERASURE_ACCOUNTS.labels(job["tenant"], job["mode"], "erased").inc(erased)
+        ERASURE_ACCOUNTS.labels(job["tenant"], job["mode"], "not_found").inc(not_found)
+
+        job["position"] += len(batch)
+        job["erased"] += erased
+        job["not_found"] += not_found
+        job["updated_at"] = datetime.utcnow()
+        result = await _jobs().update_one(
+            {"_id": job["_id"], "owner": _owner()},
+            {
+                "$set": {"position": job["position"], "updated_at": job["updated_at"]},
+                "$inc": {"erased": erased, "not_found": not_found},
+                "$push": {"erased_ids": {"$each": sorted(batch_ids)}, "erased_emails": {"$each": sorted(batch_emails)}}
+            }
+        )
+        if result.matched_count == 0:
+            logger.warning("Erasure job %s was taken over by another worker", job["_id"])
+            return
+        if on_batch is not None:
+            on_batch(summary(job))
+
+    await _finish(job, COMPLETED)
+    logger.info("Erasure job %s completed: %s erased, %s not found", job["_id"], job["erased"], job["not_found"])
+
+
+async def _finish(job: Dict, status: str, error: Optional[str] = None) -> None:
+    job.update(status=status, error=error, owner=None, updated_at=datetime.utcnow())
+    job["finished_at"] = job["updated_at"] if status == COMPLETED else None
+    await _jobs().update_one(
+        {"_id": job["_id"]},
+        {"$set": {key: job[key] for key in ("status", "error", "owner", "updated_at", "finished_at")}}
+    )
+
+
+def start_job(job_id: str, resume_failed: bool = False) -> bool:
+    """
+    Run a job in the background of this worker
+
+    Args:
+        job_id: Erasure job ID
+        resume_failed: Also take over a job that stopped with an error
+
+    Returns:
+        False if the job is already running in this worker
+    """
+    task = _running.get(job_id)
+    if task is not None and not task.done():
+        return False
+    task = asyncio.get_running_loop().create_task(run_job(job_id, resume_failed))
+    _running[job_id] = task
+    task.add_done_callback(lambda _: _running.pop(job_id, None))
+    return True
+
+
+async def stop_jobs() -> None:
+    """Cancel the jobs running in this worker (they are resumed elsewhere)"""
+    tasks = list(_running.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def resume_stale_jobs(run: JobRun) -> None:
+    """
+    Scheduler job: resume jobs whose worker stopped before finishing
+
+    Args:
+        run: Progress of this run
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.ERASURE_STALE_SECONDS)
+    stale = await _jobs().find_list(
+        {"status": {"$in": [PENDING, RUNNING]}, "updated_at": {"$lt": stale_before}},
+        {"_id": 1},
+        limit=100
+    )
+    for job in stale:
+        if job["_id"] not in _running and start_job(job["_id"]):
+            run.add("resumed")
+
+
+def register_erasure_jobs(scheduler: Scheduler) -> None:
+    """Add the stale erasure job check to a scheduler"""
+    scheduler.add_job("resume_erasure_jobs", settings.ERASURE_STALE_SECONDS, resume_stale_jobs)
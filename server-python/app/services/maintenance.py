@@ -0,0 +1,216 @@
+"""
+Maintenance Jobs - Batched cleanup of every tenant's users collection
+
+Jobs run on the scheduler leader (app/scheduler.py). They walk each users
+collection in `_id` ranges of MAINTENANCE_BATCH_SIZE documents: an
+index-only query finds where a range ends, and the update or delete is
+limited to that range, so no single query scans more than one batch however
+sparse the matches are. Batches are paced to MAINTENANCE_BATCHES_PER_SECOND
+so cleanup never competes with live traffic for the primary.
+
+With MAINTENANCE_DRY_RUN the jobs only count what they would change.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional
+from pymongo import ReplaceOne
+from app.config import settings
+from app.database import get_tenant_collection, get_users_collection
+from app.monitoring.metrics import Counter
+from app.scheduler import JobRun, Scheduler
+from app.tenancy import current_tenant, reset_current_tenant, set_current_tenant, tenant_registry
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_DOCUMENTS = Counter(
+    "maintenance_documents_total",
+    "User documents matched or changed by maintenance jobs",
+    ("job", "tenant", "action")
+)
+
+MAINTENANCE_BATCHES = Counter(
+    "maintenance_batches_total",
+    "_id range batches processed by maintenance jobs",
+    ("job", "tenant")
+)
+
+ARCHIVE_SUFFIX = "_archive"
+
+
+class BatchPacer:
+    """Spaces batches so they run at most `per_second` times a second"""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second if per_second > 0 else 0.0
+        self._next: Optional[float] = None
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        if self._next is not None and self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(now, self._next or now) + self.interval
+
+
+async def id_ranges(collection, batch_size: int, pacer: Optional[BatchPacer] = None) -> AsyncIterator[Dict]:
+    """
+    Walk a collection in ascending `_id` ranges of at most batch_size documents
+
+    Args:
+        collection: Guarded collection
+        batch_size: Documents per range
+        pacer: Awaited before each range
+
+    Yields:
+        `_id` conditions ({"$gt": low, "$lte": high}) to combine with a filter
+    """
+    low = None
+    while True:
+        if pacer is not None:
+            await pacer.wait()
+        page = await collection.find_list(
+            {"_id": {"$gt": low}} if low is not None else {}, {"_id": 1}, sort=("_id", 1), limit=batch_size
+        )
+        if not page:
+            return
+        high = page[-1]["_id"]
+        yield {"$lte": high} if low is None else {"$gt": low, "$lte": high}
+        if len(page) < batch_size:
+            return
+        low = high
+
+
+def record(run: JobRun, action: str, count: int) -> None:
+    """Add to a run's progress and the current tenant's document metrics"""
+    if count:
+        run.add(action, count)
+        MAINTENANCE_DOCUMENTS.labels(run.job, current_tenant().id, action).inc(count)
+
+
+async def for_each_tenant(run: JobRun, job) -> None:
+    """Run a job body once per tenant, with that tenant current"""
+    for tenant in tenant_registry.tenants.values():
+        token = set_current_tenant(tenant)
+        try:
+            await job(run)
+        finally:
+            reset_current_tenant(token)
+
+
+async def _update_in_ranges(run: JobRun, query: Dict, update: Dict, action: str) -> None:
+    users = get_users_collection()
+    pacer = BatchPacer(settings.MAINTENANCE_BATCHES_PER_SECOND)
+    async for id_range in id_ranges(users, settings.MAINTENANCE_BATCH_SIZE, pacer):
+        batch_query = dict(query, _id=id_range)
+        if settings.MAINTENANCE_DRY_RUN:
+            record(run, "matched", await users.count_documents(batch_query))
+        else:
+            result = await users.update_many(batch_query, update)
+            record(run, "matched", result.matched_count)
+            record(run, action, result.modified_count)
+        MAINTENANCE_BATCHES.labels(run.job, current_tenant().id).inc()
+
+
+async def clear_expired_reset_state(run: JobRun) -> None:
+    """
+    Clear expired reset codes and send budgets whose window has passed
+
+    Args:
+        run: Progress of this run
+    """
+    async def clear(run: JobRun) -> None:
+        now = datetime.utcnow()
+        await _update_in_ranges(
+            run,
+            {"reset_code_expires": {"$lt": now}},
+            {"$set": {"reset_code": None, "reset_code_expires": None}, "$inc": {"version": 1}},
+            "codes_cleared"
+        )
+        # A budget is only consulted within its window (evaluate_reset_request)
+        await _update_in_ranges(
+            run,
+            {"reset_send_window_start": {"$lt": now - timedelta(minutes=settings.RESET_SEND_WINDOW_MINUTES)}},
+            {
+                "$unset": {"reset_code_sent_at": "", "reset_send_count": "", "reset_send_window_start": ""},
+                "$inc": {"version": 1}
+            },
+            "budgets_cleared"
+        )
+
+    await for_each_tenant(run, clear)
+
+
+def stale_unverified_query(now: datetime) -> Dict:
+    """
+    Accounts that were never verified and never signed in
+
+    Password accounts stay unverified (there is no verification email yet),
+    so never having logged in is what marks an abandoned registration.
+    """
+    return {
+        "is_verified": False,
+        "last_login": None,
+        "created_at": {"$lt": now - timedelta(days=settings.UNVERIFIED_ACCOUNT_MAX_AGE_DAYS)}
+    }
+
+
+async def purge_unverified_accounts(run: JobRun) -> None:
+    """
+    Archive or delete stale unverified accounts (UNVERIFIED_ACCOUNT_ACTION)
+
+    Archived accounts are copied to the tenant's "<users>_archive"
+    collection before they are deleted.
+
+    Args:
+        run: Progress of this run
+    """
+    async def purge(run: JobRun) -> None:
+        users = get_users_collection()
+        archive = get_tenant_collection(current_tenant().collection + ARCHIVE_SUFFIX)
+        query = stale_unverified_query(datetime.utcnow())
+        pacer = BatchPacer(settings.MAINTENANCE_BATCHES_PER_SECOND)
+
+        async for id_range in id_ranges(users, settings.MAINTENANCE_BATCH_SIZE, pacer):
+            batch_query = dict(query, _id=id_range)
+            MAINTENANCE_BATCHES.labels(run.job, current_tenant().id).inc()
+            if settings.MAINTENANCE_DRY_RUN:
+                record(run, "matched", await users.count_documents(batch_query))
+                continue
+
+            if settings.UNVERIFIED_ACCOUNT_ACTION == "archive":
+                docs = await users.find_list(batch_query)
+                if not docs:
+                    continue
+                record(run, "matched", len(docs))
+                archived_at = datetime.utcnow()
+                await archive.bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, dict(doc, archived_at=archived_at), upsert=True) for doc in docs],
+                    ordered=False
+                )
+                record(run, "archived", len(docs))
+                # Re-check staleness: an account that signed in meanwhile stays
+                batch_query = dict(query, _id={"$in": [doc["_id"] for doc in docs]})
+
+            result = await users.delete_many(batch_query)
+            record(run, "deleted", result.deleted_count)
+
+    await for_each_tenant(run, purge)
+
+
+def register_maintenance_jobs(scheduler: Scheduler) -> None:
+    """
+    Add the maintenance jobs enabled by the settings to a scheduler
+
+    Args:
+        scheduler: Scheduler to register with
+    """
+    scheduler.add_job("clear_expired_reset_state", settings.RESET_CLEANUP_INTERVAL_SECONDS, clear_expired_reset_state)
+    if settings.UNVERIFIED_ACCOUNT_MAX_AGE_DAYS > 0:
+        scheduler.add_job(
+            "purge_unverified_accounts",
+            settings.UNVERIFIED_CLEANUP_INTERVAL_SECONDS,
+            purge_unverified_accounts
+        )
+    logger.info("Maintenance jobs: %s%s", ", ".join(scheduler.jobs),
+                " (dry run)" if settings.MAINTENANCE_DRY_RUN else "")
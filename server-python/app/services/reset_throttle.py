@@ -0,0 +1,148 @@
+"""
+Reset Throttle - Debounce password reset emails per account
+
+The database is the source of truth (reset_code_sent_at, reset_send_count and
+reset_send_window_start on the user document). A small in-process LRU keeps
+recent "blocked until" decisions so repeated requests from impatient users or
+bots are answered without touching MongoDB or the email provider.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.monitoring.memory import register_structure
+from app.tenancy import current_tenant
+
+# Decisions returned by evaluate_reset_request / check_blocked
+SEND = "send"
+COOLDOWN = "cooldown"
+BUDGET_EXHAUSTED = "budget_exhausted"
+
+# "tenant:email" -> (blocked_until monotonic seconds, reason)
+_blocked: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+register_structure("reset_throttle_entries", lambda: len(_blocked))
+
+
+def _key(email: str) -> str:
+    # The same address is a different account in each tenant
+    return f"{current_tenant().id}:{email.lower()}"
+
+
+def check_blocked(email: str) -> Optional[Tuple[str, int]]:
+    """
+    In-memory fast path for recently throttled accounts
+
+    Args:
+        email: User's email address
+
+    Returns:
+        (reason, retry_after_seconds) if the account is known to be blocked,
+        None if the database has to be consulted
+    """
+    key = _key(email)
+    entry = _blocked.get(key)
+    if entry is None:
+        return None
+
+    blocked_until, reason = entry
+    remaining = blocked_until - time.monotonic()
+    if remaining <= 0:
+        _blocked.pop(key, None)
+        return None
+
+    _blocked.move_to_end(key)
+    return reason, int(remaining) + 1
+
+
+def remember_blocked(email: str, reason: str, seconds: float) -> None:
+    """
+    Cache a throttling decision for the given number of seconds
+
+    Args:
+        email: User's email address
+        reason: COOLDOWN or BUDGET_EXHAUSTED
+        seconds: How long the decision stays valid
+    """
+    if seconds <= 0:
+        return
+
+    key = _key(email)
+    _blocked[key] = (time.monotonic() + seconds, reason)
+    _blocked.move_to_end(key)
+
+    while len(_blocked) > settings.RESET_THROTTLE_MAX_ENTRIES:
+        _blocked.popitem(last=False)
+
+
+def forget(email: str) -> None:
+    """
+    Drop the cached decision for an account (e.g. after it was erased)
+
+    Args:
+        email: User's email address
+    """
+    _blocked.pop(_key(email), None)
+
+
+def evaluate_reset_request(user: Dict, now: datetime) -> Dict:
+    """
+    Decide what to do with a reset request based on the stored user document
+
+    Args:
+        user: User document from MongoDB
+        now: Current UTC time
+
+    Returns:
+        Dictionary with:
+        - action: SEND, COOLDOWN or BUDGET_EXHAUSTED
+        - retry_after: Seconds until the next send is allowed (throttled only)
+        - code: Unexpired code to reuse, or None to generate a new one
+        - code_expires: Expiry of the reused code, or None
+        - send_count / window_start: Budget values to store with the send
+    """
+    cooldown = timedelta(seconds=settings.RESET_RESEND_COOLDOWN_SECONDS)
+    window = timedelta(minutes=settings.RESET_SEND_WINDOW_MINUTES)
+
+    sent_at = user.get("reset_code_sent_at")
+    if sent_at and now - sent_at < cooldown:
+        return {
+            "action": COOLDOWN,
+            "retry_after": _seconds_until(sent_at + cooldown, now),
+        }
+
+    window_start = user.get("reset_send_window_start")
+    send_count = user.get("reset_send_count") or 0
+    if not window_start or now - window_start >= window:
+        window_start = now
+        send_count = 0
+
+    if send_count >= settings.RESET_MAX_SENDS_PER_WINDOW:
+        return {
+            "action": BUDGET_EXHAUSTED,
+            "retry_after": _seconds_until(window_start + window, now),
+        }
+
+    # Reuse an unexpired code so repeated emails all carry the same value
+    code = code_expires = None
+    expires_at = user.get("reset_code_expires")
+    if user.get("reset_code") and expires_at and expires_at > now:
+        code, code_expires = user["reset_code"], expires_at
+
+    return {
+        "action": SEND,
+        "code": code,
+        "code_expires": code_expires,
+        "send_count": send_count + 1,
+        "window_start": window_start,
+    }
+
+
+def _seconds_until(moment: datetime, now: datetime) -> int:
+    """Whole seconds (rounded up, at least 1) from now until moment"""
+    return max(1, int((moment - now).total_seconds()) + 1)
+
+
+def clear() -> None:
+    """Drop all cached throttling decisions"""
+    _blocked.clear()
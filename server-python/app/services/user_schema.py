@@ -0,0 +1,168 @@
+"""
+User Schema - Shape of user documents and upgrades between its versions
+
+Every user document records the shape it was written in as
+"schema_version" (documents written before the field existed are version
+0). new_user_document() is the only place that builds a document, and
+upgrade() brings a document read from MongoDB up to SCHEMA_VERSION in
+memory, so the rest of the code only ever sees the current shape.
+
+Changing the shape means bumping SCHEMA_VERSION, adding the upgrade from the
+previous version to UPGRADES and updating new_user_document(). Stored
+documents are only rewritten by the opt-in background migrator
+(USER_MIGRATION_ENABLED), which walks each users collection in throttled
+`_id` range batches, so no deploy needs a bulk rewrite. The "version" edit counter is
+unrelated to the schema; the migrator uses it to skip documents that
+changed while it was upgrading them.
+"""
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from pymongo import UpdateOne
+from app.config import settings
+from app.database import get_users_collection
+from app.scheduler import JobRun, Scheduler
+from app.services.maintenance import MAINTENANCE_BATCHES, BatchPacer, for_each_tenant, id_ranges, record
+from app.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+# Fields of a version 1 document, with the values legacy documents lack them as
+_V1_DEFAULTS = {
+    "social_provider": None,
+    "social_provider_id": None,
+    "password_hash": None,
+    "last_login": None,
+    "is_verified": False,
+    "reset_code": None,
+    "reset_code_expires": None
+}
+
+
+def _upgrade_0_to_1(doc: Dict) -> Dict:
+    """Documents from before schema_version: fill in the fields they may lack"""
+    for field, default in _V1_DEFAULTS.items():
+        doc.setdefault(field, default)
+    return doc
+
+
+# Upgrade from version N to N + 1, keyed by N
+UPGRADES: Dict[int, Callable[[Dict], Dict]] = {
+    0: _upgrade_0_to_1
+}
+
+
+def new_user_document(
+    name: str,
+    email: str,
+    password_hash: Optional[str] = None,
+    social_provider: Optional[str] = None,
+    social_provider_id: Optional[str] = None
+) -> Dict:
+    """
+    Build a user document in the current schema
+
+    Args:
+        name: User's full name
+        email: User's email address (stored lowercase)
+        password_hash: bcrypt hash, None for social accounts
+        social_provider: Social provider name (google, facebook)
+        social_provider_id: User's ID from the social provider
+
+    Returns:
+        Document to insert
+    """
+    now = datetime.utcnow()
+    return {
+        "name": name,
+        "email": email.lower(),
+        "password_hash": password_hash,
+        "social_provider": social_provider,
+        "social_provider_id": social_provider_id,
+        "created_at": now,
+        # Social accounts sign in while being created and are pre-verified
+        "last_login": now if social_provider else None,
+        "is_verified": social_provider is not None,
+        "reset_code": None,
+        "reset_code_expires": None,
+        "schema_version": SCHEMA_VERSION,
+        "version": 1
+    }
+
+
+def upgrade(doc: Optional[Dict]) -> Optional[Dict]:
+    """
+    Bring a document read from MongoDB up to SCHEMA_VERSION, in memory
+
+    Args:
+        doc: User document or None
+
+    Returns:
+        The same document, upgraded (documents from a newer schema, written
+        by a newer deployment, are returned unchanged)
+    """
+    if doc is None:
+        return None
+    current = doc.get("schema_version", 0)
+    while current < SCHEMA_VERSION:
+        doc = UPGRADES[current](doc)
+        current += 1
+        doc["schema_version"] = current
+    return doc
+
+
+def outdated_query() -> Dict:
+    """Documents stored in an older schema"""
+    return {"$or": [{"schema_version": {"$exists": False}}, {"schema_version": {"$lt": SCHEMA_VERSION}}]}
+
+
+def _upgrade_write(doc: Dict) -> UpdateOne:
+    """Update storing the upgraded document, unless it was edited since it was read"""
+    original = dict(doc)
+    upgraded = upgrade(dict(doc))
+    changes = {key: value for key, value in upgraded.items() if original.get(key, ...) != value}
+    removed = {key: "" for key in original if key not in upgraded}
+    update: Dict = {"$set": changes, "$inc": {"version": 1}}
+    if removed:
+        update["$unset"] = removed
+    # A missing "version" matches None, like a missing schema_version
+    return UpdateOne({"_id": doc["_id"], "version": doc.get("version")}, update)
+
+
+async def migrate_user_schema(run: JobRun) -> None:
+    """
+    Scheduler job: rewrite documents stored in an older schema
+
+    Writes skipped because the document changed meanwhile are counted as
+    "conflicts" and picked up by the next run.
+
+    Args:
+        run: Progress of this run
+    """
+    async def migrate(run: JobRun) -> None:
+        users = get_users_collection()
+        pacer = BatchPacer(settings.MAINTENANCE_BATCHES_PER_SECOND)
+        async for id_range in id_ranges(users, settings.MAINTENANCE_BATCH_SIZE, pacer):
+            batch_query = dict(outdated_query(), _id=id_range)
+            MAINTENANCE_BATCHES.labels(run.job, current_tenant().id).inc()
+            if settings.MAINTENANCE_DRY_RUN:
+                record(run, "matched", await users.count_documents(batch_query))
+                continue
+
+            docs: List[Dict] = await users.find_list(batch_query)
+            if not docs:
+                continue
+            result = await users.bulk_write([_upgrade_write(doc) for doc in docs], ordered=False)
+            record(run, "matched", len(docs))
+            record(run, "upgraded", result.modified_count)
+            record(run, "conflicts", len(docs) - result.matched_count)
+
+    await for_each_tenant(run, migrate)
+
+
+def register_migration_jobs(scheduler: Scheduler) -> None:
+    """Add the schema migrator to a scheduler when USER_MIGRATION_ENABLED is set"""
+    if settings.USER_MIGRATION_ENABLED:
+        scheduler.add_job("migrate_user_schema", settings.USER_MIGRATION_INTERVAL_SECONDS, migrate_user_schema)
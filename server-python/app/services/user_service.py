@@ -1,13 +1,34 @@
 """
 User Service - CRUD operations for user management
+
+Every user document carries a "version" counter: new documents start at 1
+and every mutation here increments it, so a cached profile is current
+exactly while its version is. Documents created before the counter existed
+count as version 0 until their first update.
+
+Documents are built by user_schema.new_user_document() and returned in the
+current schema (user_schema.upgrade()) whatever shape they are stored in.
+
+Erased accounts are either deleted or kept anonymized with an "erased_at"
+timestamp; anonymized documents are treated as missing. Erasure also covers
+the copies purge_unverified_accounts keeps in the archive collection.
 """
-from typing import Optional, Dict
+import logging
+from typing import List, Optional, Dict
 from datetime import datetime, timedelta
 from bson import ObjectId
-from app.database import get_database
+from bson.errors import InvalidId
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import PyMongoError
+from app.database import USER_VERSION_INDEX, DatabaseUnavailableError, get_tenant_collection, get_users_collection, indexes_ready
+from app.services.maintenance import ARCHIVE_SUFFIX
+from app.services.user_schema import new_user_document, upgrade
+from app.tenancy import current_tenant
 from app.config import settings
 from app.auth.password import hash_password
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_by_email(email: str) -> Optional[Dict]:
     """
@@ -18,13 +39,14 @@ async def get_user_by_email(email: str) -> Optional[Dict]:
         
     Returns:
         User document or None if not found
+    
+    Raises:
+        DatabaseUnavailableError: If MongoDB cannot be reached (all functions here)
     """
-    db = get_database()
-    if db is None:
-        return None
+    users = get_users_collection()
     
-    user = await db[settings.COLLECTION_NAME].find_one({"email": email.lower()})
-    return user
+    user = await users.find_one({"email": email.lower()})
+    return upgrade(user)
 
 
 async def get_user_by_id(user_id: str) -> Optional[Dict]:
@@ -37,15 +59,47 @@ async def get_user_by_id(user_id: str) -> Optional[Dict]:
     Returns:
         User document or None if not found
     """
-    db = get_database()
-    if db is None:
+    users = get_users_collection()
+    
+    try:
+        object_id = ObjectId(user_id)
+    except (InvalidId, TypeError):
         return None
     
+    user = await users.find_one({"_id": object_id})
+    if user is not None and user.get("erased_at"):
+        return None
+    return upgrade(user)
+
+
+async def get_user_version(user_id: str) -> Optional[int]:
+    """
+    Get a user's version counter without reading the document
+    
+    Once the {_id, version} index exists the lookup is hinted to it and
+    answered from the index alone.
+    
+    Args:
+        user_id: User's MongoDB ObjectId as string
+        
+    Returns:
+        Version (0 for documents that predate it) or None if not found
+    """
+    users = get_users_collection()
+    
     try:
-        user = await db[settings.COLLECTION_NAME].find_one({"_id": ObjectId(user_id)})
-        return user
-    except Exception:
+        object_id = ObjectId(user_id)
+    except (InvalidId, TypeError):
         return None
+    
+    user = await users.find_one(
+        {"_id": object_id},
+        {"_id": 1, "version": 1},
+        hint=USER_VERSION_INDEX if indexes_ready() else None
+    )
+    if user is None:
+        return None
+    return user.get("version") or 0
 
 
 async def create_user(name: str, email: str, password: str) -> Optional[str]:
@@ -60,30 +114,15 @@ async def create_user(name: str, email: str, password: str) -> Optional[str]:
     Returns:
         User ID as string or None if creation failed
     """
-    db = get_database()
-    if db is None:
-        return None
+    users = get_users_collection()
     
-    password_hash = hash_password(password)
-    
-    user_doc = {
-        "name": name,
-        "email": email.lower(),
-        "password_hash": password_hash,
-        "social_provider": None,
-        "social_provider_id": None,
-        "created_at": datetime.utcnow(),
-        "last_login": None,
-        "is_verified": False,
-        "reset_code": None,
-        "reset_code_expires": None
-    }
+    user_doc = new_user_document(name, email, password_hash=hash_password(password))
     
     try:
-        result = await db[settings.COLLECTION_NAME].insert_one(user_doc)
+        result = await users.insert_one(user_doc)
         return str(result.inserted_id)
-    except Exception as e:
-        print(f"[ERROR] Error creating user: {e}")
+    except PyMongoError as e:
+        logger.error("Error creating user: %s", e)
         return None
 
 
@@ -100,28 +139,15 @@ async def create_social_user(name: str, email: str, provider: str, provider_id:
     Returns:
         User ID as string or None if creation failed
     """
-    db = get_database()
-    if db is None:
-        return None
+    users = get_users_collection()
     
-    user_doc = {
-        "name": name,
-        "email": email.lower(),
-        "password_hash": None,  # No password for social logins
-        "social_provider": provider,
-        "social_provider_id": provider_id,
-        "created_at": datetime.utcnow(),
-        "last_login": datetime.utcnow(),
-        "is_verified": True,  # Social accounts are pre-verified
-        "reset_code": None,
-        "reset_code_expires": None
-    }
+    user_doc = new_user_document(name, email, social_provider=provider, social_provider_id=provider_id)
     
     try:
-        result = await db[settings.COLLECTION_NAME].insert_one(user_doc)
+        result = await users.insert_one(user_doc)
         return str(result.inserted_id)
-    except Exception as e:
-        print(f"[ERROR] Error creating social user: {e}")
+    except PyMongoError as e:
+        logger.error("Error creating social user: %s", e)
         return None
 
 
@@ -135,18 +161,16 @@ async def update_last_login(email: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    db = get_database()
-    if db is None:
-        return False
+    users = get_users_collection()
     
     try:
-        await db[settings.COLLECTION_NAME].update_one(
+        await users.update_one(
             {"email": email.lower()},
-            {"$set": {"last_login": datetime.utcnow()}}
+            {"$set": {"last_login": datetime.utcnow()}, "$inc": {"version": 1}}
         )
         return True
-    except Exception as e:
-        print(f"[ERROR] Error updating last login: {e}")
+    except PyMongoError as e:
+        logger.error("Error updating last login: %s", e)
         return False
 
 
@@ -162,25 +186,115 @@ async def set_reset_code(email: str, code: str, expires_in_minutes: int = 15) ->
     Returns:
         True if successful, False otherwise
     """
-    db = get_database()
-    if db is None:
-        return False
+    users = get_users_collection()
     
     expires_at = datetime.utcnow() + timedelta(minutes=expires_in_minutes)
     
     try:
-        result = await db[settings.COLLECTION_NAME].update_one(
+        result = await users.update_one(
             {"email": email.lower()},
             {
                 "$set": {
                     "reset_code": code,
                     "reset_code_expires": expires_at
-                }
+                },
+                "$inc": {"version": 1}
+            }
+        )
+        return result.modified_count > 0
+    except PyMongoError as e:
+        logger.error("Error setting reset code: %s", e)
+        return False
+
+
+async def claim_reset_send(
+    email: str,
+    code: str,
+    previous_sent_at: Optional[datetime],
+    send_count: int,
+    window_start: datetime,
+    code_expires: Optional[datetime] = None,
+    expires_in_minutes: int = 15
+) -> Optional[datetime]:
+    """
+    Atomically store a reset code together with its send bookkeeping
+
+    The update only applies if reset_code_sent_at still holds the value the
+    caller read, so concurrent requests across workers send at most one email.
+
+    Args:
+        email: User's email address
+        code: 6-digit reset code (new or reused)
+        previous_sent_at: reset_code_sent_at as read from the user document
+        send_count: Number of sends in the current window, including this one
+        window_start: Start of the current send budget window
+        code_expires: Expiry of a reused code, which is kept; None for a new code
+        expires_in_minutes: New code expiration time in minutes (default: 15)
+
+    Returns:
+        The stored reset_code_sent_at if this caller won the right to send,
+        None otherwise
+
+    Raises:
+        DatabaseUnavailableError: If the update fails
+    """
+    users = get_users_collection()
+
+    now = datetime.utcnow()
+
+    try:
+        result = await users.update_one(
+            {"email": email.lower(), "reset_code_sent_at": previous_sent_at},
+            {
+                "$set": {
+                    "reset_code": code,
+                    # Resending a code must not extend its lifetime
+                    "reset_code_expires": code_expires or now + timedelta(minutes=expires_in_minutes),
+                    "reset_code_sent_at": now,
+                    "reset_send_count": send_count,
+                    "reset_send_window_start": window_start
+                },
+                "$inc": {"version": 1}
             }
         )
+    except PyMongoError as e:
+        logger.error("Error claiming reset send: %s", e)
+        raise DatabaseUnavailableError() from e
+    return now if result.modified_count > 0 else None
+
+
+async def release_reset_send(email: str, sent_at: datetime, previous: Dict) -> bool:
+    """
+    Undo a claim_reset_send whose email could not be sent
+
+    Restores the reset code and send bookkeeping read before the claim, so
+    the failed send neither starts a cooldown nor uses up the budget. Only
+    applies while the claim is still the latest one.
+
+    Args:
+        email: User's email address
+        sent_at: reset_code_sent_at returned by claim_reset_send
+        previous: User document as read before the claim
+
+    Returns:
+        True if the claim was undone
+    """
+    users = get_users_collection()
+
+    fields = ("reset_code", "reset_code_expires", "reset_code_sent_at", "reset_send_count", "reset_send_window_start")
+    update: Dict = {"$inc": {"version": 1}}
+    restored = {field: previous[field] for field in fields if previous.get(field) is not None}
+    if restored:
+        update["$set"] = restored
+    missing = {field: "" for field in fields if field not in restored}
+    if missing:
+        update["$unset"] = missing
+
+    try:
+        result = await users.update_one({"email": email.lower(), "reset_code_sent_at": sent_at}, update)
         return result.modified_count > 0
-    except Exception as e:
-        print(f"[ERROR] Error setting reset code: {e}")
+    except PyMongoError as e:
+        logger.error("Error releasing reset send: %s", e)
         return False
 
 
@@ -195,10 +309,6 @@ async def verify_reset_code(email: str, code: str) -> bool:
     Returns:
         True if code is valid and not expired, False otherwise
     """
-    db = get_database()
-    if db is None:
-        return False
-    
     user = await get_user_by_email(email)
     if not user:
         return False
@@ -226,26 +336,25 @@ async def update_password(email: str, new_password: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    db = get_database()
-    if db is None:
-        return False
+    users = get_users_collection()
     
     password_hash = hash_password(new_password)
     
     try:
-        result = await db[settings.COLLECTION_NAME].update_one(
+        result = await users.update_one(
             {"email": email.lower()},
             {
                 "$set": {
                     "password_hash": password_hash,
                     "reset_code": None,
                     "reset_code_expires": None
-                }
+                },
+                "$inc": {"version": 1}
             }
         )
         return result.modified_count > 0
-    except Exception as e:
-        print(f"[ERROR] Error updating password: {e}")
+    except PyMongoError as e:
+        logger.error("Error updating password: %s", e)
         return False
 
 
@@ -259,21 +368,108 @@ async def clear_reset_code(email: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    db = get_database()
-    if db is None:
-        return False
+    users = get_users_collection()
     
     try:
-        await db[settings.COLLECTION_NAME].update_one(
+        await users.update_one(
             {"email": email.lower()},
             {
                 "$set": {
                     "reset_code": None,
                     "reset_code_expires": None
-                }
+                },
+                "$inc": {"version": 1}
             }
         )
         return True
-    except Exception as e:
-        print(f"[ERROR] Error clearing reset code: {e}")
+    except PyMongoError as e:
+        logger.error("Error clearing reset code: %s", e)
         return False
+
+
+def _erasure_collection(archived: bool):
+    if archived:
+        return get_tenant_collection(current_tenant().collection + ARCHIVE_SUFFIX)
+    return get_users_collection()
+
+
+async def find_users_for_erasure(user_ids: List[ObjectId], emails: List[str], archived: bool = False) -> List[Dict]:
+    """
+    Find the accounts named by an erasure request
+    
+    Args:
+        user_ids: User IDs
+        emails: Email addresses (lowercase)
+        archived: Look in the tenant's archive of purged accounts instead
+        
+    Returns:
+        Documents with _id and email of the accounts that exist
+    """
+    users = _erasure_collection(archived)
+    
+    conditions = []
+    if user_ids:
+        conditions.append({"_id": {"$in": user_ids}})
+    if emails:
+        conditions.append({"email": {"$in": emails}})
+    if not conditions:
+        return []
+    
+    return await users.find_list(
+        {"$or": conditions, "erased_at": None},
+        {"_id": 1, "email": 1},
+        limit=len(user_ids) + len(emails)
+    )
+
+
+async def erase_users(user_ids: List[ObjectId], anonymize: bool = False, archived: bool = False) -> int:
+    """
+    Delete or anonymize accounts in one bulk write
+    
+    Deleting removes the document with its reset state. Anonymizing keeps
+    the document (and its _id) but replaces every personal field, clears
+    reset state and credentials, and marks it erased.
+    
+    Args:
+        user_ids: IDs of the accounts to erase
+        anonymize: Anonymize instead of deleting
+        archived: Erase the copies in the tenant's archive instead
+        
+    Returns:
+        Number of accounts erased
+    """
+    users = _erasure_collection(archived)
+    
+    if not user_ids:
+        return 0
+    
+    if not anonymize:
+        result = await users.bulk_write([DeleteOne({"_id": user_id}) for user_id in user_ids], ordered=False)
+        return result.deleted_count
+    
+    now = datetime.utcnow()
+    result = await users.bulk_write(
+        [
+            UpdateOne(
+                {"_id": user_id, "erased_at": None},
+                {
+                    "$set": {
+                        "name": "Deleted User",
+                        "email": f"erased-{user_id}@erased.invalid",
+                        "password_hash": None,
+                        "social_provider": None,
+                        "social_provider_id": None,
+                        "last_login": None,
+                        "reset_code": None,
+                        "reset_code_expires": None,
+                        "erased_at": now
+                    },
+                    "$unset": {"reset_code_sent_at": "", "reset_send_count": "", "reset_send_window_start": ""},
+                    "$inc": {"version": 1}
+                }
+            )
+            for user_id in user_ids
+        ],
+        ordered=False
+    )
+    return result.modified_count
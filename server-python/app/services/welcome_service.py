@@ -0,0 +1,82 @@
+"""
+Welcome Service - Client for the Node.js welcome message service
+"""
+import asyncio
+import logging
+import threading
+import time
+from app.config import settings
+from app.deadline import DeadlineExceededError, outbound_timeout
+from app.monitoring.metrics import httpx_event_hooks, record_outbound_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WELCOME_MESSAGE = "Welcome to our platform!"
+
+# Shared client, created on first use so httpx is not imported at startup
+_client = None
+_client_lock = threading.Lock()
+
+
+def _create_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            _client = httpx.AsyncClient(event_hooks=httpx_event_hooks("welcome_service"))
+    return _client
+
+
+async def _get_client():
+    # Building the client loads the CA bundle (tens of ms); keep it off the loop
+    if _client is None:
+        return await asyncio.to_thread(_create_client)
+    return _client
+
+
+async def get_welcome_message() -> str:
+    """
+    Get a welcome message from the Node.js service
+
+    Returns:
+        Message from the service, or the default one if it is unreachable
+    """
+    try:
+        timeout = outbound_timeout(5.0)
+    except DeadlineExceededError:
+        # The message is optional; don't fail a registration that already happened
+        return DEFAULT_WELCOME_MESSAGE
+    
+    client = await _get_client()
+    started = time.perf_counter()
+    try:
+        response = await client.get(settings.NODE_WELCOME_SERVICE_URL, timeout=timeout)
+        if response.status_code == 200:
+            return response.json().get("message", DEFAULT_WELCOME_MESSAGE)
+    except Exception as e:
+        record_outbound_error("welcome_service", time.perf_counter() - started)
+        logger.warning("NodeJS Service not reachable: %s", e)
+    return DEFAULT_WELCOME_MESSAGE
+
+
+async def check_welcome_service(timeout: float) -> None:
+    """
+    Probe the welcome service for readiness reporting
+
+    Args:
+        timeout: Seconds to wait for the response
+
+    Raises:
+        Exception: If the service is unreachable or answers with an error status
+    """
+    client = await _get_client()
+    response = await client.get(settings.NODE_WELCOME_SERVICE_URL, timeout=timeout)
+    response.raise_for_status()
+
+
+async def close_welcome_client() -> None:
+    """Close the shared HTTP client (application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,215 @@
+"""
+Tenancy - Which brand a request belongs to and where its users live
+
+One deployment serves several brands (tenants). TENANTS_FILE points to a
+JSON file describing them:
+
+    {
+      "default_tenant": "main",
+      "tenants": [
+        {"id": "main", "hosts": ["auth.example.com"]},
+        {"id": "brand-b", "hosts": ["auth.brand-b.com"], "database": "brand_b",
+         "max_connections": 20, "rate_limits": {"login": "20/minute"}},
+        {"id": "big", "hosts": ["auth.big.com"], "mongodb_uri": "mongodb+srv://...",
+         "max_pool_size": 50}
+      ]
+    }
+
+Each tenant's users live in its own database and/or collection (defaults:
+DATABASE_NAME and COLLECTION_NAME), optionally on its own cluster
+(`mongodb_uri`, with its own pool of `max_pool_size` connections and its own
+circuit breaker). Tenants on the shared cluster can be capped to
+`max_connections` concurrent operations, so one brand cannot take the whole
+pool. `rate_limits` overrides the per-route limits for the tenant, and every
+tenant has its own rate limit buckets.
+
+TenantMiddleware resolves the tenant from the Host header, or from the
+`tenant` claim of the bearer token on hosts that belong to no tenant. The
+claim is only trusted for routing here; get_token_user_id() rejects tokens
+whose verified claim names a different tenant than the request resolved to.
+Without TENANTS_FILE there is a single tenant using DATABASE_NAME and
+COLLECTION_NAME, exactly as before.
+"""
+import asyncio
+import json
+import logging
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from slowapi.util import get_remote_address
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT_ID = "default"
+
+# Route names accepted in a tenant's rate_limits, with the limits used otherwise
+DEFAULT_RATE_LIMITS = {
+    "register": "5/minute",
+    "login": "10/minute"
+}
+
+
+class TenantConfig(BaseModel):
+    """One tenant's entry in TENANTS_FILE"""
+    id: str = Field(..., pattern=r"^[a-z0-9][a-z0-9_-]{0,31}$")
+    hosts: List[str] = []
+    database: Optional[str] = None
+    collection: Optional[str] = None
+    mongodb_uri: Optional[str] = None
+    max_pool_size: Optional[int] = Field(None, ge=1)
+    max_connections: Optional[int] = Field(None, ge=1)
+    rate_limits: Dict[str, str] = {}
+
+
+class TenantsFile(BaseModel):
+    """Contents of TENANTS_FILE"""
+    default_tenant: str = DEFAULT_TENANT_ID
+    tenants: List[TenantConfig] = []
+
+
+class Tenant:
+    """A resolved tenant with its storage location and limits"""
+
+    def __init__(self, config: TenantConfig):
+        self.id = config.id
+        self.hosts = [host.lower() for host in config.hosts]
+        self.database = config.database or settings.DATABASE_NAME
+        self.collection = config.collection or settings.COLLECTION_NAME
+        self.mongodb_uri = config.mongodb_uri
+        self.max_pool_size = config.max_pool_size
+        self.max_connections = config.max_connections
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS, **config.rate_limits)
+        # Share of the common pool; dedicated clusters are bounded by their own pool
+        self.slots: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(config.max_connections)
+            if config.max_connections and not config.mongodb_uri else None
+        )
+
+    @property
+    def dedicated(self) -> bool:
+        """Whether the tenant's users live on their own cluster"""
+        return self.mongodb_uri is not None
+
+    def snapshot(self) -> Dict:
+        """Configuration and current occupancy for the admin API (no URI)"""
+        return {
+            "id": self.id,
+            "hosts": self.hosts,
+            "database": self.database,
+            "collection": self.collection,
+            "dedicated_cluster": self.dedicated,
+            "max_pool_size": self.max_pool_size,
+            "max_connections": self.max_connections,
+            "inflight_operations": (
+                self.max_connections - self.slots._value if self.slots is not None else None
+            ),
+            "rate_limits": self.rate_limits
+        }
+
+
+class TenantRegistry:
+    """All configured tenants, indexed by ID and host"""
+
+    def __init__(self, tenants: List[Tenant], default_id: str):
+        self.tenants: Dict[str, Tenant] = {tenant.id: tenant for tenant in tenants}
+        if default_id not in self.tenants:
+            self.tenants[default_id] = Tenant(TenantConfig(id=default_id))
+        self.default = self.tenants[default_id]
+        self._by_host: Dict[str, Tenant] = {}
+        for tenant in self.tenants.values():
+            for host in tenant.hosts:
+                if host in self._by_host:
+                    raise ValueError(f"Host {host} is assigned to tenants {self._by_host[host].id} and {tenant.id}")
+                self._by_host[host] = tenant
+
+    def get(self, tenant_id: Optional[str]) -> Optional[Tenant]:
+        return self.tenants.get(tenant_id) if tenant_id else None
+
+    def by_host(self, host: Optional[str]) -> Optional[Tenant]:
+        """Tenant owning a Host header value (the port is ignored)"""
+        if not host:
+            return None
+        return self._by_host.get(host.split(":", 1)[0].lower())
+
+    def snapshot(self) -> Dict:
+        return {
+            "default_tenant": self.default.id,
+            "tenants": [tenant.snapshot() for tenant in self.tenants.values()]
+        }
+
+
+def load_tenants(path: Optional[str]) -> TenantRegistry:
+    """
+    Build the tenant registry from TENANTS_FILE
+
+    Args:
+        path: JSON file path, or None/empty for the single default tenant
+
+    Returns:
+        Tenant registry
+
+    Raises:
+        ValueError: If the file is invalid (startup should fail loudly)
+    """
+    if not path:
+        return TenantRegistry([], DEFAULT_TENANT_ID)
+
+    with open(path) as f:
+        config = TenantsFile(**json.load(f))
+
+    ids = [tenant.id for tenant in config.tenants]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"{path}: duplicate tenant IDs")
+    for tenant in config.tenants:
+        unknown = set(tenant.rate_limits) - set(DEFAULT_RATE_LIMITS)
+        if unknown:
+            raise ValueError(f"{path}: tenant {tenant.id} has unknown rate limits {sorted(unknown)}")
+
+    registry = TenantRegistry([Tenant(tenant) for tenant in config.tenants], config.default_tenant)
+    logger.info("Loaded %s tenants from %s", len(registry.tenants), path)
+    return registry
+
+
+tenant_registry = load_tenants(settings.TENANTS_FILE)
+
+_tenant_var: ContextVar[Optional[Tenant]] = ContextVar("tenant", default=None)
+
+
+def current_tenant() -> Tenant:
+    """Tenant of the current request; the default tenant outside requests"""
+    return _tenant_var.get() or tenant_registry.default
+
+
+def set_current_tenant(tenant: Tenant):
+    """
+    Make a tenant current for this context (requests, jobs, tools)
+
+    Returns:
+        Token for reset_current_tenant()
+    """
+    return _tenant_var.set(tenant)
+
+
+def reset_current_tenant(token) -> None:
+    _tenant_var.reset(token)
+
+
+def tenant_rate_limit(name: str):
+    """
+    Rate limit provider for slowapi's @limiter.limit
+
+    Args:
+        name: Key in DEFAULT_RATE_LIMITS
+
+    Returns:
+        Callable returning the current tenant's limit string
+    """
+    def provider() -> str:
+        return current_tenant().rate_limits[name]
+    return provider
+
+
+def tenant_remote_address(request) -> str:
+    """slowapi key function: client address within the current tenant"""
+    return f"{current_tenant().id}:{get_remote_address(request)}"
@@ -0,0 +1,250 @@
+"""
+Auth Microbenchmarks - Hot functions of app/auth and app/models.py
+
+Times password hashing and verification, JWT creation and decoding, request
+model validation, breached-password lookups and user document
+(de)serialization. Each case is calibrated
+to run for roughly --target-ms per round and repeated --rounds times; the
+median round is the headline number. Results are written as JSON together
+with machine and library metadata so two runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_auth [--save results/before.json]
+    python -m benchmarks.bench_auth --compare results/before.json [--save results/after.json]
+    python -m benchmarks.bench_auth --only jwt
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+PASSWORD = "Benchmark123"
+
+# Entries in the throwaway breached-password index built for the lookup case
+BREACHED_INDEX_ENTRIES = 1_000_000
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """Benchmark cases keyed by name; imports the app lazily"""
+    import bson
+    from bson import ObjectId
+    from app.auth.jwt_handler import create_access_token, decode_token
+    from app.auth.password import hash_password, verify_password
+    from app.auth.password_policy import BreachedPasswordIndex
+    from app.models import LoginResponse, PasswordResetComplete, RegistrationRequest
+    from app.services.user_schema import new_user_document
+    from tools.build_breached_index import IndexWriter, build_external
+
+    password_hash = hash_password(PASSWORD)
+    user_id = str(ObjectId())
+    token = create_access_token(user_id, "bench@example.com")
+
+    registration = {"name": "Bench Mark", "email": "Bench@Example.com", "password": PASSWORD}
+    reset_complete = {"email": "bench@example.com", "code": "123456", "new_password": PASSWORD}
+
+    user_doc = new_user_document("Bench Mark", "bench@example.com", password_hash=password_hash)
+    user_doc["_id"] = ObjectId(user_id)
+    user_doc["last_login"] = user_doc["created_at"]
+    user_doc["is_verified"] = True
+    user_bson = bson.encode(user_doc)
+
+    index_dir = tempfile.mkdtemp(prefix="bench-breached-")
+    index_path = os.path.join(index_dir, "breached.idx")
+    writer = IndexWriter(index_path, 8)
+    build_external(
+        (hashlib.sha1(b"breached-%d" % n).digest()[:8] for n in range(BREACHED_INDEX_ENTRIES)),
+        writer, BREACHED_INDEX_ENTRIES, index_dir
+    )
+    writer.finish()
+    breached_index = BreachedPasswordIndex(index_path)
+    # The mapping stays valid after the file is gone
+    shutil.rmtree(index_dir)
+
+    def login_response_json():
+        return LoginResponse(
+            success=True,
+            message="Login successful",
+            access_token=token,
+            user={
+                "id": str(user_doc["_id"]),
+                "name": user_doc["name"],
+                "email": user_doc["email"],
+                "social_provider": user_doc["social_provider"]
+            }
+        ).model_dump_json()
+
+    return {
+        "password.hash_password": lambda: hash_password(PASSWORD),
+        "password.verify_password": lambda: verify_password(PASSWORD, password_hash),
+        "jwt.create_access_token": lambda: create_access_token(user_id, "bench@example.com"),
+        "jwt.decode_token": lambda: decode_token(token),
+        "models.RegistrationRequest": lambda: RegistrationRequest(**registration),
+        "models.PasswordResetComplete": lambda: PasswordResetComplete(**reset_complete),
+        "password_policy.breached_lookup": lambda: breached_index.contains(PASSWORD),
+        "user_doc.bson_encode": lambda: bson.encode(user_doc),
+        "user_doc.bson_decode": lambda: bson.decode(user_bson),
+        "user_doc.login_response_json": login_response_json
+    }
+
+
+def calibrate(fn: Callable[[], object], target_seconds: float) -> int:
+    """Iterations per round so one round takes about target_seconds"""
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds / 10 or iterations >= 1_000_000:
+            return max(1, int(iterations * target_seconds / max(elapsed, 1e-9)))
+        iterations *= 10
+
+
+def run_case(fn: Callable[[], object], rounds: int, target_seconds: float) -> Dict:
+    iterations = calibrate(fn, target_seconds)
+    per_op: List[float] = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_op.append((time.perf_counter() - started) / iterations * 1_000_000)
+
+    median = statistics.median(per_op)
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "median_us": round(median, 3),
+        "min_us": round(min(per_op), 3),
+        "mean_us": round(statistics.fmean(per_op), 3),
+        "stdev_us": round(statistics.stdev(per_op), 3) if len(per_op) > 1 else 0.0,
+        "ops_per_sec": round(1_000_000 / median, 1)
+    }
+
+
+def _cpu_model() -> Optional[str]:
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_metadata() -> Dict:
+    versions = {}
+    for package in ("bcrypt", "python-jose", "pydantic", "pydantic-core", "pymongo", "email-validator"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_model": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions
+    }
+
+
+def compare(current: Dict, previous: Dict, threshold: float) -> List[Dict]:
+    """
+    Per-case change of the median against a previous run
+
+    A change is significant when it exceeds `threshold` (a fraction) and is
+    larger than twice the combined relative spread of both runs.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        noise = 2 * (result["stdev_us"] / result["median_us"] + before["stdev_us"] / before["median_us"])
+        significant = abs(change) > max(threshold, noise)
+        rows.append({
+            "case": name,
+            "before_us": before["median_us"],
+            "after_us": result["median_us"],
+            "change": change,
+            "verdict": ("slower" if change > 0 else "faster") if significant else "same"
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--target-ms", type=float, default=200.0, help="Approximate duration of one round")
+    parser.add_argument("--only", help="Run cases whose name contains this string")
+    parser.add_argument("--save", help="Write results to this JSON file (default: results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Minimum change worth reporting")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+    cases = build_cases()
+    if args.only:
+        cases = {name: fn for name, fn in cases.items() if args.only in name}
+
+    run = {"metadata": machine_metadata(), "results": {}}
+    print(f"{'case':<32}{'median':>12}{'min':>12}{'stdev':>10}{'ops/s':>12}  (microseconds)")
+    for name, fn in cases.items():
+        result = run_case(fn, args.rounds, args.target_ms / 1000)
+        run["results"][name] = result
+        print(
+            f"{name:<32}{result['median_us']:>12.2f}{result['min_us']:>12.2f}"
+            f"{result['stdev_us']:>10.2f}{result['ops_per_sec']:>12.1f}"
+        )
+
+    save_path = args.save or os.path.join(
+        RESULTS_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+    with open(save_path, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {save_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous["metadata"].get("cpu_model") != run["metadata"]["cpu_model"]:
+            print("Warning: runs are from different CPUs; differences may not be meaningful", file=sys.stderr)
+        print(f"\nCompared with {args.compare} ({previous['metadata'].get('git_revision')})")
+        print(f"{'case':<32}{'before':>12}{'after':>12}{'change':>10}  verdict")
+        for row in compare(run, previous, args.threshold):
+            print(
+                f"{row['case']:<32}{row['before_us']:>12.2f}{row['after_us']:>12.2f}"
+                f"{row['change']:>+10.1%}  {row['verdict']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
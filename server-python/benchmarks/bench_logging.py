@@ -0,0 +1,110 @@
+"""
+Logging Benchmark - Per-request logging cost, print() vs queued JSON logging
+
+Simulates the log output of one password reset request with the console
+email backend (six print() lines before, one structured record now) while
+stdout is a pipe drained by a slow reader, as in a container whose log
+collector falls behind. Reports the time spent inside the request.
+
+Usage:
+    python -m benchmarks.bench_logging [--requests 2000] [--drain-delay-ms 1]
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+
+def slow_pipe(drain_delay: float):
+    """Pipe whose reader drains 4 KiB per drain_delay seconds"""
+    read_fd, write_fd = os.pipe()
+    stop = threading.Event()
+
+    def drain():
+        while not stop.is_set():
+            try:
+                if not os.read(read_fd, 4096):
+                    break
+            except OSError:
+                break
+            time.sleep(drain_delay)
+
+    threading.Thread(target=drain, daemon=True).start()
+    stream = io.TextIOWrapper(io.FileIO(write_fd, "w"), line_buffering=True)
+    return stream, stop
+
+
+def request_with_print(email: str, code: str) -> None:
+    print(f"\n{'='*50}")
+    print(f"[EMAIL] TO: {email}")
+    print(f"[EMAIL] SUBJECT: Password Reset Code")
+    print(f"[EMAIL] RESET CODE: {code}")
+    print(f"[EMAIL] EXPIRES IN: 15 minutes")
+    print(f"{'='*50}\n")
+
+
+def request_with_logging(logger: logging.Logger, email: str, code: str) -> None:
+    logger.info(
+        "Console email to %s: %s",
+        email, "Password Reset Code",
+        extra={"email_to": email, "reset_code": code, "expires_in_minutes": 15}
+    )
+
+
+def measure(fn, requests: int):
+    timings = []
+    for i in range(requests):
+        started = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[int(len(timings) * 0.99) - 1],
+        "max_us": timings[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--drain-delay-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    real_stdout = sys.stdout
+    results = {}
+
+    # Before: synchronous print() to the slow pipe
+    sys.stdout, stop = slow_pipe(args.drain_delay_ms / 1000)
+    results["print"] = measure(lambda i: request_with_print(f"user{i}@example.com", "123456"), args.requests)
+    stop.set()
+
+    # After: queued structured logging; the writer thread owns the slow pipe
+    sys.stdout, stop = slow_pipe(args.drain_delay_ms / 1000)
+    os.environ.setdefault("LOG_SAMPLE_PER_SECOND", "0")
+    from app.logger import setup_logging, shutdown_logging
+    setup_logging()
+    logger = logging.getLogger("app.services.email_service")
+    results["queued_json_logging"] = measure(
+        lambda i: request_with_logging(logger, f"user{i}@example.com", "123456"), args.requests
+    )
+    shutdown_logging()
+    stop.set()
+
+    sys.stdout = real_stdout
+    print(f"{args.requests} requests, stdout drained 4 KiB per {args.drain_delay_ms} ms")
+    print(f"{'mode':<22}{'mean':>10}{'p50':>10}{'p99':>10}{'max':>12}  (microseconds per request)")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<22}{stats['mean_us']:>10.1f}{stats['p50_us']:>10.1f}"
+            f"{stats['p99_us']:>10.1f}{stats['max_us']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
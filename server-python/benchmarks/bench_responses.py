@@ -0,0 +1,157 @@
+"""
+Response Encoding Benchmark - Bytes/sec of each route's response rendering
+
+For every route's typical body, times how the response is rendered:
+
+- fastapi: the handler returns a dict, FastAPI validates it against the
+  response_model, serializes it and renders it with the stdlib JSONResponse
+  (/me also converts its datetimes with isoformat() first)
+- trusted: the handler returns trusted_response(), rendered once by
+  FastJSONResponse (orjson when installed)
+
+Only rendering is timed, not the handler, so the numbers are the upper bound
+of what the encoding change saves per request.
+
+Usage:
+    python -m benchmarks.bench_responses [--rounds 7] [--target-ms 200]
+"""
+import argparse
+import os
+from datetime import datetime
+from typing import Callable, Dict, Tuple
+
+
+def build_cases() -> Dict[str, Tuple[Callable[[], bytes], Callable[[], bytes]]]:
+    """(fastapi, trusted) render functions per route; imports the app lazily"""
+    from bson import ObjectId
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.routing import APIRoute
+    from starlette.responses import JSONResponse
+    from app.auth.jwt_handler import create_access_token
+    from app.main import app
+    from app.models import LoginResponse, PasswordResetResponse, RegistrationResponse, UserResponse
+    from app.responses import FastJSONResponse, trusted_response
+
+    fields = {
+        (method, route.path): route.secure_cloned_response_field
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+    def via_response_model(method: str, path: str, content: Dict) -> Callable[[], bytes]:
+        field = fields[(method, path)]
+
+        def render() -> bytes:
+            value, _ = field.validate(content, {}, loc=("response",))
+            return JSONResponse(field.serialize(value)).body
+        return render
+
+    user_id = ObjectId()
+    user_doc = {
+        "_id": user_id,
+        "name": "Bench Mark",
+        "email": "bench@example.com",
+        "social_provider": None,
+        "created_at": datetime.utcnow(),
+        "last_login": datetime.utcnow(),
+        "is_verified": True
+    }
+    login = {
+        "success": True,
+        "message": "Login successful",
+        "access_token": create_access_token(str(user_id), user_doc["email"]),
+        "token_type": "bearer",
+        "user": {
+            "id": str(user_id),
+            "name": user_doc["name"],
+            "email": user_doc["email"],
+            "social_provider": None
+        }
+    }
+    register = {
+        "success": True,
+        "message": "User registered successfully",
+        "welcome_message": "Welcome to the platform, Bench Mark! We're glad to have you here."
+    }
+    reset = {"success": True, "message": "Reset code sent to your email"}
+    health = {
+        "status": "ok",
+        "database": "connected",
+        "database_circuit": {
+            "state": "closed", "consecutive_failures": 0, "opened_count": 0,
+            "rejected_count": 0, "retry_after_seconds": None
+        }
+    }
+
+    def me_isoformat() -> bytes:
+        return JSONResponse(jsonable_encoder({
+            "id": str(user_doc["_id"]),
+            "name": user_doc["name"],
+            "email": user_doc["email"],
+            "social_provider": user_doc.get("social_provider"),
+            "created_at": user_doc["created_at"].isoformat() if user_doc.get("created_at") else None,
+            "last_login": user_doc["last_login"].isoformat() if user_doc.get("last_login") else None,
+            "is_verified": user_doc.get("is_verified", False)
+        })).body
+
+    def me_trusted() -> bytes:
+        return trusted_response(UserResponse, {
+            "id": user_doc["_id"],
+            "name": user_doc["name"],
+            "email": user_doc["email"],
+            "social_provider": user_doc.get("social_provider"),
+            "created_at": user_doc.get("created_at"),
+            "last_login": user_doc.get("last_login"),
+            "is_verified": user_doc.get("is_verified", False)
+        }).body
+
+    return {
+        "POST /api/auth/login": (
+            via_response_model("POST", "/api/auth/login", login),
+            lambda: trusted_response(LoginResponse, login).body
+        ),
+        "POST /api/register": (
+            via_response_model("POST", "/api/register", register),
+            lambda: trusted_response(RegistrationResponse, register).body
+        ),
+        "POST /api/password-reset/request": (
+            via_response_model("POST", "/api/password-reset/request", reset),
+            lambda: trusted_response(PasswordResetResponse, reset).body
+        ),
+        "GET /api/auth/me": (me_isoformat, me_trusted),
+        # No response_model: both go through jsonable_encoder, only the encoder differs
+        "GET /health": (
+            lambda: JSONResponse(jsonable_encoder(health)).body,
+            lambda: FastJSONResponse(jsonable_encoder(health)).body
+        )
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--target-ms", type=float, default=200.0, help="Approximate duration of one round")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+    from benchmarks.bench_auth import run_case
+    from app.responses import orjson
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'stdlib json'}")
+    print(f"{'route':<34}{'bytes':>7}{'fastapi MB/s':>14}{'trusted MB/s':>14}{'speedup':>9}")
+    for route, (fastapi_render, trusted_render) in build_cases().items():
+        before, after = fastapi_render(), trusted_render()
+        if before != after:
+            raise SystemExit(f"{route}: bodies differ\n  {before!r}\n  {after!r}")
+
+        rates = []
+        for render in (fastapi_render, trusted_render):
+            result = run_case(render, args.rounds, args.target_ms / 1000)
+            rates.append(len(before) * result["ops_per_sec"] / 1024 / 1024)
+        print(f"{route:<34}{len(before):>7}{rates[0]:>14.1f}{rates[1]:>14.1f}{rates[1] / rates[0]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
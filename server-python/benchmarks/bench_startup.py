@@ -0,0 +1,146 @@
+"""
+Startup Benchmark - Import time and time-to-first-request of a fresh process
+
+Starts the app in a new Python process with uvicorn, as a scaled-out pod
+would, and polls /health until it answers. MongoDB is replaced by a stand-in
+whose client constructor blocks for --srv-ms (the SRV/DNS lookup pymongo does
+when the client is created) and whose operations take --mongo-rtt-ms, so the
+real connect_to_mongo path is timed. Reports the median of --runs runs.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--srv-ms 80] [--mongo-rtt-ms 30] [--check]
+    python -m benchmarks.bench_startup --update-baseline
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "startup.json")
+
+
+def serve(port: int, srv_ms: float, mongo_rtt_ms: float) -> None:
+    """Child process: import the app with a slow-starting Mongo stand-in and serve it"""
+    started = time.perf_counter()
+    from benchmarks.standins import FakeMongoClient
+    from app import database
+
+    class SlowStartClient(FakeMongoClient):
+        def __init__(self, *args, **kwargs):
+            # pymongo resolves mongodb+srv:// hosts synchronously in the constructor
+            time.sleep(srv_ms / 1000)
+            super().__init__(latency=mongo_rtt_ms / 1000)
+
+    database.AsyncIOMotorClient = SlowStartClient
+
+    from app.main import app
+    imported = time.perf_counter() - started
+    print(json.dumps({"import_s": imported}), flush=True)
+
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(args) -> Dict:
+    port = free_port()
+    env = dict(os.environ, LOG_LEVEL="WARNING", PYTHONDONTWRITEBYTECODE="0")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--serve", str(port),
+         "--srv-ms", str(args.srv_ms), "--mongo-rtt-ms", str(args.mongo_rtt_ms)],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True
+    )
+    try:
+        import_line = process.stdout.readline()
+        import_s = json.loads(import_line)["import_s"] if import_line else None
+
+        deadline = started + args.timeout
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        first_request = time.perf_counter() - started
+                        break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.002)
+        else:
+            raise RuntimeError("server did not answer /health before the timeout")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return {"import_s": import_s, "first_request_s": first_request}
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    imports = [run["import_s"] for run in runs if run["import_s"] is not None]
+    firsts = [run["first_request_s"] for run in runs]
+    return {
+        "runs": len(runs),
+        "import_ms": round(statistics.median(imports) * 1000, 1) if imports else None,
+        "first_request_ms": round(statistics.median(firsts) * 1000, 1),
+        "first_request_min_ms": round(min(firsts) * 1000, 1),
+        "first_request_max_ms": round(max(firsts) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--srv-ms", type=float, default=80.0, help="Blocking SRV lookup in the client constructor")
+    parser.add_argument("--mongo-rtt-ms", type=float, default=30.0, help="Round trip of each Mongo operation")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression as a fraction")
+    parser.add_argument("--check", action="store_true", help="Exit 1 when time-to-first-request regressed")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.srv_ms, args.mongo_rtt_ms)
+        return
+
+    result = summarize([measure_once(args) for _ in range(args.runs)])
+    result["config"] = {"srv_ms": args.srv_ms, "mongo_rtt_ms": args.mongo_rtt_ms}
+    print(
+        f"import app.main: {result['import_ms']} ms, time to first request: {result['first_request_ms']} ms "
+        f"(min {result['first_request_min_ms']}, max {result['first_request_max_ms']}, {args.runs} runs)"
+    )
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"baseline: import {baseline['import_ms']} ms, first request {baseline['first_request_ms']} ms")
+        limit = baseline["first_request_ms"] * (1 + args.tolerance)
+        if args.check and result["first_request_ms"] > limit:
+            print(f"Regression: first request {result['first_request_ms']} ms > {limit:.1f} ms")
+            sys.exit(1)
+    elif args.check:
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
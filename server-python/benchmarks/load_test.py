@@ -0,0 +1,389 @@
+"""
+Load Test - End-to-end load harness for app.main:app with regression checks
+
+Drives a weighted mix of user journeys (register, login, /me, the three-step
+password reset and the OAuth callbacks) through the real ASGI app, with
+MongoDB, the Node.js welcome service, email and the OAuth providers replaced
+by the in-process stand-ins in benchmarks/standins.py. Reports throughput and
+p50/p95/p99 latency per route and compares them with a stored baseline.
+
+Usage:
+    python -m benchmarks.load_test [--users 20] [--duration 30] [--check]
+    python -m benchmarks.load_test --update-baseline
+
+Exit status is 1 when --check finds a route that regressed past the
+tolerance, so the script can gate CI.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+
+# Weight of each journey in the mix (relative, not percentages)
+JOURNEY_WEIGHTS = {
+    "login": 35,
+    "me": 30,
+    "register": 10,
+    "password_reset": 10,
+    "google_callback": 8,
+    "facebook_callback": 7
+}
+
+SEED_PASSWORD = "LoadTest123"
+
+
+def configure_environment(args) -> None:
+    """Environment the app reads at import time; must run before importing app"""
+    os.environ.setdefault("LOG_LEVEL", args.log_level)
+    os.environ.setdefault("EMAIL_SERVICE", "console")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "load-test")
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "load-test")
+    os.environ.setdefault("FACEBOOK_APP_ID", "load-test")
+    os.environ.setdefault("FACEBOOK_APP_SECRET", "load-test")
+    # Every virtual user resets its own account repeatedly
+    os.environ.setdefault("RESET_RESEND_COOLDOWN_SECONDS", "0")
+    os.environ.setdefault("RESET_MAX_SENDS_PER_WINDOW", "1000000")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _oauth_succeeded(response) -> bool:
+    """Callbacks always redirect; failures carry error= in the location"""
+    return "error=" not in response.headers.get("location", "")
+
+
+class Recorder:
+    """Collects per-route latencies and failures after the warm-up period"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.recording = False
+
+    def record(self, route: str, elapsed: float, status_code: int, ok: bool) -> None:
+        if not self.recording:
+            return
+        self.latencies.setdefault(route, []).append(elapsed)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        counts = self.statuses.setdefault(route, {})
+        counts[status_code] = counts.get(status_code, 0) + 1
+
+    def summary(self, duration: float) -> Dict:
+        routes = {}
+        total = 0
+        for route, values in sorted(self.latencies.items()):
+            values.sort()
+            total += len(values)
+            routes[route] = {
+                "requests": len(values),
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "error_rate": round(self.errors.get(route, 0) / len(values), 4),
+                "statuses": {str(code): count for code, count in sorted(self.statuses[route].items())}
+            }
+        return {"total_rps": round(total / duration, 2), "routes": routes}
+
+
+class VirtualUser:
+    """Closed-loop client running one journey after another"""
+
+    def __init__(self, number: int, client, database, recorder: Recorder,
+                 accounts: List[Dict], rng: random.Random, email_counter):
+        self.number = number
+        self.client = client
+        self.database = database
+        self.recorder = recorder
+        self.accounts = accounts
+        self.rng = rng
+        self.email_counter = email_counter
+        # Account owned by this user alone, so reset journeys never race
+        self.own_email = f"reset{number}@example.com"
+        self.token: Optional[str] = None
+        # ETag of the last /me body, sent back like a polling client would
+        self.profile_etag: Optional[str] = None
+
+    async def call(self, route: str, method: str, path: str, expected=(200,), check=None, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        ok = response.status_code in expected and (check is None or check(response))
+        self.recorder.record(route, elapsed, response.status_code, ok)
+        return response
+
+    async def run(self, stop_at: float) -> None:
+        journeys = list(JOURNEY_WEIGHTS)
+        weights = list(JOURNEY_WEIGHTS.values())
+        while time.perf_counter() < stop_at:
+            journey = self.rng.choices(journeys, weights)[0]
+            try:
+                await getattr(self, journey)()
+            except Exception as e:
+                self.recorder.record(f"journey {journey}", 0.0, 0, False)
+                print(f"vu{self.number} {journey} failed: {e!r}", file=sys.stderr)
+
+    async def login(self) -> None:
+        account = self.rng.choice(self.accounts)
+        response = await self.call(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            json={"email": account["email"], "password": SEED_PASSWORD}
+        )
+        if response.status_code == 200:
+            self.token = response.json().get("access_token")
+            self.profile_etag = None
+
+    async def me(self) -> None:
+        if self.token is None:
+            await self.login()
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if self.profile_etag is not None:
+            headers["If-None-Match"] = self.profile_etag
+        response = await self.call(
+            "GET /api/auth/me", "GET", "/api/auth/me", expected=(200, 304), headers=headers
+        )
+        self.profile_etag = response.headers.get("etag", self.profile_etag)
+
+    async def register(self) -> None:
+        number = next(self.email_counter)
+        await self.call(
+            "POST /api/register", "POST", "/api/register",
+            json={"name": "Load Test User", "email": f"new{number}@example.com", "password": SEED_PASSWORD}
+        )
+
+    async def password_reset(self) -> None:
+        email = self.own_email
+        await self.call("POST /api/password-reset/request", "POST", "/api/password-reset/request",
+                        json={"email": email})
+
+        # The console email backend only logs the code; read it back from the store
+        from app.config import settings
+        user = await self.database[settings.COLLECTION_NAME].find_one({"email": email})
+        code = user.get("reset_code") if user else None
+        if not code:
+            self.recorder.record("POST /api/password-reset/verify", 0.0, 0, False)
+            return
+
+        await self.call("POST /api/password-reset/verify", "POST", "/api/password-reset/verify",
+                        json={"email": email, "code": code})
+        new_password = f"Reset{self.rng.randrange(10**6):06d}Aa"
+        await self.call(
+            "POST /api/password-reset/complete", "POST", "/api/password-reset/complete",
+            json={"email": email, "code": code, "new_password": new_password}
+        )
+
+    async def oauth_callback(self, provider: str) -> None:
+        # The browser would hold the state cookie from the login redirect
+        from app.auth.oauth_state import STATE_COOKIE, new_state
+        state = new_state()
+        await self.call(f"GET /api/auth/{provider}/callback", "GET",
+                        f"/api/auth/{provider}/callback?code=stand-in&state={state}",
+                        headers={"Cookie": f"{STATE_COOKIE}={state}"},
+                        expected=(302, 307), check=_oauth_succeeded)
+
+    async def google_callback(self) -> None:
+        await self.oauth_callback("google")
+
+    async def facebook_callback(self) -> None:
+        await self.oauth_callback("facebook")
+
+
+async def seed_accounts(database, users: int, accounts: int) -> List[Dict]:
+    """Insert login accounts and one reset account per virtual user"""
+    from app.auth.password import hash_password
+    from app.config import settings
+    from app.services.user_schema import new_user_document
+
+    # One hash for every seeded account keeps setup fast
+    password_hash = hash_password(SEED_PASSWORD)
+    collection = database[settings.COLLECTION_NAME]
+    await collection.create_index("email", unique=True)
+
+    seeded = []
+    emails = [f"user{i}@example.com" for i in range(accounts)] + [f"reset{i}@example.com" for i in range(users)]
+    for email in emails:
+        doc = new_user_document("Seeded User", email, password_hash=password_hash)
+        doc["is_verified"] = True
+        await collection.insert_one(doc)
+        if email.startswith("user"):
+            seeded.append(doc)
+    return seeded
+
+
+async def run_load(args) -> Dict:
+    import httpx
+    from benchmarks.standins import WelcomeServiceStandIn, install_fake_mongo, install_oauth_standins
+    from app import main
+    from app.config import settings
+    from app.routes import auth
+
+    # Rate limits would reject almost everything from a single client address
+    main.limiter.enabled = False
+    auth.limiter.enabled = False
+
+    client_standin = install_fake_mongo(latency=args.mongo_latency_ms / 1000)
+    database = client_standin[settings.DATABASE_NAME]
+    install_oauth_standins()
+
+    welcome = WelcomeServiceStandIn(delay=args.welcome_latency_ms / 1000)
+    settings.NODE_WELCOME_SERVICE_URL = await welcome.start()
+
+    accounts = await seed_accounts(database, args.users, args.accounts)
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    email_counter = itertools.count()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        users = [
+            VirtualUser(i, client, database, recorder, accounts, random.Random(rng.random()), email_counter)
+            for i in range(args.users)
+        ]
+        started = time.perf_counter()
+        stop_at = started + args.warmup + args.duration
+        tasks = [asyncio.create_task(user.run(stop_at)) for user in users]
+
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*tasks)
+        measured = time.perf_counter() - measured_from
+
+    await welcome.stop()
+
+    result = recorder.summary(measured)
+    result["config"] = {
+        "users": args.users,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "mongo_latency_ms": args.mongo_latency_ms,
+        "welcome_latency_ms": args.welcome_latency_ms,
+        "seed": args.seed
+    }
+    result["machine"] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+    return result
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float, min_samples: int = 20) -> List[str]:
+    """
+    Regressions of this run against the baseline
+
+    Total throughput may drop and per-route p95/p99 latency may grow by
+    `tolerance` (a fraction) before counting as a regression; a route's error
+    rate may grow by at most one percentage point. Per-route throughput is not
+    compared since it follows the random journey mix. Latency is only compared
+    for routes with at least `min_samples` requests in both runs.
+    """
+    regressions = []
+    floor = baseline["total_rps"] * (1 - tolerance)
+    if result["total_rps"] < floor:
+        regressions.append(f"total: rps {result['total_rps']} < {floor:.2f} (baseline {baseline['total_rps']})")
+
+    for route, base in baseline.get("routes", {}).items():
+        current = result["routes"].get(route)
+        if current is None:
+            regressions.append(f"{route}: no requests recorded")
+            continue
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(
+                f"{route}: error_rate {current['error_rate']} > baseline {base['error_rate']}"
+            )
+        if min(current["requests"], base["requests"]) < min_samples:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            limit = base[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(f"{route}: {metric} {current[metric]} > {limit:.2f} (baseline {base[metric]})")
+    return regressions
+
+
+def print_report(result: Dict, baseline: Optional[Dict]) -> None:
+    print(f"{'route':<38}{'reqs':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}  (ms)")
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:<38}{stats['requests']:>7}{stats['rps']:>9.2f}{stats['p50_ms']:>9.1f}"
+            f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['error_rate'] * 100:>7.1f}"
+        )
+        if baseline and route in baseline.get("routes", {}):
+            base = baseline["routes"][route]
+            print(
+                f"{'  baseline':<38}{'':>7}{base['rps']:>9.2f}{base['p50_ms']:>9.1f}"
+                f"{base['p95_ms']:>9.1f}{base['p99_ms']:>9.1f}{base['error_rate'] * 100:>7.1f}"
+            )
+    print(f"total: {result['total_rps']} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--accounts", type=int, default=200, help="Seeded login accounts")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="Simulated MongoDB round trip")
+    parser.add_argument("--welcome-latency-ms", type=float, default=5.0, help="Simulated welcome service delay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="CRITICAL", help="App log level during the run")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression as a fraction")
+    parser.add_argument("--min-samples", type=int, default=20, help="Requests needed to compare a route's latency")
+    parser.add_argument("--check", action="store_true", help="Exit 1 when a route regressed")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    result = asyncio.run(run_load(args))
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if args.check:
+        if baseline is None:
+            print(f"No baseline at {args.baseline}; run with --update-baseline first")
+            sys.exit(1)
+        regressions = compare(result, baseline, args.tolerance, args.min_samples)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+In-Process Stand-ins - Local replacements for external dependencies
+
+Used by the load harness and benchmarks to drive app.main:app without a
+MongoDB cluster, the Node.js welcome service, an email provider or OAuth
+providers:
+
+- FakeMongoClient: dict-backed async collections with the subset of the Motor
+  API the app uses (find_one, find, insert_one, update_one, bulk_write, ...)
+- WelcomeServiceStandIn: tiny asyncio HTTP server answering the welcome call
+- install_oauth_standins: patches authlib clients to return canned profiles
+"""
+import asyncio
+import copy
+import itertools
+import json
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+# ============================================
+# MONGODB
+# ============================================
+
+def _get_field(doc: Dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _has_field(doc: Dict, path: str) -> bool:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    raise NotImplementedError(f"Stand-in does not support {operator}")
+
+
+def matches(doc: Dict, query: Dict) -> bool:
+    """Evaluate a MongoDB filter against a document (common operators only)"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+
+        value = _get_field(doc, key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            for operator, operand in condition.items():
+                if operator == "$exists":
+                    if _has_field(doc, key) != bool(operand):
+                        return False
+                elif operator == "$regex":
+                    if value is None or not re.search(operand, value):
+                        return False
+                elif not _compare(value, operator, operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = {key for key, flag in projection.items() if flag}
+    if included:
+        result = {key: copy.deepcopy(doc[key]) for key in included if key in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {key: copy.deepcopy(value) for key, value in doc.items() if projection.get(key, 1)}
+
+
+def _apply_update(doc: Dict, update: Dict) -> None:
+    if not any(key.startswith("$") for key in update):
+        preserved_id = doc.get("_id")
+        doc.clear()
+        doc.update(copy.deepcopy(update))
+        if preserved_id is not None:
+            doc["_id"] = preserved_id
+        return
+
+    for operator, fields in update.items():
+        for key, value in fields.items():
+            if operator == "$set":
+                doc[key] = copy.deepcopy(value)
+            elif operator == "$unset":
+                doc.pop(key, None)
+            elif operator == "$inc":
+                doc[key] = (doc.get(key) or 0) + value
+            elif operator == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                doc.setdefault(key, []).extend(copy.deepcopy(items))
+            elif operator == "$setOnInsert":
+                continue
+            else:
+                raise NotImplementedError(f"Stand-in does not support {operator}")
+
+
+class FakeCursor:
+    """Async cursor over a materialized result list"""
+
+    def __init__(self, docs: List[Dict]):
+        self._docs = docs
+
+    def sort(self, key, direction: int = 1):
+        if isinstance(key, list):
+            for field, field_direction in reversed(key):
+                self._docs.sort(key=lambda doc: _sort_key(doc, field), reverse=field_direction < 0)
+        else:
+            self._docs.sort(key=lambda doc: _sort_key(doc, key), reverse=direction < 0)
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        return self._docs[:length] if length else list(self._docs)
+
+    def __aiter__(self):
+        self._iterator = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _sort_key(doc: Dict, field: str):
+    value = _get_field(doc, field)
+    return (value is not None, value if not isinstance(value, ObjectId) else str(value))
+
+
+class FakeCollection:
+    """Dict-backed stand-in for an AsyncIOMotorCollection"""
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.docs: Dict[Any, Dict] = {}
+        self.unique_fields: List[str] = []
+
+    async def _io(self):
+        # Always yield to the loop like a real network round trip would
+        await asyncio.sleep(self.latency)
+
+    def _check_unique(self, doc: Dict, ignore_id: Any = None) -> None:
+        for field in self.unique_fields:
+            value = doc.get(field)
+            for other in self.docs.values():
+                if other["_id"] != ignore_id and other.get(field) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key error {self.name}.{field}")
+
+    async def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if unique and field not in self.unique_fields:
+            self.unique_fields.append(field)
+        return f"{field}_1"
+
+    async def create_indexes(self, indexes) -> List[str]:
+        return [f"index_{i}" for i, _ in enumerate(indexes)]
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs):
+        await self._io()
+        for doc in self.docs.values():
+            if matches(doc, query or {}):
+                return _project(doc, projection)
+        return None
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> FakeCursor:
+        docs = [_project(doc, projection) for doc in self.docs.values() if matches(doc, query or {})]
+        return FakeCursor(docs)
+
+    async def count_documents(self, query: Dict, **kwargs) -> int:
+        await self._io()
+        return sum(1 for doc in self.docs.values() if matches(doc, query))
+
+    async def insert_one(self, doc: Dict, **kwargs):
+        await self._io()
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error {self.name}._id")
+        self._check_unique(doc)
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False, **kwargs):
+        await self._io()
+        for doc in self.docs.values():
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                _apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=int(before != doc), upserted_id=None)
+
+        if upsert:
+            doc = {key: value for key, value in query.items() if not key.startswith("$")}
+            _apply_update(doc, update)
+            for key, value in update.get("$setOnInsert", {}).items():
+                doc[key] = value
+            inserted = await self.insert_one(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=inserted.inserted_id)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query: Dict, update: Dict, **kwargs):
+        await self._io()
+        modified = 0
+        for doc in self.docs.values():
+            if matches(doc, query):
+                _apply_update(doc, update)
+                modified += 1
+        return SimpleNamespace(matched_count=modified, modified_count=modified)
+
+    async def replace_one(self, query: Dict, replacement: Dict, upsert: bool = False, **kwargs):
+        return await self.update_one(query, replacement, upsert=upsert)
+
+    async def find_one_and_update(self, query: Dict, update: Dict, upsert: bool = False,
+                                  return_document: bool = False, projection: Optional[Dict] = None, **kwargs):
+        await self._io()
+        for doc in self.docs.values():
+            if matches(doc, query):
+                before = _project(doc, projection)
+                _apply_update(doc, update)
+                return _project(doc, projection) if return_document else before
+        if upsert:
+            result = await self.update_one(query, update, upsert=True)
+            return _project(self.docs[result.upserted_id], projection) if return_document else None
+        return None
+
+    async def delete_one(self, query: Dict, **kwargs):
+        await self._io()
+        for key, doc in list(self.docs.items()):
+            if matches(doc, query):
+                del self.docs[key]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query: Dict, **kwargs):
+        await self._io()
+        keys = [key for key, doc in self.docs.items() if matches(doc, query)]
+        for key in keys:
+            del self.docs[key]
+        return SimpleNamespace(deleted_count=len(keys))
+
+    async def bulk_write(self, requests: List, ordered: bool = True, **kwargs):
+        """Apply pymongo InsertOne/UpdateOne/UpdateMany/ReplaceOne/DeleteOne/DeleteMany requests"""
+        counts = dict(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0)
+        for request in requests:
+            kind = type(request).__name__
+            if kind == "InsertOne":
+                await self.insert_one(copy.deepcopy(request._doc))
+                counts["inserted_count"] += 1
+                continue
+            if kind in ("DeleteOne", "DeleteMany"):
+                delete = self.delete_one if kind == "DeleteOne" else self.delete_many
+                counts["deleted_count"] += (await delete(request._filter)).deleted_count
+                continue
+            if kind == "UpdateMany":
+                result = await self.update_many(request._filter, request._doc)
+            else:
+                result = await self.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+            counts["matched_count"] += result.matched_count
+            counts["modified_count"] += result.modified_count
+            counts["upserted_count"] += int(getattr(result, "upserted_id", None) is not None)
+        return SimpleNamespace(acknowledged=True, **counts)
+
+
+class FakeDatabase:
+    """Stand-in for an AsyncIOMotorDatabase"""
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.latency)
+        return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        return self[name]
+
+    async def command(self, command, *args, **kwargs) -> Dict:
+        await asyncio.sleep(self.latency)
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    """Stand-in for an AsyncIOMotorClient"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._databases: Dict[str, FakeDatabase] = {}
+        self.admin = self["admin"]
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        if name not in self._databases:
+            self._databases[name] = FakeDatabase(name, self.latency)
+        return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> FakeDatabase:
+        return self[name]
+
+    def close(self) -> None:
+        pass
+
+
+def install_fake_mongo(latency: float = 0.0) -> FakeMongoClient:
+    """
+    Point app.database at an in-memory client
+
+    Args:
+        latency: Simulated round-trip time per operation in seconds
+
+    Returns:
+        The installed FakeMongoClient
+    """
+    from app import database
+    from app.config import settings
+
+    client = FakeMongoClient(latency)
+    database._mongo_client = client
+    database._database = client[settings.DATABASE_NAME]
+    return client
+
+
+# ============================================
+# NODE.JS WELCOME SERVICE
+# ============================================
+
+class WelcomeServiceStandIn:
+    """Minimal HTTP/1.1 server answering every request with a welcome message"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.url = ""
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/welcome-message"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                body = json.dumps({"message": "Welcome from the stand-in service!"}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                    b"content-length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ============================================
+# OAUTH PROVIDERS
+# ============================================
+
+_profile_ids = itertools.count(1)
+
+
+def install_oauth_standins() -> None:
+    """
+    Replace the Google and Facebook token exchanges with canned profiles
+
+    Each callback gets a new social user, so callbacks exercise account
+    creation as well as login. Requires the providers to be registered
+    (GOOGLE_CLIENT_ID / FACEBOOK_APP_ID set before app import).
+    """
+    from app.auth.oauth import get_oauth
+    oauth = get_oauth()
+
+    async def google_token(request, **kwargs):
+        number = next(_profile_ids) % 500
+        return {
+            "access_token": "stand-in",
+            "userinfo": {
+                "email": f"google{number}@example.com",
+                "name": f"Google User {number}",
+                "sub": f"g-{number}"
+            }
+        }
+
+    async def facebook_token(request, **kwargs):
+        return {"access_token": "stand-in"}
+
+    async def facebook_get(url, token=None, **kwargs):
+        number = next(_profile_ids) % 500
+        profile = {"id": f"fb-{number}", "name": f"Facebook User {number}", "email": f"fb{number}@example.com"}
+        return SimpleNamespace(json=lambda: profile, status_code=200)
+
+    if oauth.create_client("google") is not None:
+        oauth.google.authorize_access_token = google_token
+    if oauth.create_client("facebook") is not None:
+        oauth.facebook.authorize_access_token = facebook_token
+        oauth.facebook.get = facebook_get
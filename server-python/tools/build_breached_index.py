@@ -0,0 +1,220 @@
+"""
+Breached Password Index Builder - Turn a raw dump into the memory-mapped index
+
+Reads one or more dumps and writes the index format documented in
+app/auth/password_policy.py: unique, sorted leading bytes of each
+password's SHA-1 digest behind a 16-bit fanout table.
+
+Input formats:
+- sha1 (default): "<40 hex digits>[:<count>]" per line, as in the Have I Been
+  Pwned downloads; --min-count drops hashes seen fewer times
+- plaintext: one password per line (UTF-8), hashed here
+
+Dumps that are already ordered by hash (the HIBP "ordered by hash" files)
+are streamed straight into the index. Anything else is sorted externally in
+runs of --chunk-records records in --tmp-dir and merged, so memory use
+stays bounded for dumps of hundreds of millions of entries.
+
+Record size trades size for false positives: with n entries and r bytes, a
+random password is wrongly reported as breached with probability n / 2^(8r)
+(about 5e-11 for a billion entries at the default of 8 bytes).
+
+Usage:
+    python -m tools.build_breached_index pwned-passwords-sha1-ordered-by-hash-v8.txt -o data/breached.idx
+    python -m tools.build_breached_index rockyou.txt --format plaintext -o data/breached.idx
+    python -m tools.build_breached_index dump.txt -o data/breached.idx --record-size 6 --min-count 2
+"""
+import argparse
+import hashlib
+import heapq
+import os
+import struct
+import sys
+import tempfile
+import time
+from typing import BinaryIO, Iterator, List, Optional
+
+from app.auth.password_policy import FANOUT_ENTRIES, HEADER, HEADER_SIZE, INDEX_MAGIC, BreachedPasswordIndex
+
+_READ_RECORDS = 65536
+
+
+class UnsortedInput(Exception):
+    """The input turned out not to be ordered by hash"""
+
+
+def read_keys(paths: List[str], input_format: str, record_size: int, min_count: int) -> Iterator[bytes]:
+    """Digest prefixes of every usable entry, in input order"""
+    for path in paths:
+        with open(path, "rb") as dump:
+            for line in dump:
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                if input_format == "plaintext":
+                    yield hashlib.sha1(line).digest()[:record_size]
+                    continue
+
+                digest, _, count = line.partition(b":")
+                if len(digest) != 40:
+                    continue
+                try:
+                    if min_count > 1 and (not count or int(count) < min_count):
+                        continue
+                    key = bytes.fromhex(digest.decode("ascii"))[:record_size]
+                except ValueError:
+                    continue
+                yield key
+
+
+class IndexWriter:
+    """Writes sorted keys, dropping duplicates, and fills in the fanout table"""
+
+    def __init__(self, path: str, record_size: int):
+        self.path = path
+        self.record_size = record_size
+        self.count = 0
+        self.prefix_counts = [0] * (FANOUT_ENTRIES - 1)
+        self._last: Optional[bytes] = None
+        self._buffer: List[bytes] = []
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(b"\0" * (HEADER_SIZE + FANOUT_ENTRIES * 8))
+
+    def add(self, key: bytes, check_order: bool = False) -> None:
+        if key == self._last:
+            return
+        if check_order and self._last is not None and key < self._last:
+            raise UnsortedInput()
+        self._last = key
+        self.prefix_counts[(key[0] << 8) | key[1]] += 1
+        self.count += 1
+        self._buffer.append(key)
+        if len(self._buffer) >= _READ_RECORDS:
+            self._file.write(b"".join(self._buffer))
+            self._buffer.clear()
+
+    def finish(self) -> None:
+        self._file.write(b"".join(self._buffer))
+        self._buffer.clear()
+
+        fanout = [0] * FANOUT_ENTRIES
+        for prefix, count in enumerate(self.prefix_counts):
+            fanout[prefix + 1] = fanout[prefix] + count
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(INDEX_MAGIC, self.record_size, 0, self.count).ljust(HEADER_SIZE, b"\0"))
+        self._file.write(struct.pack(f"<{FANOUT_ENTRIES}Q", *fanout))
+        self._file.close()
+
+    def abort(self) -> None:
+        self._file.close()
+        os.remove(self.path)
+
+
+def _write_run(keys: List[bytes], tmp_dir: str) -> str:
+    keys.sort()
+    run = tempfile.NamedTemporaryFile(dir=tmp_dir, prefix="breached-run-", delete=False)
+    with run:
+        previous = None
+        block = []
+        for key in keys:
+            if key != previous:
+                block.append(key)
+                previous = key
+            if len(block) >= _READ_RECORDS:
+                run.write(b"".join(block))
+                block.clear()
+        run.write(b"".join(block))
+    return run.name
+
+
+def _read_run(path: str, record_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as run:
+        while True:
+            block = run.read(record_size * _READ_RECORDS)
+            if not block:
+                return
+            for offset in range(0, len(block), record_size):
+                yield block[offset:offset + record_size]
+
+
+def build_sorted(keys: Iterator[bytes], writer: IndexWriter) -> None:
+    """Stream keys that are already in order; raises UnsortedInput otherwise"""
+    for key in keys:
+        writer.add(key, check_order=True)
+
+
+def build_external(keys: Iterator[bytes], writer: IndexWriter, chunk_records: int, tmp_dir: str) -> int:
+    """
+    Sort keys in runs on disk and merge them into the writer
+
+    Returns:
+        Number of runs written
+    """
+    runs: List[str] = []
+    chunk: List[bytes] = []
+    try:
+        for key in keys:
+            chunk.append(key)
+            if len(chunk) >= chunk_records:
+                runs.append(_write_run(chunk, tmp_dir))
+                chunk = []
+        if chunk:
+            runs.append(_write_run(chunk, tmp_dir))
+            chunk = []
+
+        for key in heapq.merge(*(_read_run(run, writer.record_size) for run in runs)):
+            writer.add(key)
+    finally:
+        for run in runs:
+            os.remove(run)
+    return len(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("dumps", nargs="+", help="Raw dump files")
+    parser.add_argument("-o", "--output", required=True, help="Index file to write")
+    parser.add_argument("--format", choices=("sha1", "plaintext"), default="sha1")
+    parser.add_argument("--record-size", type=int, default=8, help="Digest bytes kept per entry (4-20)")
+    parser.add_argument("--min-count", type=int, default=1, help="sha1 format: minimum breach count")
+    parser.add_argument("--chunk-records", type=int, default=5_000_000, help="Records per sorted run")
+    parser.add_argument("--tmp-dir", default=None, help="Directory for sorted runs (default: next to the output)")
+    args = parser.parse_args()
+
+    if not 4 <= args.record_size <= 20:
+        parser.error("--record-size must be between 4 and 20")
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_dir = args.tmp_dir or output_dir
+    partial = args.output + ".partial"
+    started = time.perf_counter()
+
+    def keys():
+        return read_keys(args.dumps, args.format, args.record_size, args.min_count)
+
+    writer = IndexWriter(partial, args.record_size)
+    try:
+        build_sorted(keys(), writer)
+        mode = "streamed (input ordered by hash)"
+    except UnsortedInput:
+        writer.abort()
+        writer = IndexWriter(partial, args.record_size)
+        runs = build_external(keys(), writer, args.chunk_records, tmp_dir)
+        mode = f"external sort ({runs} runs)"
+    writer.finish()
+
+    # Validate before replacing an index that workers may have mapped
+    BreachedPasswordIndex(partial).close()
+    os.replace(partial, args.output)
+
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(
+        f"Wrote {writer.count} entries ({args.record_size} bytes each, {size_mb:.1f} MB) to {args.output} "
+        f"in {time.perf_counter() - started:.1f}s, {mode}"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Account Erasure - Delete or anonymize accounts listed in files
+
+Creates an erasure job (see app/services/erasure.py) and runs it in this
+process against the configured MongoDB, printing progress after every batch.
+Input files hold one user ID or email per line; lines containing "@" are
+emails. If the tool is interrupted, --resume continues the job from its
+checkpoint (a running API worker also resumes it once it is stale).
+
+Usage:
+    python -m tools.erase_users requests.txt --mode anonymize
+    python -m tools.erase_users ids.txt emails.txt --tenant brand-b
+    python -m tools.erase_users --resume 3f2c0e4a9b7d4c1e8f6a5b4c3d2e1f00
+    python -m tools.erase_users --status 3f2c0e4a9b7d4c1e8f6a5b4c3d2e1f00
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+from typing import Dict, List, Tuple
+
+OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+
+
+def read_targets(paths: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    User IDs and emails from input files
+
+    Raises:
+        SystemExit: On a line that is neither
+    """
+    user_ids, emails = [], []
+    for path in paths:
+        with open(path) as f:
+            for number, line in enumerate(f, 1):
+                value = line.strip()
+                if not value or value.startswith("#"):
+                    continue
+                if "@" in value:
+                    emails.append(value.lower())
+                elif OBJECT_ID.match(value):
+                    user_ids.append(value.lower())
+                else:
+                    raise SystemExit(f"{path}:{number}: not a user ID or email: {value!r}")
+    return user_ids, emails
+
+
+def print_progress(job: Dict) -> None:
+    print(
+        f"\r{job['position']}/{job['total']} ({job['progress']:.1%})  "
+        f"erased {job['erased']}  not found {job['not_found']}",
+        end="", file=sys.stderr, flush=True
+    )
+
+
+async def run(args) -> int:
+    from app.database import close_mongo_connection, connect_to_mongo
+    from app.services import erasure
+    from app.tenancy import set_current_tenant, tenant_registry
+
+    tenant = tenant_registry.get(args.tenant) if args.tenant else tenant_registry.default
+    if tenant is None:
+        raise SystemExit(f"Unknown tenant {args.tenant}")
+    set_current_tenant(tenant)
+
+    await connect_to_mongo()
+    try:
+        if args.status:
+            print(json.dumps(await erasure.get_job(args.status), default=str, indent=2))
+            return 0
+
+        if args.resume:
+            job_id = args.resume
+        else:
+            user_ids, emails = read_targets(args.files)
+            job_id = (await erasure.create_job(user_ids, emails, args.mode))["id"]
+            print(f"Erasure job {job_id}", file=sys.stderr)
+
+        job = await erasure.run_job(job_id, resume_failed=True, on_batch=print_progress)
+        print(file=sys.stderr)
+        if job is None:
+            print(f"Job {job_id} is completed or still running on a live worker", file=sys.stderr)
+            return 1
+        print(json.dumps(job, default=str, indent=2))
+        return 0 if job["status"] == erasure.COMPLETED else 1
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("files", nargs="*", help="Files with one user ID or email per line")
+    parser.add_argument("--mode", choices=("delete", "anonymize"), default="delete")
+    parser.add_argument("--tenant", help="Tenant ID (default: the default tenant)")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Continue an interrupted or failed job")
+    parser.add_argument("--status", metavar="JOB_ID", help="Print a job's progress and exit")
+    args = parser.parse_args()
+
+    if not args.files and not (args.resume or args.status):
+        parser.error("give input files, --resume or --status")
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
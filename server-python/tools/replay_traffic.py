@@ -0,0 +1,330 @@
+"""
+Traffic Replay - Re-issue a capture file against a test instance
+
+Reads records written by TrafficCaptureMiddleware, rebuilds a request from
+each anonymized shape and sends it with the original spacing divided by
+--speed. Reports, per route, captured vs replayed latency percentiles and how
+often the replayed status matched the captured one.
+
+Requests are rebuilt as follows:
+- email pseudonyms become u<pseudonym>@replay.example.com, so repeated
+  requests for one account still target one account
+- passwords that passed the policy become REPLAY_PASSWORD when the captured
+  request succeeded and a different valid password when it did not; invalid
+  ones are replaced with an invalid password of the same length
+- reset codes cannot be recovered and are sent as zeros
+- bearer tokens come from logging in as a primed account
+
+Usage:
+    python -m tools.replay_traffic captures/traffic.jsonl --target http://localhost:8000 --speed 2
+    python -m tools.replay_traffic captures/traffic.jsonl* --target http://test:8000 \\
+        --prime-mongo-uri mongodb://test-db:27017 --output replay-report.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+REPLAY_PASSWORD = "ReplayPass1"
+WRONG_PASSWORD = "ReplayWrong1"
+REPLAY_DOMAIN = "replay.example.com"
+
+
+def load_records(paths: List[str]) -> List[Dict]:
+    """Records from all capture files (rotated files included), by arrival time"""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+
+def replay_email(identity: Dict) -> str:
+    if not identity.get("valid", True):
+        return f"u{identity['id']}"
+    return f"u{identity['id']}@{REPLAY_DOMAIN}"
+
+
+def rebuild(shape: Any, succeeded: bool, field: Optional[str] = None) -> Any:
+    """
+    Concrete JSON value for an anonymized shape
+
+    Args:
+        shape: Anonymized value from the capture record
+        succeeded: Whether the captured request got a 2xx/3xx response
+        field: Name of the object field holding the value
+
+    Returns:
+        Value to send in the replayed request
+    """
+    if isinstance(shape, list):
+        return [rebuild(item, succeeded) for item in shape]
+    if not isinstance(shape, dict):
+        if shape in ("int", "float"):
+            return 0
+        if shape == "str":
+            return ""
+        return shape
+
+    if set(shape) == {"pw"}:
+        if not shape["pw"]["ok"]:
+            return "x" * shape["pw"]["len"]
+        return REPLAY_PASSWORD if succeeded else WRONG_PASSWORD
+    if set(shape) == {"id", "valid"}:
+        return replay_email(shape)
+    if set(shape) == {"len"}:
+        if field == "code":
+            return "0" * shape["len"]
+        return "a" * shape["len"]
+    return {key: rebuild(value, succeeded, key) for key, value in shape.items()}
+
+
+def account_pseudonyms(records: List[Dict]) -> Set[str]:
+    """
+    Email pseudonyms whose accounts must exist before the replay
+
+    Accounts created by a captured, successful registration are left out so
+    the replayed registration can create them again.
+    """
+    registered: Set[str] = set()
+    referenced: Set[str] = set()
+    for record in records:
+        body = record.get("b")
+        identity = body.get("email") if isinstance(body, dict) else None
+        if not isinstance(identity, dict) or not identity.get("valid"):
+            continue
+        if record["r"] == "/api/register" and record["s"] < 400 and identity["id"] not in referenced:
+            registered.add(identity["id"])
+        referenced.add(identity["id"])
+    return referenced - registered
+
+
+def prime_accounts(mongo_uri: str, database_name: str, collection_name: str, pseudonyms: Set[str]) -> int:
+    """
+    Create the accounts captured requests expect to exist
+
+    Args:
+        mongo_uri: MongoDB URI of the test instance's database
+        database_name: Database name
+        collection_name: Users collection name
+        pseudonyms: Email pseudonyms to create accounts for
+
+    Returns:
+        Number of accounts created
+    """
+    from pymongo import MongoClient, UpdateOne
+    from app.auth.password import hash_password
+    from app.services.user_schema import new_user_document
+
+    password_hash = hash_password(REPLAY_PASSWORD)
+
+    def primed_user(email: str) -> Dict:
+        user = new_user_document("Replay User", email, password_hash=password_hash)
+        user["is_verified"] = True
+        return user
+
+    operations = [
+        UpdateOne(
+            {"email": f"u{pseudonym}@{REPLAY_DOMAIN}"},
+            {"$setOnInsert": primed_user(f"u{pseudonym}@{REPLAY_DOMAIN}")},
+            upsert=True
+        )
+        for pseudonym in pseudonyms
+    ]
+    if not operations:
+        return 0
+
+    client = MongoClient(mongo_uri)
+    try:
+        result = client[database_name][collection_name].bulk_write(operations, ordered=False)
+        return result.upserted_count
+    finally:
+        client.close()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Replayer:
+    """Schedules captured requests against the target and collects results"""
+
+    def __init__(self, client, speed: float, max_in_flight: int, token: Optional[str]):
+        self.client = client
+        self.speed = speed
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.token = token
+        self.results: Dict[str, Dict[str, List]] = {}
+        self.max_lag = 0.0
+        self.failures = 0
+
+    def request_for(self, record: Dict) -> Dict:
+        succeeded = record["s"] < 400
+        headers = {}
+        auth = record.get("auth")
+        if auth == "bearer":
+            token = self.token if succeeded and self.token else "invalid"
+            headers["Authorization"] = f"Bearer {token}"
+        elif auth:
+            headers["Authorization"] = f"{auth} invalid"
+        if record.get("idem"):
+            headers["Idempotency-Key"] = f"replay-{record['idem']}"
+
+        request = {"method": record["m"], "url": record["p"], "headers": headers}
+        if record.get("q"):
+            request["params"] = {key: "replay" for key in record["q"]}
+
+        body = record.get("b")
+        if isinstance(body, dict) and set(body) <= {"bytes", "invalid_json"}:
+            request["content"] = b"x" * body["bytes"]
+        elif body is not None:
+            request["json"] = rebuild(body, succeeded)
+        return request
+
+    async def send(self, record: Dict) -> None:
+        route = f"{record['m']} {record['r']}"
+        entry = self.results.setdefault(route, {"captured": [], "replayed": [], "status_match": []})
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(**self.request_for(record))
+                status_code = response.status_code
+            except Exception as e:
+                self.failures += 1
+                print(f"{route} failed: {e!r}", file=sys.stderr)
+                return
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        entry["captured"].append(record["ms"])
+        entry["replayed"].append(elapsed_ms)
+        entry["status_match"].append(status_code == record["s"])
+
+    async def run(self, records: List[Dict]) -> float:
+        origin = records[0]["ts"]
+        started = time.perf_counter()
+        tasks = []
+        for record in records:
+            due = (record["ts"] - origin) / self.speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_lag = max(self.max_lag, -delay)
+            tasks.append(asyncio.create_task(self.send(record)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+    def report(self) -> Dict:
+        routes = {}
+        for route, entry in sorted(self.results.items()):
+            captured = sorted(entry["captured"])
+            replayed = sorted(entry["replayed"])
+            if not replayed:
+                continue
+            row = {"requests": len(replayed)}
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+                before = percentile(captured, fraction)
+                after = percentile(replayed, fraction)
+                row[f"captured_{name}_ms"] = round(before, 2)
+                row[f"replayed_{name}_ms"] = round(after, 2)
+                row[f"{name}_ratio"] = round(after / before, 2) if before else None
+            row["status_match"] = round(sum(entry["status_match"]) / len(entry["status_match"]), 4)
+            routes[route] = row
+        return {"routes": routes, "failures": self.failures, "max_schedule_lag_s": round(self.max_lag, 3)}
+
+
+async def login_token(client, pseudonyms: Set[str]) -> Optional[str]:
+    """Access token of one primed account, for replaying bearer requests"""
+    for pseudonym in sorted(pseudonyms)[:1]:
+        response = await client.post(
+            "/api/auth/login", json={"email": f"u{pseudonym}@{REPLAY_DOMAIN}", "password": REPLAY_PASSWORD}
+        )
+        if response.status_code == 200:
+            return response.json().get("access_token")
+    return None
+
+
+async def replay(args, records: List[Dict], pseudonyms: Set[str]) -> Dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits) as client:
+        token = await login_token(client, pseudonyms) if pseudonyms else None
+        replayer = Replayer(client, args.speed, args.max_in_flight, token)
+        elapsed = await replayer.run(records)
+
+    report = replayer.report()
+    report["records"] = len(records)
+    report["speed"] = args.speed
+    report["captured_span_s"] = round(records[-1]["ts"] - records[0]["ts"], 3)
+    report["replay_span_s"] = round(elapsed, 3)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(
+        f"{report['records']} requests at {report['speed']}x: captured span {report['captured_span_s']}s, "
+        f"replayed in {report['replay_span_s']}s (max schedule lag {report['max_schedule_lag_s']}s)"
+    )
+    print(f"{'route':<38}{'reqs':>6}{'cap p50':>9}{'rep p50':>9}{'x':>8}{'cap p95':>9}{'rep p95':>9}{'x':>8}"
+          f"{'status=':>9}")
+    for route, row in report["routes"].items():
+        print(
+            f"{route:<38}{row['requests']:>6}{row['captured_p50_ms']:>9.1f}{row['replayed_p50_ms']:>9.1f}"
+            f"{row['p50_ratio'] or 0:>8.2f}{row['captured_p95_ms']:>9.1f}{row['replayed_p95_ms']:>9.1f}"
+            f"{row['p95_ratio'] or 0:>8.2f}{row['status_match']:>9.0%}"
+        )
+    if report["failures"]:
+        print(f"{report['failures']} requests failed to send")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("captures", nargs="+", help="Capture files (rotated files may be listed too)")
+    parser.add_argument("--target", default="http://localhost:8000", help="Base URL of the test instance")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (2 = twice as fast)")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Cap on concurrent replayed requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--route", action="append", help="Only replay these route templates")
+    parser.add_argument("--prime-mongo-uri", help="Create the captured accounts in this database first")
+    parser.add_argument("--prime-database", default="HomeAssignment")
+    parser.add_argument("--prime-collection", default="users")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    records = load_records(args.captures)
+    if args.route:
+        records = [record for record in records if record["r"] in args.route]
+    if not records:
+        print("No records to replay")
+        sys.exit(1)
+
+    pseudonyms: Set[str] = set()
+    if args.prime_mongo_uri:
+        pseudonyms = account_pseudonyms(records)
+        created = prime_accounts(args.prime_mongo_uri, args.prime_database, args.prime_collection, pseudonyms)
+        print(f"Primed {created} new accounts ({len(pseudonyms)} referenced)")
+
+    report = asyncio.run(replay(args, records, pseudonyms))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()